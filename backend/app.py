@@ -1,323 +1,1285 @@
-from flask import Flask, jsonify
-from neo4j import GraphDatabase
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+import base64
+import contextvars
+import datetime
+import json
+import logging
 import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from location_extractor import extract_location_from_text
+from neo4j.exceptions import ClientError
+from article_index import ArticleIndex, available as article_index_available
+from cache import ResponseCache, cached, finalize_api_response, skip_cache
+from changes import ChangeFeed, format_version, parse_version
+from continuity import ContinuityGraph
+from location_extractor import extract_locations, load_gazetteer, set_default_gazetteer
+from db import DATABASE, URI, create_driver
+from geo_clusters import DEFAULT_TOP, MAX_PRECISION, MAX_TOP, cluster_items, in_cluster, is_geohash, zoom_precision
+from instrumentation import SamplingProfiler, metrics, timed
+import instrumentation
+from queries import breaker, query_stats, run_query
+from resilience import log_failure
+from search import SNIPPET_CHARS, SearchIndex, highlight, parse_query
+from snapshot import Snapshot
+from streaming import ndjson_response, stream_records, wants_ndjson
 
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__, static_folder='../', static_url_path='/')
 CORS(app)
 
-# Neo4j Configuration
-URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-AUTH = (os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
-DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+# Sampling profiler for slow requests, off unless PROFILE_SLOW_MS is set;
+# it can also be switched on at runtime with POST /api/admin/profiler
+profiler = SamplingProfiler(
+    os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "prisma-profiles")),
+    slow_ms=int(os.getenv("PROFILE_SLOW_MS", "500")),
+    interval=int(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+)
+if os.getenv("PROFILE_SLOW_MS"):
+    profiler.configure(enabled=True)
 
-driver = GraphDatabase.driver(URI, auth=AUTH)
+# Server-Timing headers and /metrics; installed before finalize_api_response
+# so the compression it does is part of the measured request
+instrumentation.init_app(app, query_stats, profiler, slow_request_ms=int(os.getenv("SLOW_REQUEST_MS", "1000")))
+app.after_request(finalize_api_response)
 
-def get_news_from_db(date_filter=None, topic_filter=None):
-    # Base date extraction - handle timestamps by taking first 10 chars
-    date_extract = "substring(COALESCE(f.fecha, a.fecha), 0, 10)"
-    
-    # If no date filter, find the latest date first to avoid "scattered" view
-    actual_date = date_filter
-    if not actual_date:
-        try:
-            with driver.session(database=DATABASE) as session:
-                latest_res = session.run(f"MATCH (a:Articulo) OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha) WITH {date_extract} as d WHERE d IS NOT NULL RETURN max(d)")
-                actual_date = latest_res.single()[0]
-        except Exception as e:
-            print(f"Error finding latest date: {e}")
-            actual_date = None
+# Neo4j driver shared by all request threads of this process (pool settings in db.py)
+driver = create_driver()
 
-    date_where = ""
-    if actual_date:
-        date_where = f"WHERE {date_extract} = '{actual_date}'"
-    
-    if topic_filter:
-        query = f"""
-        MATCH (a:Articulo)-[:TRATA_SOBRE]->(t:Topic {{nombre: '{topic_filter}'}})
-        OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-        WITH a, t, {date_extract} as fechaVal
-        {date_where}
-        OPTIONAL MATCH (a)-[:PUBLICADO_EN]->(p:Periodico)
-        WITH a, t, fechaVal, collect(DISTINCT p.nombre) as sources
-        RETURN a.titulo AS title, 
-               a.contenido AS summary, 
-               a.url AS url,
-               sources[0] AS source,
-               fechaVal AS date,
-               t.nombre AS topic
-        ORDER BY date DESC
-        LIMIT 1000
-        """
+# Optional larger gazetteer (CSV/TSV name,lat,lng or JSON) merged with the built-in cities
+GAZETTEER_FILE = os.getenv("GAZETTEER_FILE")
+if GAZETTEER_FILE:
+    set_default_gazetteer(load_gazetteer(GAZETTEER_FILE))
+
+# Optional in-memory columnar index (NumPy) answering /api/news, /api/dates and
+# /api/topics. It loads in the background; until it is ready Neo4j answers.
+article_index = None
+if os.getenv("ARTICLE_INDEX") == "1":
+    if article_index_available():
+        article_index = ArticleIndex()
+        article_index.start(lambda: driver, DATABASE, interval=int(os.getenv("ARTICLE_INDEX_REFRESH", "60")))
     else:
-        query = f"""
-        MATCH (a:Articulo)
-        OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-        WITH a, {date_extract} as fechaVal
-        {date_where}
-        OPTIONAL MATCH (a)-[:TRATA_SOBRE]->(t:Topic)
-        OPTIONAL MATCH (a)-[:PUBLICADO_EN]->(p:Periodico)
-        WITH a, fechaVal, collect(DISTINCT t.nombre) as topics, collect(DISTINCT p.nombre) as sources
-        WHERE fechaVal IS NOT NULL
-        RETURN a.titulo AS title, 
-               a.contenido AS summary, 
-               a.url AS url,
-               sources[0] AS source,
-               fechaVal AS date,
-               topics[0] AS topic
-        ORDER BY date DESC
-        LIMIT 1000
-        """
-    
-    print(f"DEBUG: Executing query:\n{query}")
+        logger.warning("ARTICLE_INDEX=1 but NumPy is not installed; facets are queried in Neo4j")
+
+def index_columns():
+    """Current article index snapshot, or None when the index is off or still loading."""
+    return article_index.columns if article_index is not None else None
+
+# Response cache. Past dates never change, so they get a long TTL; the latest
+# date (still being ingested) and undated lists get short ones. After an ingest
+# call POST /api/admin/cache/invalidate; the generation file propagates the
+# invalidation to every worker process started by serve.py. Expired responses
+# are kept CACHE_STALE_SECONDS longer and served, marked stale, while Neo4j
+# fails or the circuit breaker of queries.py is open.
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+    generation_file=os.getenv("CACHE_GENERATION_FILE",
+                              os.path.join(tempfile.gettempdir(), f"prisma-cache-{DATABASE}")),
+    stale_ttl=int(os.getenv("CACHE_STALE_SECONDS", "3600")),
+    available=breaker.available,
+)
+CACHE_TTL_HISTORIC = int(os.getenv("CACHE_TTL_HISTORIC", "86400"))
+CACHE_TTL_LATEST = int(os.getenv("CACHE_TTL_LATEST", "60"))
+CACHE_TTL_DEFAULT = int(os.getenv("CACHE_TTL_DEFAULT", "300"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Macro whose hechos /api/bootstrap includes and cut-off date of the Prisma feed
+MAIN_MACRO = os.getenv("MAIN_MACRO", "Guerra Israel-Hamas 2023")
+RECENT_HECHOS_MAX_DATE = os.getenv("RECENT_HECHOS_MAX_DATE", "2025-08-30")
+
+# Pre-rendered responses written by export_snapshot.py, served ahead of Neo4j
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR")
+snapshot = Snapshot(SNAPSHOT_DIR, max_age=int(os.getenv("SNAPSHOT_MAX_AGE", "300"))) if SNAPSHOT_DIR else None
+
+@app.before_request
+def reject_malformed_dates():
+    """400 for a `date` parameter or path segment that is not YYYY-MM-DD, before any view
+    (or cache) sees it: date_ttl() would otherwise cache the empty answer as historic."""
+    dates = [request.args.get('date'), (request.view_args or {}).get('date')]
+    if request.path.startswith("/api/") and any(date and not is_date(date) for date in dates):
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+
+@app.before_request
+def serve_from_snapshot():
+    if (snapshot is not None and request.method == "GET" and not wants_ndjson()
+            and request.path.startswith("/api/") and not request.path.startswith(("/api/admin/", "/api/changes/"))
+            and 'since' not in request.args):
+        return snapshot.response()
+
+# Live updates. The data version (last batch of articles of daily_summary.py,
+# last hecho_coverage.py run) is read every CHANGES_POLL_SECONDS while
+# /api/changes/stream has subscribers. Each open stream holds one of the
+# WEB_THREADS server threads (serve.py), so there are at most SSE_MAX_CLIENTS
+# per process, never more than a quarter of the threads (none with fewer than
+# 4: the other clients poll), and each one is closed after SSE_MAX_SECONDS (EventSource reconnects
+# and resumes from its last id).
+CHANGES_POLL_SECONDS = int(os.getenv("CHANGES_POLL_SECONDS", "5"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+SSE_THREAD_SHARE = WEB_THREADS // 4
+SSE_MAX_CLIENTS = min(int(os.getenv("SSE_MAX_CLIENTS", SSE_THREAD_SHARE)), SSE_THREAD_SHARE)
+SSE_MAX_SECONDS = int(os.getenv("SSE_MAX_SECONDS", "300"))
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+def read_data_versions():
+    """(articles, hechos) data version; 0 before the maintenance scripts have run."""
+    with driver.session(database=DATABASE) as session:
+        record = run_query(session, "data_versions")[0]
+    return (record["articles"] or 0), (record["hechos"] or 0)
+
+change_feed = ChangeFeed(read_data_versions, CHANGES_POLL_SECONDS, SSE_MAX_CLIENTS)
+
+# Largest number of ids accepted by the bulk endpoints
+MAX_BULK_IDS = 100
+
+# Runs the independent queries of /api/bootstrap concurrently
+bootstrap_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="bootstrap")
+
+def get_latest_date():
+    """Latest article date (YYYY-MM-DD) from the DiaResumen layer, cached like the latest-date responses."""
+    columns = index_columns()
+    if columns is not None:
+        return columns.latest_date()
+    latest = response_cache.get("latest-date")
+    if latest is not None:
+        return latest
     try:
         with driver.session(database=DATABASE) as session:
-            result = session.run(query)
-            news_list = []
-            
-            # Default coordinates for Spanish news (Madrid) when extraction fails
-            default_coords = {"city": "Madrid", "lat": 40.4168, "lng": -3.7038}
-            
-            for record in result:
-                # Extract location from article title and content
-                location = extract_location_from_text(
-                    record["title"] or "",
-                    record["summary"] or ""
-                )
-                
-                # Use extracted location or default to Madrid
-                if location:
-                    coords = location
-                else:
-                    coords = default_coords
-                
-                news_item = {
-                    "city": coords["city"],
-                    "lat": coords["lat"],
-                    "lng": coords["lng"],
-                    "title": record["title"] or "Sin título",
-                    "summary": (record["summary"][:500] + "...") if record["summary"] and len(record["summary"]) > 500 else (record["summary"] or "Sin resumen"),
-                    "source": record["source"] or "Desconocido",
-                    "url": record["url"] or "#",
-                    "date": record["date"]
-                }
-                news_list.append(news_item)
-            
-            print(f"DEBUG: Found {len(news_list)} news items for date {actual_date}")
-            return news_list
-    except Exception as e:
-        print(f"Error querying Neo4j: {e}")
-        import traceback
-        traceback.print_exc()
+            latest = run_query(session, "latest_date")[0][0]
+    except Exception:
+        log_failure(logger, "Error finding latest date")
+        return response_cache.get_stale("latest-date")
+    if latest:
+        response_cache.set("latest-date", latest, CACHE_TTL_LATEST)
+    return latest
+
+def date_ttl(date):
+    """Long TTL for dates before the latest one, short TTL for the latest (or no) date."""
+    latest = get_latest_date()
+    if date and latest and date < latest:
+        return CACHE_TTL_HISTORIC
+    return CACHE_TTL_LATEST
+
+# Fields a /api/news item can carry; `fields=` selects a subset
+NEWS_FIELDS = ("id", "city", "lat", "lng", "title", "summary", "source", "url", "date")
+NEWS_MAX_LIMIT = 1000
+# Streamed responses keep memory flat, so they may return a whole date at once
+NEWS_STREAM_MAX_LIMIT = int(os.getenv("NEWS_STREAM_MAX_LIMIT", "100000"))
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+def is_date(text):
+    """True for a YYYY-MM-DD calendar date (2024-13-45 has the format but is not one)."""
+    if not DATE_PATTERN.match(text):
+        return False
+    try:
+        datetime.date.fromisoformat(text)
+    except ValueError:
+        return False
+    return True
+
+# Default coordinates for Spanish news (Madrid) when extraction fails
+DEFAULT_COORDS = {"city": "Madrid", "lat": 40.4168, "lng": -3.7038}
+
+def encode_token(value):
+    """Opaque URL-safe token for article ids and pagination cursors."""
+    raw = json.dumps(value, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_token(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        return json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("invalid token")
+
+def parse_news_args(args, max_limit=NEWS_MAX_LIMIT):
+    """Validate `fields`, `limit` and `cursor`; raises ValueError with a client-facing message."""
+    fields = NEWS_FIELDS
+    if args.get('fields'):
+        fields = tuple(f.strip() for f in args['fields'].split(',') if f.strip())
+        unknown = [f for f in fields if f not in NEWS_FIELDS]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}")
+
+    try:
+        limit = int(args.get('limit', max_limit))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, max_limit))
+
+    cursor = None
+    if args.get('cursor'):
+        cursor = decode_token(args['cursor'])
+        if not (isinstance(cursor, list) and len(cursor) == 2 and all(isinstance(c, str) for c in cursor)
+                and DATE_PATTERN.match(cursor[0])):
+            raise ValueError("invalid cursor")
+    return fields, limit, cursor
+
+def parse_date_range(args):
+    """(from, to) from the `from`/`to` parameters, either of them None, or None if neither is given."""
+    if 'from' not in args and 'to' not in args:
+        return None
+    bounds = (args.get('from') or None, args.get('to') or None)
+    for bound in bounds:
+        if bound is not None and not is_date(bound):
+            raise ValueError("from/to must be dates (YYYY-MM-DD)")
+    return bounds
+
+def truncate_summary(summary):
+    return (summary[:500] + "...") if summary and len(summary) > 500 else (summary or "Sin resumen")
+
+def resolve_locations(records):
+    """Location of each news record ({city, lat, lng}), or None when it has none."""
+    # Locations are precomputed by geocode_articles.py; only articles
+    # ingested after the last backfill are extracted here, in one batch
+    pending = [record for record in records if record["geocoded"] is None]
+    with timed("geo"):
+        extracted = iter(extract_locations(
+            (record["title"] or "", record["summary"] or "") for record in pending
+        ))
+    
+    locations = []
+    for record in records:
+        if record["geocoded"] is None:
+            locations.append(next(extracted))
+        elif record["city"] is not None:
+            locations.append({"city": record["city"], "lat": record["lat"], "lng": record["lng"]})
+        else:
+            locations.append(None)
+    return locations
+
+def build_news_items(records, fields=NEWS_FIELDS, locations=None):
+    """Turn news records into API items, resolving coordinates and projecting `fields`."""
+    if locations is None:
+        locations = resolve_locations(records)
+    
+    news_list = []
+    for record, location in zip(records, locations):
+        # Use stored/extracted location or default to Madrid
+        coords = location or DEFAULT_COORDS
+        
+        news_item = {
+            "id": encode_token(record["url"]) if record["url"] else None,
+            "city": coords["city"],
+            "lat": coords["lat"],
+            "lng": coords["lng"],
+            "title": record["title"] or "Sin título",
+            "summary": truncate_summary(record["summary"]),
+            "source": record["source"] or "Desconocido",
+            "url": record["url"] or "#",
+            "date": record["date"]
+        }
+        news_list.append({field: news_item[field] for field in fields})
+    return news_list
+
+def page_date(date_filter, cursor):
+    """Date of a single-date page: the cursor's, the requested one or the latest."""
+    # A cursor pins the date of the first page; otherwise, with no date filter,
+    # find the latest date first to avoid "scattered" view
+    return cursor[0] if cursor else (date_filter or get_latest_date())
+
+def news_query(date_filter, topics, limit, cursor, fields, date_range=None):
+    """Registered query name and parameters for one page of news, or None if there is no date."""
+    params = {
+        "cursor_url": cursor[1] if cursor else None,
+        "limit": limit,
+        "with_summary": "summary" in fields,
+        "with_source": "source" in fields,
+    }
+    if date_range is None and len(topics) <= 1:
+        actual_date = page_date(date_filter, cursor)
+        if not actual_date:
+            return None
+        params["date"] = actual_date
+        if topics:
+            params["topic"] = topics[0]
+            return "news_by_topic", params
+        return "news", params
+
+    if date_range is None:
+        actual_date = page_date(date_filter, cursor)
+        if not actual_date:
+            return None
+        date_range = (actual_date, actual_date)
+    params.update(date_from=date_range[0] or "", date_to=date_range[1] or "9999-12-31",
+                  topics=list(topics) or None, cursor_date=cursor[0] if cursor else None)
+    return "news_range", params
+
+def news_from_index(columns, date_filter, topics, limit, cursor, date_range):
+    """Same page as news_query() would return, read from the article index (without summaries)."""
+    if date_range is None:
+        actual_date = page_date(date_filter, cursor)
+        if not actual_date:
+            return []
+        date_range = (actual_date, actual_date)
+    with timed("index"):
+        return columns.news(date_range[0], date_range[1], topics, cursor, limit)
+
+def add_summaries(records):
+    with driver.session(database=DATABASE) as session:
+        summaries = {record["url"]: record["summary"]
+                     for record in run_query(session, "news_summaries", urls=[r["url"] for r in records])}
+    for record in records:
+        record["summary"] = summaries.get(record["url"])
+
+def next_news_cursor(last_record, count, limit):
+    if last_record is None or count < limit:
+        return None
+    return encode_token([last_record["date"], last_record["url"]])
+
+def get_news_records(date_filter=None, topics=(), limit=NEWS_MAX_LIMIT, cursor=None, fields=NEWS_FIELDS,
+                     date_range=None):
+    """Records of one page of news, from the article index when it is loaded. Raises on query errors."""
+    columns = index_columns()
+    if columns is not None:
+        records = news_from_index(columns, date_filter, topics, limit, cursor, date_range)
+        if records and "summary" in fields:
+            add_summaries(records)
+        return records
+    query = news_query(date_filter, topics, limit, cursor, fields, date_range)
+    if query is None:
         return []
+    query_name, params = query
+    with driver.session(database=DATABASE) as session:
+        return run_query(session, query_name, **params)
+
+def get_news_from_db(date_filter=None, topics=(), limit=NEWS_MAX_LIMIT, cursor=None, fields=NEWS_FIELDS,
+                     date_range=None):
+    """One page of news and the cursor for the next one (None on the last page). Raises on query errors."""
+    records = get_news_records(date_filter, topics, limit, cursor, fields, date_range)
+    news_list = build_news_items(records, fields)
+    next_cursor = next_news_cursor(records[-1] if records else None, len(records), limit)
+    
+    logger.debug("Found %d news items (date %s, range %s)", len(news_list), date_filter, date_range)
+    return news_list, next_cursor
+
+def stream_news(date_filter, topics, limit, cursor, fields, paged, date_range=None):
+    """NDJSON variant of /api/news: one item per line, plus a final {"next_cursor": ...} line when paged."""
+    query = news_query(date_filter, topics, limit, cursor, fields, date_range)
+    if query is None:
+        return ndjson_response([])
+    query_name, params = query
+    trailer = None
+    if paged:
+        trailer = lambda last, count: {"next_cursor": next_news_cursor(last, count, limit)}
+    return stream_records(driver, DATABASE, query_name, params,
+                          lambda records: build_news_items(records, fields), trailer)
+
+def parse_since(args):
+    """Integer `since` version, or None if absent; raises ValueError."""
+    if 'since' not in args:
+        return None
+    try:
+        return int(args['since'])
+    except ValueError:
+        raise ValueError("since must be an integer version")
+
+def delta_range(date_filter, date_range):
+    """Dates a news delta covers: the given date or range, else from the latest date on (a new day included)."""
+    if date_range is not None:
+        return date_range
+    if date_filter:
+        return (date_filter, date_filter)
+    return (get_latest_date(), None)
+
+def load_news_since(date_range, topics, since, until, limit, fields):
+    columns = index_columns()
+    if columns is not None and article_index.version >= until:
+        with timed("index"):
+            records = columns.news_since(date_range[0], date_range[1], topics, since, until, limit)
+        if records and "summary" in fields:
+            add_summaries(records)
+        return records
+    with driver.session(database=DATABASE) as session:
+        return run_query(session, "news_since", date_from=date_range[0] or "",
+                         date_to=date_range[1] or "9999-12-31", topics=list(topics) or None,
+                         since=since, until=until, limit=limit,
+                         with_summary="summary" in fields, with_source="source" in fields)
+
+def news_delta(date_range, topics, since, until, fields=NEWS_FIELDS):
+    """News items of the daily_summary.py batches in (since, until], the article
+    version they bring the client to and whether more remain after it."""
+    records = load_news_since(date_range, topics, since, until, NEWS_MAX_LIMIT, fields)
+    more = len(records) == NEWS_MAX_LIMIT
+    if more:
+        # A version is a whole batch: stop before the last one, which may be cut
+        last = records[-1]["seq"]
+        complete = [record for record in records if record["seq"] < last]
+        if complete:
+            return build_news_items(complete, fields), last - 1, True
+        # A single batch larger than a page is sent whole
+        records = load_news_since(date_range, topics, last - 1, last, sys.maxsize, fields)
+        return build_news_items(records, fields), last, last < until
+    return build_news_items(records, fields), until, False
 
 @app.route('/')
 def index():
     return app.send_static_file('index.html')
 
 @app.route('/api/news', methods=['GET'])
+@cached(response_cache, lambda: CHANGES_POLL_SECONDS if 'since' in request.args
+        else date_ttl(request.args.get('date') or request.args.get('to')))
 def get_news():
-    from flask import request
+    """News for a date (latest by default) or a `from`/`to` range, of any of the repeated `topic`s.
+    Paginated with `limit`/`cursor`, projected with `fields`. With `since` (an article version from
+    /api/changes/version or a previous delta) only the articles added after it."""
     date_filter = request.args.get('date')
-    topic_filter = request.args.get('topic')
+    topics = request.args.getlist('topic')
+    stream = wants_ndjson()
+    try:
+        fields, limit, cursor = parse_news_args(request.args,
+                                                NEWS_STREAM_MAX_LIMIT if stream else NEWS_MAX_LIMIT)
+        date_range = parse_date_range(request.args)
+        since = parse_since(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if date_filter and date_range:
+        return jsonify({"error": "use either date or from/to"}), 400
+    
+    if since is not None:
+        if cursor or stream:
+            return jsonify({"error": "since cannot be combined with cursor or stream"}), 400
+        try:
+            until = change_feed.current()
+            if until is None:
+                raise RuntimeError("data version unavailable")
+            news, version, more = news_delta(delta_range(date_filter, date_range), topics, since,
+                                             until[0], fields)
+        except Exception:
+            log_failure(logger, "Error querying news since %s", since)
+            return jsonify({"error": "unavailable"}), 503
+        return jsonify({"items": news, "version": version, "more": more})
+    # Without paging parameters keep the original plain-list shape
+    paged = 'limit' in request.args or 'cursor' in request.args
+    
+    if stream:
+        try:
+            return stream_news(date_filter, topics, limit, cursor, fields, paged, date_range)
+        except Exception:
+            log_failure(logger, "Error querying Neo4j")
+            return ndjson_response([])
     
-    news = get_news_from_db(date_filter=date_filter, topic_filter=topic_filter)
+    try:
+        news, next_cursor = get_news_from_db(date_filter=date_filter, topics=topics, limit=limit,
+                                             cursor=cursor, fields=fields, date_range=date_range)
+    except Exception:
+        log_failure(logger, "Error querying Neo4j")
+        skip_cache()
+        news, next_cursor = [], None
+    if paged:
+        return jsonify({"items": news, "next_cursor": next_cursor})
     return jsonify(news)
 
+# Articles clustered per request (the filtered set is clustered whole, not paged)
+CLUSTER_MAX_ARTICLES = int(os.getenv("CLUSTER_MAX_ARTICLES", "20000"))
+CLUSTER_FIELDS = ("id", "city", "lat", "lng", "title", "source")
+
+def parse_cluster_filters(args):
+    """Filters shared by /api/news/clusters and its drill-down: (date, topics, date_range). Raises ValueError."""
+    date_range = parse_date_range(args)
+    if args.get('date') and date_range:
+        raise ValueError("use either date or from/to")
+    return args.get('date'), args.getlist('topic'), date_range
+
+def clustered_news(date_filter, topics, date_range):
+    """Every matching article (up to CLUSTER_MAX_ARTICLES) as items with CLUSTER_FIELDS, and their located flags."""
+    records = get_news_records(date_filter, topics, CLUSTER_MAX_ARTICLES, None, CLUSTER_FIELDS, date_range)
+    locations = resolve_locations(records)
+    return build_news_items(records, CLUSTER_FIELDS, locations), [location is not None for location in locations]
+
+@app.route('/api/news/clusters', methods=['GET'])
+@cached(response_cache, lambda: date_ttl(request.args.get('date') or request.args.get('to')))
+def get_news_clusters():
+    """The /api/news articles (same `date`, `from`/`to` and `topic` filters) grouped by geohash cell.
+    `precision` (1-9, default 9: same point) or a web-map `zoom` sets the cell size; `top` titles per cluster."""
+    try:
+        date_filter, topics, date_range = parse_cluster_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        if 'precision' in request.args:
+            precision = int(request.args['precision'])
+        elif 'zoom' in request.args:
+            precision = zoom_precision(int(request.args['zoom']))
+        else:
+            precision = MAX_PRECISION
+        top = int(request.args.get('top', DEFAULT_TOP))
+    except ValueError:
+        return jsonify({"error": "precision, zoom and top must be integers"}), 400
+    precision = max(1, min(precision, MAX_PRECISION))
+    top = max(0, min(top, MAX_TOP))
+    try:
+        items, located = clustered_news(date_filter, topics, date_range)
+    except Exception:
+        log_failure(logger, "Error clustering news")
+        skip_cache()
+        items, located = [], []
+    return jsonify({
+        "precision": precision,
+        "total": len(items),
+        "truncated": len(items) >= CLUSTER_MAX_ARTICLES,
+        "clusters": cluster_items(items, located, precision, top),
+    })
+
+@app.route('/api/news/clusters/<key>', methods=['GET'])
+@cached(response_cache, lambda key: date_ttl(request.args.get('date') or request.args.get('to')))
+def get_news_cluster(key):
+    """Drill-down: the articles of one cluster (its geohash `key`), as /api/news items projected with `fields`."""
+    if not is_geohash(key):
+        return jsonify({"error": "invalid cluster key"}), 400
+    try:
+        date_filter, topics, date_range = parse_cluster_filters(request.args)
+        fields, limit, _ = parse_news_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        records = get_news_records(date_filter, topics, CLUSTER_MAX_ARTICLES, None, fields, date_range)
+        locations = resolve_locations(records)
+        items = [item for item in build_news_items(records, NEWS_FIELDS, locations) if in_cluster(item, key)]
+    except Exception:
+        log_failure(logger, "Error getting cluster %s", key)
+        skip_cache()
+        items = []
+    return jsonify({"key": key, "count": len(items),
+                    "items": [{field: item[field] for field in fields} for item in items[:limit]]})
+
+@app.route('/api/news/<article_id>', methods=['GET'])
+@cached(response_cache, CACHE_TTL_HISTORIC)
+def get_news_detail(article_id):
+    """Full item for one article (id as returned by /api/news)"""
+    try:
+        url = decode_token(article_id)
+        if not isinstance(url, str):
+            raise ValueError("invalid id")
+    except ValueError:
+        return jsonify({"error": "invalid id"}), 400
+    try:
+        with driver.session(database=DATABASE) as session:
+            records = run_query(session, "news_detail", url=url)
+    except Exception:
+        log_failure(logger, "Error getting article detail")
+        skip_cache()
+        return jsonify({"error": "unavailable"}), 503
+    if not records:
+        return jsonify({"error": "not found"}), 404
+    return jsonify(build_news_items(records)[0])
+
+def hecho_item(record):
+    return {
+        "id": record["id"], 
+        "date": record["date"], 
+        "text": record["text"],
+        "macroevento": record["macroevento"] or "Sin clasificar",
+        "newspapers": record["newspapers"]
+    }
+
+def article_item(record):
+    return {
+        "medio": record["medio"],
+        "titulo": record["titulo"],
+        "link": record["link"],
+        "summary": truncate_summary(record["summary"])
+    }
+
+# Loaders run one endpoint query in their own session and raise on failure,
+# so they can be used both by the routes and concurrently by /api/bootstrap.
+
+def load_topics(date_range=None):
+    columns = index_columns()
+    if columns is not None:
+        with timed("index"):
+            return [{"topic": topic, "count": count} for topic, count in columns.topics(*(date_range or (None, None)))]
+    with driver.session(database=DATABASE) as session:
+        if date_range:
+            result = run_query(session, "topics_by_dates", date_from=date_range[0] or "",
+                               date_to=date_range[1] or "9999-12-31")
+        else:
+            result = run_query(session, "topics")
+        return [{"topic": record["topic"], "count": record["count"]} for record in result]
+
+def macro_item(record):
+    return {
+        "nombre": record["nombre"],
+        "descripcion": record["descripcion"],
+        "start": record["start"],
+        "end": record["end"],
+        "hechos": record["hechos"],
+    }
+
+def load_macros():
+    with driver.session(database=DATABASE) as session:
+        return [macro_item(record) for record in run_query(session, "macros")]
+
+def load_macros_timeline(macro_names=()):
+    """Macros as timeline items dated by their first hecho, optionally only `macro_names`."""
+    return [dict(macro, date=macro["start"]) for macro in load_macros()
+            if not macro_names or macro["nombre"] in macro_names]
+
+def load_recent_hechos():
+    with driver.session(database=DATABASE) as session:
+        return [hecho_item(record)
+                for record in run_query(session, "recent_hechos", max_date=RECENT_HECHOS_MAX_DATE)]
+
+def load_hechos_by_date(date):
+    with driver.session(database=DATABASE) as session:
+        return [hecho_item(record) for record in run_query(session, "hechos_by_date", date=date)]
+
+def load_dates(topics=()):
+    columns = index_columns()
+    if columns is not None:
+        with timed("index"):
+            return [{"date": date, "count": count} for date, count in columns.dates(topics)]
+    with driver.session(database=DATABASE) as session:
+        if len(topics) > 1:
+            result = run_query(session, "dates_by_topics", topics=list(topics))
+        elif topics:
+            result = run_query(session, "dates_by_topic", topic=topics[0])
+        else:
+            result = run_query(session, "dates")
+        return [{"date": record["date"], "count": record["count"]} for record in result]
+
+HECHOS_DELTA_LIMIT = 500
+
+def load_hechos_since(since, until, macro_name=None):
+    """Hechos of the Prisma feed updated by hecho_coverage.py runs (since, until], optionally of one macro."""
+    with driver.session(database=DATABASE) as session:
+        return [hecho_item(record) for record in run_query(
+            session, "hechos_since", since=since, until=until, max_date=RECENT_HECHOS_MAX_DATE,
+            macro_name=macro_name, limit=HECHOS_DELTA_LIMIT)]
+
+def timeline_item(record):
+    return {"id": record["id"], "date": record["date"], "text": record["text"]}
+
+def load_timeline(macro_name):
+    with driver.session(database=DATABASE) as session:
+        return [timeline_item(record) for record in run_query(session, "timeline", macro_name=macro_name)]
+
+def load_continuity(macro_name):
+    """The SIGUE_A graph of a macro, read in one traversal and kept in the response cache."""
+    key = f"continuity:{macro_name}"
+    graph = response_cache.get(key)
+    if graph is None:
+        try:
+            with driver.session(database=DATABASE) as session:
+                graph = ContinuityGraph(run_query(session, "continuity", macro_name=macro_name))
+        except Exception:
+            # Any window of the last graph read is better than none
+            graph = response_cache.get_stale(key)
+            if graph is None:
+                raise
+            log_failure(logger, "Error reading continuity of %s; using the previous graph", macro_name)
+            return graph
+        response_cache.set(key, graph, CACHE_TTL_DEFAULT)
+    return graph
+
+def load_hecho_articles(hecho_id):
+    with driver.session(database=DATABASE) as session:
+        return [article_item(record) for record in run_query(session, "hecho_articles", hecho_id=hecho_id)]
+
+def load_hechos_articles(hecho_ids):
+    """Articles of many hechos in one UNWIND query, as {hecho_id: [articles]}"""
+    articles = {hecho_id: [] for hecho_id in hecho_ids}
+    with driver.session(database=DATABASE) as session:
+        for record in run_query(session, "hechos_articles", ids=list(hecho_ids)):
+            articles[record["hecho_id"]].append(article_item(record))
+    return articles
+
 @app.route('/api/topics', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
 def get_topics():
-    """Get all topics with article counts"""
-    query = """
-    MATCH (t:Topic)<-[:TRATA_SOBRE]-(a:Articulo)
-    RETURN t.nombre AS topic, count(a) AS count
-    ORDER BY count DESC
-    LIMIT 50
-    """
+    """Get all topics with article counts, optionally for a `date` or a `from`/`to` range"""
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query)
-            topics = [{"topic": record["topic"], "count": record["count"]} 
-                     for record in result]
-            return jsonify(topics)
-    except Exception as e:
-        print(f"Error getting topics: {e}")
+        date_range = parse_date_range(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get('date'):
+        date_range = (request.args['date'], request.args['date'])
+    try:
+        return jsonify(load_topics(date_range))
+    except Exception:
+        log_failure(logger, "Error getting topics")
+        skip_cache()
+        return jsonify([])
+
+@app.route('/api/macros', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
+def get_macros():
+    """Every EventoMacro with its first and last hecho date and hecho count, oldest first"""
+    try:
+        return jsonify(load_macros())
+    except Exception:
+        log_failure(logger, "Error getting macros")
+        skip_cache()
         return jsonify([])
 
 @app.route('/api/macros/timeline', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
 def get_macros_timeline():
-    """Get the main EventoMacro (Israel-Hamas) with its first Hecho date"""
-    query = """
-    MATCH (m:EventoMacro {nombre: 'Guerra Israel-Hamas 2023'})<-[:PARTE_DE]-(h:Hecho)
-    WITH m, min(h.fecha) as startDate
-    RETURN m.nombre as nombre, m.descripcion as descripcion, startDate
-    """
+    """Every EventoMacro (or the repeated `macro`s) dated by its first hecho, for the global timeline"""
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query)
-            macros = [{"nombre": record["nombre"], "descripcion": record["descripcion"], "date": record["startDate"]} for record in result]
-            return jsonify(macros)
-    except Exception as e:
-        print(f"Error getting macro timeline: {e}")
+        return jsonify(load_macros_timeline(request.args.getlist('macro')))
+    except Exception:
+        log_failure(logger, "Error getting macro timeline")
+        skip_cache()
         return jsonify([])
 
 @app.route('/api/hechos/recent', methods=['GET'])
+@cached(response_cache, lambda: CHANGES_POLL_SECONDS if 'since' in request.args else CACHE_TTL_DEFAULT)
 def get_recent_hechos():
     """Get recent hechos with their articles - for Prisma view, ordered by latest date. 
-       Now resilient to articles without separate Fecha nodes (Dec 2025 data)."""
-    query = """
-    MATCH (h:Hecho)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
-    OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-    WITH h, 
-         collect(DISTINCT p.nombre) as newspapers, 
-         max(COALESCE(f.fecha, a.fecha)) as latestDate
-    WHERE latestDate <= '2025-08-30'
-    OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
-    RETURN h.nombre as id, 
-           COALESCE(h.fecha, latestDate) as date, 
-           h.descripcion as text, 
-           m.nombre as macroevento,
-           newspapers
-    ORDER BY latestDate DESC
-    LIMIT 40
-    """
+       Now resilient to articles without separate Fecha nodes (Dec 2025 data).
+       With `since` (a hechos version) only the hechos updated after it, optionally of one `macro`."""
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query)
-            hechos = [{
-                "id": record["id"], 
-                "date": record["date"], 
-                "text": record["text"],
-                "macroevento": record["macroevento"] or "Sin clasificar",
-                "newspapers": record["newspapers"]
-            } for record in result]
-            return jsonify(hechos)
-    except Exception as e:
-        print(f"Error getting recent hechos: {e}")
-        import traceback
-        traceback.print_exc()
+        since = parse_since(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if since is not None:
+        try:
+            until = change_feed.current()
+            if until is None:
+                raise RuntimeError("data version unavailable")
+            hechos = load_hechos_since(since, until[1], request.args.get('macro'))
+        except Exception:
+            log_failure(logger, "Error getting hechos since %s", since)
+            return jsonify({"error": "unavailable"}), 503
+        # A truncated delta means the client should reload the whole list
+        return jsonify({"items": hechos, "version": until[1], "truncated": len(hechos) >= HECHOS_DELTA_LIMIT})
+    try:
+        return jsonify(load_recent_hechos())
+    except Exception:
+        log_failure(logger, "Error getting recent hechos")
+        skip_cache()
         return jsonify([])
 
 @app.route('/api/hechos/by-date/<date>', methods=['GET'])
+@cached(response_cache, date_ttl)
 def get_hechos_by_date(date):
     """Get all hechos for a specific date to provide scrolling context"""
-    query = """
-    MATCH (h:Hecho)
-    OPTIONAL MATCH (h)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
-    OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-    WITH h, 
-         collect(DISTINCT p.nombre) as newspapers, 
-         COALESCE(h.fecha, max(f.fecha), max(a.fecha)) as hDate
-    WHERE hDate <= $date
-    OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
-    RETURN h.nombre as id, 
-           hDate as date, 
-           h.descripcion as text, 
-           m.nombre as macroevento,
-           newspapers
-    ORDER BY hDate DESC
-    LIMIT 50
-    """
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query, date=date)
-            hechos = [{
-                "id": record["id"], 
-                "date": record["date"], 
-                "text": record["text"],
-                "macroevento": record["macroevento"] or "Sin clasificar",
-                "newspapers": record["newspapers"]
-            } for record in result]
-            return jsonify(hechos)
-    except Exception as e:
-        print(f"Error getting hechos by date: {e}")
+        return jsonify(load_hechos_by_date(date))
+    except Exception:
+        log_failure(logger, "Error getting hechos by date")
+        skip_cache()
         return jsonify([])
 
 @app.route('/api/dates', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
 def get_dates():
-    """Get all available dates with article counts, optionally filtered by topic."""
-    from flask import request
-    topic_filter = request.args.get('topic')
-    
-    date_extract = "substring(COALESCE(f.fecha, a.fecha), 0, 10)"
-    
-    if topic_filter:
-        query = f"""
-        MATCH (a:Articulo)-[:TRATA_SOBRE]->(t:Topic {{nombre: $topic}})
-        OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-        WITH {date_extract} as fechaVal, a
-        WHERE fechaVal IS NOT NULL
-        RETURN fechaVal AS date, count(a) AS count
-        ORDER BY date DESC
-        """
-    else:
-        query = f"""
-        MATCH (a:Articulo)
-        OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
-        WITH {date_extract} as fechaVal, a
-        WHERE fechaVal IS NOT NULL
-        RETURN fechaVal AS date, count(a) AS count
-        ORDER BY date DESC
-        """
+    """Get all available dates with article counts, optionally of any of the repeated `topic`s."""
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query, topic=topic_filter)
-            dates = [{"date": record["date"], "count": record["count"]} 
-                    for record in result]
-            return jsonify(dates)
-    except Exception as e:
-        print(f"Error getting dates: {e}")
+        return jsonify(load_dates(request.args.getlist('topic')))
+    except Exception:
+        log_failure(logger, "Error getting dates")
+        skip_cache()
         return jsonify([])
 
-@app.route('/api/macros', methods=['GET'])
-
 @app.route('/api/timeline/<macro_name>', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
 def get_timeline(macro_name):
     """Get Hecho nodes for a macroevento ordered by date DESC (most recent first)"""
-    query = """
-    MATCH (m:EventoMacro {nombre: $macro_name})<-[:PARTE_DE]-(h:Hecho)
-    OPTIONAL MATCH (h)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EL]->(f:Fecha)
-    WITH h, COALESCE(h.fecha, min(f.fecha)) as eventDate
-    RETURN h.nombre as id, eventDate as date, h.descripcion as text
-    ORDER BY eventDate DESC
-    """
+    if wants_ndjson():
+        try:
+            return stream_records(driver, DATABASE, "timeline", {"macro_name": macro_name},
+                                  lambda records: [timeline_item(record) for record in records])
+        except Exception:
+            log_failure(logger, "Error getting timeline")
+            return ndjson_response([])
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query, macro_name=macro_name)
-            timeline = [{"id": record["id"], "date": record["date"], "text": record["text"]} for record in result]
-            return jsonify(timeline)
-    except Exception as e:
-        print(f"Error getting timeline: {e}")
-        import traceback
-        traceback.print_exc()
+        return jsonify(load_timeline(macro_name))
+    except Exception:
+        log_failure(logger, "Error getting timeline")
+        skip_cache()
         return jsonify([])
 
+CONTINUITY_DEFAULT_LIMIT = 200
+CONTINUITY_MAX_LIMIT = 1000
+
+@app.route('/api/continuity/<macro_name>', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
+def get_continuity(macro_name):
+    """The SIGUE_A chain of a macroevento as an adjacency list: each hecho with the hechos it
+    `follows` and is `followed_by`, oldest first. Windowed by `from`/`to` and paged with `limit`/`cursor`."""
+    try:
+        limit = int(request.args.get('limit', CONTINUITY_DEFAULT_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    try:
+        date_range = parse_date_range(request.args) or (None, None)
+        cursor = decode_token(request.args['cursor']) if request.args.get('cursor') else None
+        if cursor is not None and not (isinstance(cursor, list) and len(cursor) == 2
+                                       and all(isinstance(c, str) for c in cursor)):
+            raise ValueError("invalid cursor")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    limit = max(1, min(limit, CONTINUITY_MAX_LIMIT))
+    try:
+        graph = load_continuity(macro_name)
+    except Exception:
+        log_failure(logger, "Error getting continuity of %s", macro_name)
+        skip_cache()
+        return jsonify({"error": "unavailable"}), 503
+    if not len(graph):
+        return jsonify({"error": "not found"}), 404
+    items, next_cursor = graph.window(date_range[0], date_range[1], cursor, limit)
+    return jsonify({
+        "macro": macro_name,
+        "start": graph.start,
+        "end": graph.end,
+        "hechos": len(graph),
+        "links": graph.links,
+        "items": items,
+        "next_cursor": encode_token(next_cursor) if next_cursor else None,
+    })
+
 @app.route('/api/hecho/<hecho_id>/articles', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
 def get_hecho_articles(hecho_id):
     """Get articles associated with a specific fact, grouped by newspaper"""
-    query = """
-    MATCH (h:Hecho {nombre: $hecho_id})<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
-    RETURN p.nombre as medio, a.titulo as titulo, a.url as link, a.contenido as summary
-    """
     try:
-        with driver.session(database=DATABASE) as session:
-            result = session.run(query, hecho_id=hecho_id)
-            articles = []
-            for record in result:
-                articles.append({
-                    "medio": record["medio"],
-                    "titulo": record["titulo"],
-                    "link": record["link"],
-                    "summary": (record["summary"][:500] + "...") if record["summary"] and len(record["summary"]) > 500 else (record["summary"] or "Sin resumen")
-                })
-            return jsonify(articles)
-    except Exception as e:
-        print(f"Error getting hecho articles: {e}")
+        return jsonify(load_hecho_articles(hecho_id))
+    except Exception:
+        log_failure(logger, "Error getting hecho articles")
+        skip_cache()
         return jsonify([])
 
+@app.route('/api/hechos/articles', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
+def get_hechos_articles():
+    """Articles of several facts at once: ?ids=a&ids=b -> {"a": [...], "b": [...]}"""
+    hecho_ids = list(dict.fromkeys(request.args.getlist('ids')))
+    if not hecho_ids or len(hecho_ids) > MAX_BULK_IDS:
+        return jsonify({"error": f"between 1 and {MAX_BULK_IDS} ids are required"}), 400
+    try:
+        return jsonify(load_hechos_articles(hecho_ids))
+    except Exception:
+        log_failure(logger, "Error getting articles for hechos")
+        skip_cache()
+        return jsonify({})
+
+# Full-text search on the Neo4j fulltext indexes created by schema.py. With
+# SEARCH_BACKEND=auto (the default) a server without fulltext procedures or
+# indexes switches to the in-process index of search.py, loaded on first use;
+# SEARCH_BACKEND=memory always uses it and SEARCH_BACKEND=fulltext never does.
+search_backend = os.getenv("SEARCH_BACKEND", "auto")
+SEARCH_INDEX_REFRESH = int(os.getenv("SEARCH_INDEX_REFRESH", "300"))
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_TYPES = ("articles", "hechos")
+search_index = None
+search_index_lock = threading.Lock()
+
+def fulltext_unavailable(error):
+    """Whether a Neo4j error means the server has no fulltext procedures or no fulltext index."""
+    return isinstance(error, ClientError) and (
+        error.code == "Neo.ClientError.Procedure.ProcedureNotFound"
+        or "no such fulltext" in (error.message or "").lower())
+
+def get_search_index():
+    """The in-process search index, started on first use; None until it has loaded."""
+    global search_index
+    with search_index_lock:
+        if search_index is None:
+            search_index = SearchIndex()
+            search_index.start(lambda: driver, DATABASE, interval=SEARCH_INDEX_REFRESH)
+    return search_index if search_index.ready else None
+
+def parse_search_args(args):
+    """(text, kind, date_range, limit, cursor) of /api/search; raises ValueError with a client-facing message."""
+    text = (args.get('q') or '').strip()
+    if not 2 <= len(text) <= 200:
+        raise ValueError("q must have between 2 and 200 characters")
+    kind = args.get('type', 'articles')
+    if kind not in SEARCH_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(SEARCH_TYPES)}")
+    date_range = parse_date_range(args)
+    if args.get('date'):
+        if date_range:
+            raise ValueError("use either date or from/to")
+        if not DATE_PATTERN.match(args['date']):
+            raise ValueError("date must be YYYY-MM-DD")
+        date_range = (args['date'], args['date'])
+    try:
+        limit = int(args.get('limit', SEARCH_DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    cursor = None
+    if args.get('cursor'):
+        cursor = decode_token(args['cursor'])
+        if not (isinstance(cursor, list) and len(cursor) == 2 and isinstance(cursor[0], (int, float))
+                and not isinstance(cursor[0], bool) and isinstance(cursor[1], str)):
+            raise ValueError("invalid cursor")
+    return text, kind, date_range or (None, None), limit, cursor
+
+def search_fulltext(kind, query, date_range, topics, sources, cursor, limit):
+    with driver.session(database=DATABASE) as session:
+        return [dict(record) for record in run_query(
+            session, f"search_{kind}", query=query, date_from=date_range[0], date_to=date_range[1],
+            topics=topics or None, sources=sources or None, cursor_score=cursor[0] if cursor else None,
+            cursor_key=cursor[1] if cursor else None, limit=limit)]
+
+def search_memory(index, kind, groups, date_range, topics, sources, cursor, limit):
+    """Rows of the in-process index; article contents are read from Neo4j for the page only."""
+    records = index.search(kind, groups, date_range[0], date_range[1], topics, sources, cursor, limit)
+    if kind == "articles" and records:
+        with driver.session(database=DATABASE) as session:
+            contents = {record["url"]: record["summary"] for record in
+                        run_query(session, "news_summaries", urls=[record["key"] for record in records])}
+        for record in records:
+            record["content"] = contents.get(record["key"])
+    return records
+
+def search_item(kind, record, terms):
+    """API item of a search row, with the matched words of its title and a snippet of its text in <mark>."""
+    if kind == "articles":
+        return {
+            "type": "article",
+            "id": encode_token(record["key"]),
+            "url": record["key"],
+            "title": record["title"],
+            "date": record["date"],
+            "source": record["source"],
+            "score": round(record["score"], 4),
+            "highlight": {"title": highlight(record["title"], terms),
+                          "text": highlight(record["content"], terms, SNIPPET_CHARS)},
+        }
+    return {
+        "type": "hecho",
+        "id": record["key"],
+        "date": record["date"],
+        "macroevento": record["macroevento"] or "Sin clasificar",
+        "newspapers": record["newspapers"],
+        "score": round(record["score"], 4),
+        "highlight": {"title": highlight(record["key"], terms),
+                      "text": highlight(record["content"], terms, SNIPPET_CHARS)},
+    }
+
+@app.route('/api/search', methods=['GET'])
+@cached(response_cache, CACHE_TTL_DEFAULT)
+def get_search():
+    """Full-text search of articles (title and content) or, with `type=hechos`, hechos (name and
+    description) for `q`. Every word must match; "quoted phrases" match as phrases. Filtered by
+    `date` or `from`/`to` and the repeated `topic` and `source`, by relevance, paged with `limit`/`cursor`."""
+    global search_backend
+    try:
+        text, kind, date_range, limit, cursor = parse_search_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    groups, query = parse_query(text)
+    if not groups:
+        return jsonify({"error": "q has no searchable words"}), 400
+    topics = request.args.getlist('topic')
+    sources = request.args.getlist('source')
+
+    records = None
+    if search_backend != "memory":
+        try:
+            records = search_fulltext(kind, query, date_range, topics, sources, cursor, limit + 1)
+        except Exception as e:
+            if not (search_backend == "auto" and fulltext_unavailable(e)):
+                log_failure(logger, "Error searching %s", kind)
+                return jsonify({"error": "unavailable"}), 503
+            logger.warning("Fulltext search is not available (%s); using the in-process search index", e.code)
+            search_backend = "memory"
+    if records is None:
+        index = get_search_index()
+        if index is None:
+            response = jsonify({"error": "search index loading"})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+        try:
+            with timed("search"):
+                records = search_memory(index, kind, groups, date_range, topics, sources, cursor, limit + 1)
+        except Exception:
+            log_failure(logger, "Error searching %s", kind)
+            return jsonify({"error": "unavailable"}), 503
+
+    terms = {term for group in groups for term in group}
+    page = records[:limit]
+    next_cursor = [page[-1]["score"], page[-1]["key"]] if len(records) > limit else None
+    return jsonify({
+        "query": text,
+        "type": kind,
+        "backend": "memory" if search_backend == "memory" else "fulltext",
+        "items": [search_item(kind, record, terms) for record in page],
+        "next_cursor": encode_token(next_cursor) if next_cursor else None,
+    })
+
+@app.route('/api/bootstrap', methods=['GET'])
+@cached(response_cache, CACHE_TTL_LATEST)
+def get_bootstrap():
+    """Everything the first screen needs in one document. The independent
+    queries run concurrently, each in its own session. Accepts the /api/news
+    parameters `date`, `topic` and `fields`. `version` is where live updates
+    (/api/changes/stream) start from."""
+    try:
+        fields, limit, _ = parse_news_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    date_filter = request.args.get('date') or get_latest_date()
+    topics = request.args.getlist('topic')
+    # Read before the data: live updates resume from here and repeated items are deduplicated
+    version = change_feed.current()
+
+    loaders = {
+        "dates": (load_dates, topics),
+        "topics": (load_topics,),
+        "news": (lambda: get_news_from_db(date_filter, topics, limit=limit, fields=fields)[0],),
+        "macros": (load_macros_timeline,),
+        "timeline": (load_timeline, MAIN_MACRO),
+        "hechos": (load_recent_hechos,),
+    }
+    # Each loader runs in a copy of this request's context, so its query time
+    # still counts towards the request's Server-Timing
+    futures = {name: bootstrap_executor.submit(contextvars.copy_context().run, *call)
+               for name, call in loaders.items()}
+    document = {"date": date_filter, "version": format_version(version) if version else None, "errors": []}
+    for name, future in futures.items():
+        try:
+            document[name] = future.result()
+        except Exception:
+            log_failure(logger, "Error loading %s for bootstrap", name)
+            document[name] = []
+            document["errors"].append(name)
+    if document["errors"]:
+        skip_cache()
+    return jsonify(document)
+
+@app.route('/api/changes/version', methods=['GET'])
+def get_data_version():
+    """Current data version: `articles` for /api/news?since=, `hechos` for /api/hechos/recent?since="""
+    version = change_feed.current()
+    if version is None:
+        return jsonify({"error": "unavailable"}), 503
+    return jsonify({"version": format_version(version), "articles": version[0], "hechos": version[1]})
+
+def sse_event(event, data, event_id=None):
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+def change_events(known, version, date_filter, topics, date_range, fields, macro_name):
+    """SSE events bringing a client from version `known` to `version`. Each delta is computed
+    once for all the subscribers with the same filters (change_feed.shared)."""
+    if version[0] < known[0] or version[1] < known[1]:
+        # The data was reloaded: the client has to start over
+        yield sse_event("version", {"version": format_version(version), "reset": True}, format_version(version))
+        return
+    if version[0] > known[0]:
+        dates = delta_range(date_filter, date_range)
+        since = known[0]
+        while True:
+            key = ("news", dates, tuple(topics), fields, since, version[0])
+            items, since, more = change_feed.shared(
+                key, lambda: news_delta(dates, topics, since, version[0], fields))
+            if items:
+                yield sse_event("news", {"items": items})
+            if not more:
+                break
+    if version[1] > known[1]:
+        hechos = change_feed.shared(("hechos", macro_name, known[1], version[1]),
+                                    lambda: load_hechos_since(known[1], version[1], macro_name))
+        if hechos:
+            yield sse_event("hechos", {"items": hechos, "truncated": len(hechos) >= HECHOS_DELTA_LIMIT})
+    yield sse_event("version", {"version": format_version(version), "articles": version[0], "hechos": version[1]},
+                    format_version(version))
+
+@app.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    """Server-sent events with the news (same `date`, `from`/`to`, `topic` and `fields` as /api/news)
+    and the Prisma hechos (optionally of one `macro`) added since the client's version. The version
+    comes from `Last-Event-ID` on reconnects or `since=A.H`; without it the stream starts now."""
+    date_filter = request.args.get('date')
+    topics = request.args.getlist('topic')
+    macro_name = request.args.get('macro')
+    try:
+        fields, _, _ = parse_news_args(request.args)
+        date_range = parse_date_range(request.args)
+        if date_filter and not DATE_PATTERN.match(date_filter):
+            raise ValueError("date must be YYYY-MM-DD")
+        since = request.headers.get('Last-Event-ID') or request.args.get('since')
+        known = parse_version(since) if since else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if date_filter and date_range:
+        return jsonify({"error": "use either date or from/to"}), 400
+
+    version = change_feed.current()
+    if version is None:
+        return jsonify({"error": "unavailable"}), 503
+    if not change_feed.subscribe():
+        # Clients fall back to polling with since=
+        response = jsonify({"error": "too many live clients"})
+        response.headers["Retry-After"] = str(SSE_MAX_SECONDS)
+        return response, 503
+
+    def generate():
+        current = known or version
+        yield f"retry: {CHANGES_POLL_SECONDS * 1000}\n\n"
+        yield sse_event("version", {"version": format_version(current), "articles": current[0],
+                                    "hechos": current[1]}, format_version(current))
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        latest = version
+        while True:
+            if latest != current:
+                try:
+                    yield from change_events(current, latest, date_filter, topics, date_range, fields, macro_name)
+                    current = latest
+                except Exception:
+                    # The client reconnects after `retry` and resumes from its last version
+                    log_failure(logger, "Error sending changes")
+                    return
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            latest = change_feed.wait(current, min(SSE_KEEPALIVE_SECONDS, remaining))
+            if latest == current:
+                yield ": ping\n\n"
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    # Runs when the server closes the response, even if the client left before the first event
+    response.call_on_close(change_feed.unsubscribe)
+    return response
+
+def is_admin_request():
+    # Fail closed: without ADMIN_TOKEN the admin endpoints are disabled. The
+    # client address is no proof, behind a local proxy every request is 127.0.0.1
+    if not ADMIN_TOKEN:
+        return False
+    # Prometheus sends the token as `Authorization: Bearer ...`
+    return ADMIN_TOKEN in (request.headers.get('X-Admin-Token'),
+                           request.headers.get('Authorization', '').removeprefix('Bearer '))
+
+@app.route('/api/admin/cache', methods=['GET'])
+def get_cache_stats():
+    """Cache hit/miss counters and the state of the Neo4j circuit breaker"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    stats = response_cache.stats()
+    stats["breaker"] = breaker.stats()
+    if snapshot is not None:
+        stats["snapshot"] = snapshot.stats()
+    return jsonify(stats)
+
+@app.route('/api/admin/queries', methods=['GET'])
+def get_query_stats():
+    """Per-query call count, rows and timing since startup"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify(query_stats.snapshot())
+
+@app.route('/api/admin/profiler', methods=['GET', 'POST'])
+def profiler_settings():
+    """Profiler status; POST ?enabled=1|0 and optional ?slow_ms= to change it"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    if request.method == 'POST':
+        try:
+            slow_ms = int(request.args['slow_ms']) if 'slow_ms' in request.args else None
+        except ValueError:
+            return jsonify({"error": "slow_ms must be an integer"}), 400
+        enabled = request.args.get('enabled')
+        profiler.configure(enabled=None if enabled is None else enabled == '1', slow_ms=slow_ms)
+        logger.info("Profiler %s (slow_ms=%d)", "enabled" if profiler.enabled else "disabled", profiler.slow_ms)
+    return jsonify(profiler.stats())
+
+@app.route('/api/admin/index', methods=['GET', 'POST'])
+def article_index_settings():
+    """Article index status; POST refreshes it now (`full=1` reloads everything, e.g. after reclassifying topics)"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    if article_index is None:
+        return jsonify({"error": "article index disabled"}), 404
+    if request.method == 'POST':
+        try:
+            added = article_index.refresh(driver, DATABASE, full=request.args.get('full') == '1')
+        except Exception:
+            log_failure(logger, "Error refreshing the article index")
+            return jsonify({"error": "unavailable"}), 503
+        return jsonify(dict(article_index.stats(), added=added))
+    return jsonify(article_index.stats())
+
+def refresh_indexes():
+    """Pick up the new articles in the in-memory indexes before dropping the responses built from them."""
+    if article_index is not None:
+        try:
+            article_index.refresh(driver, DATABASE)
+        except Exception:
+            log_failure(logger, "Error refreshing the article index")
+    if search_index is not None and search_index.ready:
+        try:
+            search_index.refresh(driver, DATABASE)
+        except Exception:
+            log_failure(logger, "Error refreshing the search index")
+
+# The other workers see the invalidation through the generation file and
+# refresh their own indexes in the background, then drop their responses
+response_cache.add_listener(refresh_indexes)
+
+@app.route('/api/admin/cache/invalidate', methods=['POST'])
+def invalidate_cache():
+    """Drop cached responses after an ingest. Optional `prefix`, e.g. /api/news"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    refresh_indexes()
+    removed = response_cache.invalidate(request.args.get('prefix'))
+    return jsonify({"invalidated": removed})
+
+def collect_cache_metrics():
+    stats = response_cache.stats()
+    yield "prisma_cache_hits_total", "counter", "Response cache hits.", stats["hits"]
+    yield "prisma_cache_misses_total", "counter", "Response cache misses.", stats["misses"]
+    yield "prisma_cache_entries", "gauge", "Responses currently cached.", stats["entries"]
+    yield "prisma_cache_invalidations_total", "counter", "Cache invalidations.", stats["invalidations"]
+    yield "prisma_cache_stale_hits_total", "counter", "Stale responses served while Neo4j failed.", stats["stale_hits"]
+    if snapshot is not None:
+        stats = snapshot.stats()
+        yield "prisma_snapshot_hits_total", "counter", "Responses served from the static snapshot.", stats["hits"]
+        yield "prisma_snapshot_misses_total", "counter", "Requests not found in the snapshot.", stats["misses"]
+
+metrics.collector(collect_cache_metrics)
+
+def collect_change_metrics():
+    stats = change_feed.stats()
+    yield "prisma_live_clients", "gauge", "Open /api/changes/stream connections.", stats["clients"]
+    yield "prisma_data_version_polls_total", "counter", "Data version reads by the change feed.", stats["polls"]
+    yield "prisma_data_version_changes_total", "counter", "Data version changes seen.", stats["changes"]
+
+metrics.collector(collect_change_metrics)
+
+def collect_breaker_metrics():
+    stats = breaker.stats()
+    is_open = int(stats["state"] != "closed")
+    yield "prisma_db_circuit_open", "gauge", "1 while the Neo4j circuit breaker is not closed.", is_open
+    yield "prisma_db_circuit_opens_total", "counter", "Times the Neo4j circuit breaker opened.", stats["opens"]
+    yield "prisma_db_circuit_rejected_total", "counter", "Queries rejected by the open breaker.", stats["rejected"]
+    retries = sum(query["retries"] for query in query_stats.snapshot().values())
+    yield "prisma_query_retries_total", "counter", "Queries run again after a transient error.", retries
+
+metrics.collector(collect_breaker_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text format: route and query latency histograms, query records and errors, cache counters"""
+    if not is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == '__main__':
-    print(f"Connecting to Neo4j at {URI}")
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server; use serve.py in production
+    logger.info("Connecting to Neo4j at %s", URI)
+    app.run(host='0.0.0.0', port=5000, debug=os.getenv("FLASK_DEBUG", "1") == "1", threaded=True)
@@ -0,0 +1,328 @@
+"""
+Optional in-process columnar index of articles for faceted browsing.
+
+With ARTICLE_INDEX=1 (and NumPy installed) every dated article is loaded into
+NumPy columns: day ordinal, source id, city and coordinates, plus per-topic
+lists of article positions. Rows are kept sorted by (date DESC, url ASC), the
+order of /api/news, so a date range is a slice, a topic filter is a merge of
+sorted position arrays and date/topic facets are counts over them. /api/news,
+/api/dates and /api/topics, including multi-topic and date-range filters, are
+answered without Neo4j; it is still asked for article summaries.
+
+New articles are appended incrementally, in the order daily_summary.py
+processed them (its batch number, a.resumen_seq, then url), up to its last
+batch. Reclassified topics or
+deleted articles need a full reload. Every load builds a new immutable
+Columns object and swaps it in, so readers never take a lock.
+"""
+import bisect
+import datetime
+import logging
+import threading
+import time
+
+from location_extractor import extract_locations
+from queries import run_query
+from resilience import log_failure
+
+try:
+    import numpy as np
+except ImportError:  # optional: the API queries Neo4j instead
+    np = None
+
+logger = logging.getLogger(__name__)
+
+TOP_TOPICS = 50
+
+
+def available():
+    return np is not None
+
+
+def to_ordinal(date):
+    return datetime.date.fromisoformat(date).toordinal()
+
+
+class Columns:
+    """
+    One immutable snapshot of the index. Positions are row numbers in
+    (date DESC, url ASC) order; every column is given already in that order
+    and topic_positions[t] are the sorted positions of topic t.
+    """
+
+    def __init__(self, seqs, urls, titles, day, source, city, lat, lng, topic_positions,
+                 topic_names, source_names, city_names):
+        self.seqs = seqs
+        self.urls = urls
+        self.titles = titles
+        self.day = day
+        self.neg_day = -day
+        self.source = source
+        self.city = city
+        self.lat = lat
+        self.lng = lng
+        self.topic_positions = topic_positions
+        self.topic_names = topic_names
+        self.source_names = source_names
+        self.city_names = city_names
+        self.topic_ids = {name: i for i, name in enumerate(topic_names)}
+        # `day` is sorted (descending): count the runs instead of sorting it again
+        ascending = day[::-1]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(ascending)) + 1]) if len(day) else np.empty(0, np.int64)
+        self.days = ascending[starts]
+        self.day_counts = np.diff(np.append(starts, len(day)))
+
+    def __len__(self):
+        return len(self.urls)
+
+    def latest_date(self):
+        return datetime.date.fromordinal(int(self.day[0])).isoformat() if len(self) else None
+
+    def _bounds(self, date_from, date_to):
+        """[start, end) positions of the articles between the two dates (either may be None)."""
+        start = 0 if date_to is None else int(np.searchsorted(self.neg_day, -to_ordinal(date_to), "left"))
+        end = len(self) if date_from is None else int(np.searchsorted(self.neg_day, -to_ordinal(date_from), "right"))
+        return start, max(start, end)
+
+    def _after_cursor(self, cursor):
+        """First position after the article at keyset cursor [date, url]."""
+        first, last = self._bounds(cursor[0], cursor[0])
+        return bisect.bisect_right(self.urls, cursor[1], first, last)
+
+    def _topic_positions(self, topics, start, end, limit=None):
+        """Sorted positions in [start, end) of articles with any of `topics`."""
+        parts = []
+        for topic in topics:
+            positions = self.topic_positions[self.topic_ids[topic]] if topic in self.topic_ids else None
+            if positions is None:
+                continue
+            lo, hi = np.searchsorted(positions, [start, end])
+            parts.append(positions[lo:hi if limit is None else min(hi, lo + limit)])
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def news(self, date_from, date_to, topics, cursor, limit):
+        """One page of records shaped like the rows of the `news` query."""
+        start, end = self._bounds(date_from, date_to)
+        if cursor is not None:
+            start = max(start, self._after_cursor(cursor))
+        if topics:
+            positions = self._topic_positions(topics, start, end, limit)[:limit]
+        else:
+            positions = range(start, min(end, start + limit))
+        return [self.record(int(i)) for i in positions]
+
+    def news_since(self, date_from, date_to, topics, since, until, limit):
+        """Records of the articles of the batches in (since, until], oldest batch first, like `news_since`."""
+        start, end = self._bounds(date_from, date_to)
+        positions = self._topic_positions(topics, start, end) if topics else np.arange(start, end)
+        seqs = self.seqs[positions]
+        positions = positions[(seqs > since) & (seqs <= until)]
+        positions = positions[np.argsort(self.seqs[positions], kind="stable")][:limit]
+        return [dict(self.record(int(i)), seq=int(self.seqs[i])) for i in positions]
+
+    def record(self, i):
+        city = int(self.city[i])
+        return {
+            "title": self.titles[i],
+            "summary": None,
+            "url": self.urls[i],
+            "source": self.source_names[self.source[i]] if self.source[i] >= 0 else None,
+            "date": datetime.date.fromordinal(int(self.day[i])).isoformat(),
+            "geocoded": 1,
+            "city": self.city_names[city] if city >= 0 else None,
+            "lat": float(self.lat[i]) if city >= 0 else None,
+            "lng": float(self.lng[i]) if city >= 0 else None,
+        }
+
+    def dates(self, topics=None):
+        """[(date, count)] newest first, counting articles with any of `topics`."""
+        if topics:
+            days, counts = np.unique(self.day[self._topic_positions(topics, 0, len(self))], return_counts=True)
+        else:
+            days, counts = self.days, self.day_counts
+        return [(datetime.date.fromordinal(int(day)).isoformat(), int(count))
+                for day, count in zip(days[::-1], counts[::-1])]
+
+    def topics(self, date_from=None, date_to=None):
+        """[(topic, count)] of the articles in the date range, most frequent first."""
+        start, end = self._bounds(date_from, date_to)
+        counts = [(name, int(np.searchsorted(positions, end) - np.searchsorted(positions, start)))
+                  for name, positions in zip(self.topic_names, self.topic_positions)]
+        counts = [(name, count) for name, count in counts if count]
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return counts[:TOP_TOPICS]
+
+
+class ArticleIndex:
+    """Loads and refreshes a Columns snapshot from Neo4j; `columns` is None until the first load ends."""
+
+    def __init__(self, batch_size=10000):
+        self.batch_size = batch_size
+        self.columns = None
+        # Last daily_summary.py batch loaded
+        self.version = 0
+        self.loaded_at = None
+        self.load_seconds = None
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.columns is not None
+
+    def refresh(self, driver, database, full=False):
+        """Append the articles processed since the last load (or reload everything). Returns the count added."""
+        with self._lock:
+            start = time.perf_counter()
+            base = None if full else self.columns
+            # Keyset (seq, elementId) of the last article read; no key: from the batch after `last_seq`
+            last_seq, last_key = (0 if base is None else self.version), None
+            with driver.session(database=database) as session:
+                max_seq = run_query(session, "index_state")[0]["version"] or 0
+                rows = []
+                while last_seq < max_seq or last_key is not None:
+                    batch = run_query(session, "index_articles", last_seq=last_seq, last_key=last_key,
+                                      max_seq=max_seq, limit=self.batch_size)
+                    rows.extend(self._rows(batch))
+                    if len(batch) < self.batch_size:
+                        break
+                    last_seq, last_key = batch[-1]["seq"], batch[-1]["key"]
+            if base is None or rows:
+                self.columns = self._build(base, rows)
+            # Every article up to max_seq has been seen, dated or not
+            self.version = max_seq
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - start
+            if rows:
+                logger.info("Article index: %d articles added (%d total) in %.1f s",
+                            len(rows), len(self.columns), self.load_seconds)
+            return len(rows)
+
+    def _rows(self, batch):
+        # Articles not yet geolocated by geocode_articles.py are extracted once, here
+        pending = [record for record in batch if record["geocoded"] is None and record["date"]]
+        extracted = iter(extract_locations(
+            (record["title"] or "", record["content"] or "") for record in pending
+        ))
+        rows = []
+        for record in batch:
+            if not record["date"]:
+                continue
+            if record["geocoded"] is None:
+                location = next(extracted)
+            elif record["city"] is not None:
+                location = {"city": record["city"], "lat": record["lat"], "lng": record["lng"]}
+            else:
+                location = None
+            try:
+                day = to_ordinal(record["date"])
+            except ValueError:
+                continue
+            rows.append((record["seq"], record["url"] or "", record["title"], day, record["source"],
+                         record["topics"], location))
+        return rows
+
+    def _build(self, base, rows):
+        """
+        A new snapshot: `base` (or nothing) plus `rows`. Only the new rows are
+        sorted; they are merged into the base's order, whose topic positions
+        are shifted rather than recomputed.
+        """
+        if base is None:
+            base = Columns(np.empty(0, dtype=np.int64), [], [], np.empty(0, dtype=np.int32),
+                           np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32),
+                           np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64), [], [], [], [])
+        topic_names, source_names, city_names = list(base.topic_names), list(base.source_names), list(base.city_names)
+        topic_ids = {name: i for i, name in enumerate(topic_names)}
+        source_ids = {name: i for i, name in enumerate(source_names)}
+        city_ids = {name: i for i, name in enumerate(city_names)}
+
+        def encode(ids_by_name, names, name):
+            if name is None:
+                return -1
+            if name not in ids_by_name:
+                ids_by_name[name] = len(names)
+                names.append(name)
+            return ids_by_name[name]
+
+        rows = sorted(rows, key=lambda row: (-row[3], row[1]))
+        # Old row before which each new row goes: after the old rows with the same (date, url) or smaller
+        if len(base):
+            neg_days = -np.array([row[3] for row in rows], dtype=np.int32)
+            firsts = np.searchsorted(base.neg_day, neg_days, "left").tolist()
+            lasts = np.searchsorted(base.neg_day, neg_days, "right").tolist()
+            inserts = np.array([bisect.bisect_right(base.urls, row[1], first, last)
+                                for row, first, last in zip(rows, firsts, lasts)], dtype=np.int64)
+        else:
+            inserts = np.zeros(len(rows), dtype=np.int64)
+        old_positions = np.arange(len(base)) + np.searchsorted(inserts, np.arange(len(base)), "right")
+        new_positions = inserts + np.arange(len(rows))
+        total = len(base) + len(rows)
+
+        def merged_list(old, new):
+            if not old:
+                return list(new)
+            values, previous = [], 0
+            for position, value in zip(inserts.tolist(), new):
+                values.extend(old[previous:position])
+                values.append(value)
+                previous = position
+            values.extend(old[previous:])
+            return values
+
+        def merged_array(old, new, dtype):
+            values = np.empty(total, dtype=dtype)
+            values[old_positions] = old
+            values[new_positions] = np.array(new, dtype=dtype)
+            return values
+
+        new_topic_rows = {}
+        for j, (_, _, _, _, _, topics, _) in enumerate(rows):
+            for topic in set(topics or ()):
+                new_topic_rows.setdefault(encode(topic_ids, topic_names, topic), []).append(j)
+        topic_positions = [old_positions[positions] for positions in base.topic_positions]
+        topic_positions += [np.empty(0, dtype=np.int64)] * (len(topic_names) - len(topic_positions))
+        for topic, new_rows in new_topic_rows.items():
+            topic_positions[topic] = np.sort(np.concatenate([topic_positions[topic], new_positions[new_rows]]))
+
+        locations = [row[6] for row in rows]
+        return Columns(
+            merged_array(base.seqs, [row[0] for row in rows], np.int64),
+            merged_list(base.urls, [row[1] for row in rows]),
+            merged_list(base.titles, [row[2] or "" for row in rows]),
+            merged_array(base.day, [row[3] for row in rows], np.int32),
+            merged_array(base.source, [encode(source_ids, source_names, row[4]) for row in rows], np.int32),
+            merged_array(base.city, [encode(city_ids, city_names, location["city"]) if location else -1
+                                     for location in locations], np.int32),
+            merged_array(base.lat, [location["lat"] if location else 0.0 for location in locations], np.float64),
+            merged_array(base.lng, [location["lng"] if location else 0.0 for location in locations], np.float64),
+            topic_positions, topic_names, source_names, city_names)
+
+    def start(self, get_driver, database, interval=60):
+        """Load in a background thread, then refresh every `interval` seconds (0: load only)."""
+        def run():
+            while True:
+                try:
+                    self.refresh(get_driver(), database)
+                except Exception:
+                    self.errors += 1
+                    log_failure(logger, "Error refreshing the article index")
+                if interval <= 0 and self.ready:
+                    return
+                time.sleep(interval if interval > 0 else 30)
+
+        threading.Thread(target=run, name="article-index", daemon=True).start()
+
+    def stats(self):
+        columns = self.columns
+        return {
+            "ready": columns is not None,
+            "articles": len(columns) if columns is not None else 0,
+            "topics": len(columns.topic_names) if columns is not None else 0,
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "errors": self.errors,
+        }
@@ -0,0 +1,337 @@
+"""
+In-process LRU/TTL cache for API responses.
+
+Responses are keyed on the request path plus its normalized query string, so
+the `t=` cache-buster appended by script.js does not defeat the cache. Each
+entry keeps the serialized JSON, its ETag and the compressed variants, so a
+hit never re-serializes or re-compresses.
+
+Expired entries are kept for `stale_ttl` more seconds. When a view cannot
+answer (it fell back on an error, returned a 5xx, or the database circuit
+breaker is open) the last good response is served instead, marked with
+`X-Cache: STALE` and a `Warning: 110` header, so a database outage degrades
+to slightly old data instead of empty lists.
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import Response, g, make_response, request
+
+from instrumentation import timed
+from streaming import wants_ndjson
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Query parameters that never change the response
+IGNORED_PARAMS = {"t"}
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+ENCODINGS = ["br", "gzip"] if brotli else ["gzip"]
+
+
+class CachedBody:
+    """A serialized JSON body with its validator and lazily compressed variants."""
+
+    def __init__(self, body, ttl=0):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.expires = time.monotonic() + ttl
+        self._encoded = {}
+
+    def max_age(self):
+        return max(0, int(self.expires - time.monotonic()))
+
+    def encoded(self, encoding):
+        data = self._encoded.get(encoding)
+        if data is None:
+            with timed("compress"):
+                if encoding == "br":
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = data
+        return data
+
+
+def negotiate_encoding(size):
+    """Best encoding the client accepts for a body of `size` bytes, or None."""
+    if size < MIN_COMPRESS_SIZE:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def apply_conditional(response, entry):
+    """
+    Turn `response` into the representation of `entry` for this request:
+    304 if If-None-Match matches, otherwise the best compressed body.
+    """
+    response.set_etag(entry.etag, weak=True)
+    response.vary.add("Accept-Encoding")
+    response.vary.add("Accept")
+    max_age = entry.max_age()
+    response.headers["Cache-Control"] = f"public, max-age={max_age}" if max_age else "no-cache"
+
+    if request.if_none_match.contains_weak(entry.etag):
+        response.status_code = 304
+        response.set_data(b"")
+        return response
+
+    encoding = negotiate_encoding(len(entry.body))
+    if encoding:
+        response.set_data(entry.encoded(encoding))
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response.set_data(entry.body)
+    return response
+
+
+def finalize_api_response(response):
+    """after_request hook: ETag, conditional GET and compression for uncached /api JSON."""
+    if (request.path.startswith("/api/") and request.method == "GET"
+            and response.status_code == 200 and response.mimetype == "application/json"
+            and not response.is_streamed and "ETag" not in response.headers
+            and "Content-Encoding" not in response.headers):
+        apply_conditional(response, CachedBody(response.get_data()))
+    return response
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU with per-entry TTL. When several worker processes serve the
+    app, `generation_file` is shared between them: invalidating in one worker
+    touches it, and the others drop their entries when they see it change.
+    Entries stay available to get_stale() for `stale_ttl` seconds after they
+    expire; `available()` tells cached views whether the backend is worth
+    calling at all.
+    """
+
+    # Seconds between checks of the generation file
+    GENERATION_CHECK_INTERVAL = 1.0
+
+    def __init__(self, max_entries=1024, generation_file=None, stale_ttl=0, available=None):
+        self.max_entries = max_entries
+        self.generation_file = generation_file
+        self.stale_ttl = stale_ttl
+        self.available = available or (lambda: True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = self._read_generation()
+        self._generation_checked = time.monotonic()
+        self._listeners = []
+        # Generation whose listeners are running in the background, or None
+        self._refreshing = None
+        self._refresher = None
+        # Times the entries were dropped; a value computed before a drop is not stored
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+
+    def _read_generation(self):
+        if not self.generation_file:
+            return None
+        try:
+            return os.stat(self.generation_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def add_listener(self, listener):
+        """
+        Call `listener()` when another worker invalidated the cache, before this
+        worker drops its entries, e.g. to bring in-memory indexes up to date so
+        the responses rebuilt afterwards are not made from old data. Listeners
+        run in a background thread; the entries keep being served until they end.
+        """
+        self._listeners.append(listener)
+
+    def _sync_generation(self):
+        with self._lock:
+            now = time.monotonic()
+            if not self.generation_file or now - self._generation_checked < self.GENERATION_CHECK_INTERVAL:
+                return
+            self._generation_checked = now
+            generation = self._read_generation()
+            # A newer generation seen meanwhile is handled by the next check after this refresh
+            if generation == self._generation or self._refreshing is not None:
+                return
+            if not self._listeners:
+                self._drop_generation(generation)
+                return
+            self._refreshing = generation
+            # Listeners may query the database: never in the request thread
+            self._refresher = threading.Thread(target=self._refresh, args=(generation,),
+                                               name="cache-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh(self, generation):
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception:
+                logger.exception("Error in cache invalidation listener")
+        with self._lock:
+            self._refreshing = None
+            self._drop_generation(generation)
+
+    def _drop_generation(self, generation):
+        # Called with the lock held
+        if generation != self._generation:
+            self._generation = generation
+            self._entries.clear()
+            self.epoch += 1
+
+    def _bump_generation(self):
+        # Called with the lock held
+        if not self.generation_file:
+            return
+        try:
+            with open(self.generation_file, "a"):
+                pass
+            os.utime(self.generation_file)
+            self._generation = self._read_generation()
+        except OSError:
+            logger.exception("Error updating cache generation file")
+
+    def get(self, key):
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is None or entry[0] < now:
+                if entry is not None and entry[0] + self.stale_ttl < now:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_stale(self, key):
+        """The value of `key` even if it expired less than `stale_ttl` seconds ago, or None."""
+        self._sync_generation()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] + self.stale_ttl < time.monotonic():
+                return None
+            self.stale_hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl, epoch=None):
+        """Store `value`; with `epoch` (read before computing it) only if the entries were not dropped since."""
+        if ttl <= 0:
+            return
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, prefix=None):
+        """Drop every entry (or those whose key starts with `prefix`). Returns the count."""
+        with self._lock:
+            if prefix is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if key.startswith(prefix)]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self.invalidations += 1
+            self.epoch += 1
+            # Other workers cannot apply the prefix, so they drop everything
+            self._bump_generation()
+            return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale_hits": self.stale_hits,
+                "stale_ttl": self.stale_ttl,
+                "invalidations": self.invalidations,
+            }
+
+
+def cache_key(req=None):
+    req = req or request
+    params = sorted((k, v) for k, v in req.args.items(multi=True) if k not in IGNORED_PARAMS)
+    # Encoded like snapshot_file(), so "date=D%26topic%3DT" cannot collide with "date=D&topic=T"
+    query = urlencode(params)
+    return f"{req.path}?{query}" if query else req.path
+
+
+def skip_cache():
+    """Mark the current response as not cacheable (e.g. a handler fell back to [] on error)."""
+    g.skip_cache = True
+
+
+def stale_response(entry):
+    response = Response(mimetype="application/json")
+    response.headers["X-Cache"] = "STALE"
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    return apply_conditional(response, entry)
+
+
+def cached(cache, ttl):
+    """
+    Cache the JSON body of a view. `ttl` is either seconds or a callable that
+    receives the view kwargs and returns seconds. A stale copy replaces the
+    view's response when it failed (skip_cache() or a 5xx) and is served
+    without calling the view while `cache.available()` is false.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if wants_ndjson():
+                # Streamed responses bypass the cache
+                return view(*args, **kwargs)
+            key = cache_key()
+            entry = cache.get(key)
+            if entry is not None:
+                response = Response(mimetype="application/json")
+                response.headers["X-Cache"] = "HIT"
+                return apply_conditional(response, entry)
+            if not cache.available():
+                entry = cache.get_stale(key)
+                if entry is not None:
+                    return stale_response(entry)
+
+            g.skip_cache = False
+            # Responses still being built when the cache is invalidated are not stored
+            epoch = cache.epoch
+            response = make_response(view(*args, **kwargs))
+            response.headers["X-Cache"] = "MISS"
+            if response.status_code >= 500 or (response.status_code == 200 and g.skip_cache):
+                entry = cache.get_stale(key)
+                if entry is not None:
+                    return stale_response(entry)
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            seconds = 0 if g.skip_cache else (ttl(**kwargs) if callable(ttl) else ttl)
+            entry = CachedBody(response.get_data(), seconds)
+            cache.set(key, entry, seconds, epoch)
+            return apply_conditional(response, entry)
+        return wrapper
+    return decorator
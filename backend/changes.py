@@ -0,0 +1,157 @@
+"""
+Change detection for live updates.
+
+The data changes only when the maintenance scripts run: daily_summary.py
+numbers the batches of articles it processes (a.resumen_seq / s.version) and
+hecho_coverage.py its runs (h.cob_seq / s.version). Together they are the data version
+"A.H". Instead of every client polling the full lists, one thread per process
+reads that version every few seconds while there are subscribers, and the
+server-sent event streams of /api/changes/stream wake up when it changes.
+Each delta (the articles or hechos between two versions for one set of
+filters) is computed once and shared by every subscriber asking for it, so
+the load follows the amount of new data, not the number of clients.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from resilience import log_failure
+
+logger = logging.getLogger(__name__)
+
+# Deltas kept for subscribers that wake up a little later than the others
+SHARED_RESULTS = 256
+
+
+def format_version(version):
+    return f"{version[0]}.{version[1]}"
+
+
+def parse_version(text):
+    """(articles, hechos) from "A.H"; raises ValueError."""
+    articles, _, hechos = text.partition(".")
+    return int(articles), int(hechos)
+
+
+class ChangeFeed:
+    """
+    `read_versions()` returns the current (articles, hechos) version. At most
+    `max_clients` streams may subscribe at once; each one holds a server
+    thread while it is open.
+    """
+
+    def __init__(self, read_versions, interval=5.0, max_clients=4):
+        self.read_versions = read_versions
+        self.interval = interval
+        self.max_clients = max_clients
+        self.version = None
+        self.checked_at = 0.0
+        self.clients = 0
+        self.polls = 0
+        self.changes = 0
+        self.errors = 0
+        self._changed = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._pending = {}
+
+    def poll(self):
+        """Read the version now (one reader at a time); wakes the streams if it changed."""
+        with self._poll_lock:
+            try:
+                version = self.read_versions()
+            except Exception:
+                self.errors += 1
+                log_failure(logger, "Error reading the data version")
+                return self.version
+            self.polls += 1
+            self.checked_at = time.monotonic()
+            with self._changed:
+                if version != self.version:
+                    if self.version is not None:
+                        self.changes += 1
+                    self.version = version
+                    self._changed.notify_all()
+            return version
+
+    def current(self):
+        """The data version, read again only if the last read is older than the interval."""
+        if self.version is None or time.monotonic() - self.checked_at >= self.interval:
+            return self.poll()
+        return self.version
+
+    def subscribe(self):
+        """Register a stream; False when `max_clients` are already open."""
+        with self._changed:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+                self._thread.start()
+            return True
+
+    def unsubscribe(self):
+        with self._changed:
+            self.clients -= 1
+
+    def wait(self, known, timeout):
+        """Block until the version differs from `known` or `timeout` seconds pass; returns the version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version is not None and self.version != known, timeout)
+            return self.version
+
+    def _run(self):
+        # Polls only while someone is listening; the next subscriber restarts it
+        while True:
+            with self._changed:
+                if self.clients <= 0:
+                    self._thread = None
+                    return
+            self.poll()
+            time.sleep(self.interval)
+
+    def shared(self, key, compute):
+        """
+        compute() once per key across threads: concurrent callers wait for the
+        first one and recent results are kept. Failures are not kept.
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = self._pending[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            value = compute()
+        except Exception as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._pending[key]
+            self._results[key] = value
+            while len(self._results) > SHARED_RESULTS:
+                self._results.popitem(last=False)
+        future.set_result(value)
+        return value
+
+    def stats(self):
+        return {
+            "version": format_version(self.version) if self.version is not None else None,
+            "clients": self.clients,
+            "max_clients": self.max_clients,
+            "interval": self.interval,
+            "polls": self.polls,
+            "changes": self.changes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,53 @@
+"""
+SIGUE_A continuity graph of one macroevento.
+
+The `continuity` query reads every hecho of the macro with the hechos it
+follows in a single traversal, without sorting. ContinuityGraph sorts them by
+date once and adds the reverse links, so a date window is a bisect over the
+sorted keys and paging never makes Neo4j sort the whole macro again.
+"""
+import bisect
+from collections import defaultdict
+
+# Sort key of hechos without a date: after every YYYY-MM-DD
+UNDATED = "~"
+# Sorts after any hecho id, so (date, LAST_ID) bounds every hecho of that date
+LAST_ID = "\U0010ffff"
+
+
+class ContinuityGraph:
+    def __init__(self, records):
+        nodes = [{"id": record["id"], "date": record["date"], "text": record["text"],
+                  "follows": sorted(set(record["follows"] or ()))} for record in records]
+        nodes.sort(key=lambda node: (node["date"] or UNDATED, node["id"]))
+        followed_by = defaultdict(list)
+        for node in nodes:
+            for previous in node["follows"]:
+                followed_by[previous].append(node["id"])
+        for node in nodes:
+            # Links to hechos of other macros stay in `follows` only
+            node["followed_by"] = followed_by.get(node["id"], [])
+        self.nodes = nodes
+        self.keys = [(node["date"] or UNDATED, node["id"]) for node in nodes]
+        self.links = sum(len(node["follows"]) for node in nodes)
+        dated = [node["date"] for node in nodes if node["date"]]
+        self.start = dated[0] if dated else None
+        self.end = dated[-1] if dated else None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def window(self, date_from=None, date_to=None, cursor=None, limit=200):
+        """
+        Hechos dated between `date_from` and `date_to` (either may be None;
+        undated hechos come last and only without `date_to`), oldest first,
+        after keyset `cursor` [date, id]. Returns the page and the next
+        cursor, None on the last page.
+        """
+        start = bisect.bisect_left(self.keys, (date_from, "")) if date_from else 0
+        if cursor is not None:
+            start = max(start, bisect.bisect_right(self.keys, tuple(cursor)))
+        end = bisect.bisect_right(self.keys, (date_to, LAST_ID)) if date_to else len(self.keys)
+        page = self.nodes[start:min(end, start + limit)]
+        next_cursor = list(self.keys[start + limit - 1]) if start + limit < end else None
+        return page, next_cursor
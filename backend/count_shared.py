@@ -1,41 +1,27 @@
-from neo4j import GraphDatabase
-import os
-from dotenv import load_dotenv
+from db import DATABASE, create_driver
 
-load_dotenv()
-
-URI = os.getenv('NEO4J_URI', 'bolt://localhost:7687')
-AUTH = (os.getenv('NEO4J_USER', 'neo4j'), os.getenv('NEO4J_PASSWORD', 'password'))
-DATABASE = os.getenv('NEO4J_DATABASE', 'neo4j')
-
-driver = GraphDatabase.driver(URI, auth=AUTH)
+driver = create_driver()
 
 with driver.session(database=DATABASE) as session:
-    # Count hechos with articles from BOTH newspapers
-    result = session.run("""
-        MATCH (h:Hecho)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
-        WITH h, collect(DISTINCT p.nombre) as newspapers
-        WHERE 'El País' IN newspapers AND 'El Mundo' IN newspapers
-        RETURN count(h) as shared_count
-    """)
-    shared = result.single()['shared_count']
-    
-    # Count total hechos
-    result2 = session.run('MATCH (h:Hecho) RETURN count(h) as total')
-    total = result2.single()['total']
-    
-    # Count hechos per newspaper
-    result3 = session.run("""
-        MATCH (h:Hecho)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
-        RETURN p.nombre as periodico, count(DISTINCT h) as hechos
-    """)
-    
-    print(f'=== Estadísticas de Hechos ===')
-    print(f'Total de Hechos: {total}')
-    print(f'Hechos compartidos (ambos periódicos): {shared}')
-    print(f'')
-    print(f'Hechos por periódico:')
-    for record in result3:
-        print(f"  - {record['periodico']}: {record['hechos']}")
+    # Totales precalculados por hecho_coverage.py (lectura de un único nodo)
+    stats = session.run("""
+        MATCH (r:HechoResumen {nombre: 'global'})
+        RETURN r.total AS total, r.compartidos AS compartidos,
+               r.periodicos AS periodicos, r.hechos_por_periodico AS hechos,
+               toString(r.actualizado) AS actualizado
+    """).single()
+
+    if stats is None:
+        print('No hay estadísticas de cobertura: ejecuta antes python hecho_coverage.py')
+    else:
+        print('=== Estadísticas de Hechos ===')
+        print(f'Total de Hechos: {stats["total"]}')
+        print(f'Hechos compartidos (ambos periódicos): {stats["compartidos"]}')
+        print('')
+        print('Hechos por periódico:')
+        for periodico, hechos in zip(stats['periodicos'], stats['hechos']):
+            print(f"  - {periodico}: {hechos}")
+        print('')
+        print(f'Actualizado: {stats["actualizado"]}')
 
 driver.close()
@@ -0,0 +1,150 @@
+"""
+Mantiene la capa materializada de recuentos diarios que leen /api/dates y la
+búsqueda de la última fecha:
+
+- Articulo.fecha_dia: fecha normalizada (YYYY-MM-DD, indexada) que sustituye
+  al substring(COALESCE(f.fecha, a.fecha), 0, 10) por fila.
+- Articulo.resumen_seq: número del lote que lo procesó, para que la API envíe
+  sólo los artículos nuevos (/api/news?since=) y los índices en memoria los
+  carguen por orden.
+- (:DiaResumen {fecha, total}): artículos por día (los días que se quedan sin
+  artículos se borran).
+- (:DiaTopicResumen {fecha, topic, total}): artículos por día y topic.
+
+Es incremental: sólo normaliza los artículos sin resumen_seq (los nuevos) y
+recalcula los días que tocan. No usa un high-water mark sobre id(a): Neo4j
+reutiliza los ids de los nodos borrados y un artículo nuevo con un id antiguo
+no se procesaría nunca. Cada lote incrementa s.version en
+(:ProcesoEstado {nombre: 'resumen_diario'}), la versión de los artículos que
+ve la API. Con --full se recalcula todo (p. ej. si se han reclasificado
+topics); los artículos ya procesados conservan su resumen_seq.
+
+Uso:
+    python daily_summary.py [--batch-size 1000] [--full]
+"""
+import argparse
+
+from db import DATABASE, create_driver
+from schema import ensure_schema
+
+STATE_NAME = 'resumen_diario'
+
+READ_STATE_QUERY = """
+MATCH (s:ProcesoEstado {nombre: $nombre})
+RETURN s.version AS version
+"""
+
+PENDING_QUERY = """
+MATCH (a:Articulo)
+WHERE $full OR a.resumen_seq IS NULL
+OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
+RETURN elementId(a) AS id, substring(COALESCE(f.fecha, a.fecha), 0, 10) AS dia
+"""
+
+WRITE_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Articulo) WHERE elementId(a) = row.id
+SET a.fecha_dia = row.dia,
+    a.resumen_seq = COALESCE(a.resumen_seq, $seq)
+WITH count(a) AS updated
+MERGE (s:ProcesoEstado {nombre: $nombre})
+SET s.version = $seq, s.actualizado = datetime()
+RETURN updated
+"""
+
+REFRESH_DAYS_QUERY = """
+UNWIND $days AS dia
+OPTIONAL MATCH (a:Articulo {fecha_dia: dia})
+WITH dia, count(a) AS total
+MERGE (d:DiaResumen {fecha: dia})
+SET d.total = total
+WITH d, total
+WHERE total = 0
+DELETE d
+"""
+
+CLEAR_DAY_TOPICS_QUERY = """
+MATCH (d:DiaTopicResumen)
+WHERE d.fecha IN $days
+DELETE d
+"""
+
+REFRESH_DAY_TOPICS_QUERY = """
+UNWIND $days AS dia
+MATCH (a:Articulo {fecha_dia: dia})-[:TRATA_SOBRE]->(t:Topic)
+WITH dia, t.nombre AS topic, count(a) AS total
+CREATE (:DiaTopicResumen {fecha: dia, topic: topic, total: total})
+"""
+
+# Días con artículos y días con resumen: los que ya no tienen artículos se borran
+ALL_DAYS_QUERY = """
+MATCH (a:Articulo)
+WHERE a.fecha_dia IS NOT NULL
+RETURN DISTINCT a.fecha_dia AS dia
+UNION
+MATCH (d:DiaResumen)
+RETURN d.fecha AS dia
+"""
+
+
+def read_version(session):
+    """Número del último lote procesado"""
+    record = session.run(READ_STATE_QUERY, nombre=STATE_NAME).single()
+    if record is None or record['version'] is None:
+        return 0
+    return record['version']
+
+
+def write_batch(tx, rows, seq):
+    # La versión se actualiza en la misma transacción que el lote
+    return tx.run(WRITE_BATCH_QUERY, rows=rows, nombre=STATE_NAME, seq=seq).single()['updated']
+
+
+def refresh_days(tx, days):
+    tx.run(REFRESH_DAYS_QUERY, days=days).consume()
+    tx.run(CLEAR_DAY_TOPICS_QUERY, days=days).consume()
+    tx.run(REFRESH_DAY_TOPICS_QUERY, days=days).consume()
+
+
+def refresh(driver, batch_size=1000, full=False):
+    with driver.session(database=DATABASE) as read_session, \
+            driver.session(database=DATABASE) as write_session:
+        ensure_schema(write_session)
+        seq = read_version(read_session)
+        print('Normalizando fecha_dia de ' + ('todos los artículos' if full else 'los artículos nuevos'))
+
+        touched = set()
+        batch = []
+        for record in read_session.run(PENDING_QUERY, full=full):
+            batch.append({'id': record['id'], 'dia': record['dia']})
+            if record['dia']:
+                touched.add(record['dia'])
+            if len(batch) >= batch_size:
+                seq += 1
+                write_session.execute_write(write_batch, batch, seq)
+                batch = []
+        if batch:
+            seq += 1
+            write_session.execute_write(write_batch, batch, seq)
+
+        if full:
+            touched.update(record['dia'] for record in read_session.run(ALL_DAYS_QUERY))
+
+        days = sorted(touched)
+        for start in range(0, len(days), batch_size):
+            write_session.execute_write(refresh_days, days[start:start + batch_size])
+        print(f'Terminado: {len(days)} días recalculados')
+        return days
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualiza los recuentos diarios (DiaResumen).')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--full', action='store_true', help='recalcula todos los días')
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        refresh(driver, batch_size=args.batch_size, full=args.full)
+    finally:
+        driver.close()
@@ -0,0 +1,46 @@
+"""
+Shared Neo4j configuration and driver factory.
+
+Pool settings are read from .env so they can be sized to the number of
+threads each server worker runs (see serve.py).
+"""
+import os
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+load_dotenv()
+
+URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+AUTH = (os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
+DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
+
+# Connections per process; keep it >= the threads per worker
+MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "50"))
+# Seconds a request waits for a free connection before failing
+ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "10"))
+# Seconds before a pooled connection is recycled
+MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+# Seconds to establish a new TCP connection
+CONNECTION_TIMEOUT = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "5"))
+
+# Transaction timeout of the API queries, in seconds; loaders of the in-memory
+# indexes and streamed responses get the longer one
+QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "10"))
+LONG_QUERY_TIMEOUT = float(os.getenv("NEO4J_LONG_QUERY_TIMEOUT", "300"))
+# Extra attempts of a query after a transient error (connection lost, leader switch, deadlock)
+QUERY_RETRIES = int(os.getenv("NEO4J_QUERY_RETRIES", "2"))
+# Consecutive availability failures that open the circuit breaker, and seconds it stays open
+BREAKER_FAILURES = int(os.getenv("NEO4J_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("NEO4J_BREAKER_RESET_SECONDS", "30"))
+
+
+def create_driver():
+    return GraphDatabase.driver(
+        URI,
+        auth=AUTH,
+        max_connection_pool_size=MAX_POOL_SIZE,
+        connection_acquisition_timeout=ACQUISITION_TIMEOUT,
+        max_connection_lifetime=MAX_CONNECTION_LIFETIME,
+        connection_timeout=CONNECTION_TIMEOUT,
+    )
@@ -0,0 +1,194 @@
+"""
+Exporta la API de lectura como ficheros estáticos (ver snapshot.py).
+
+Recorre todos los endpoints GET para cada fecha, topic, macroevento y hecho,
+renderizándolos con la propia app Flask (mismo JSON y mismos ETag que en
+vivo), y escribe cada respuesta junto a sus versiones .gz/.br. Sólo se
+reescriben los ficheros cuyo contenido ha cambiado desde la exportación
+anterior y se borran los que ya no existen.
+
+Si alguna consulta a Neo4j falla durante el recorrido se aborta: no se
+publica la respuesta fallida (sería una lista vacía) ni se borra nada, y lo
+ya escrito se añade al manifest anterior.
+
+Uso:
+    python export_snapshot.py [--out DIR] [--no-articles]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from urllib.parse import quote
+
+from cache import ENCODINGS, MIN_COMPRESS_SIZE, CachedBody
+from snapshot import MANIFEST, SUFFIXES, read_manifest, snapshot_file
+
+# Los mismos campos que pide el globo en script.js (NEWS_LIST_FIELDS)
+NEWS_LIST_FIELDS = 'id,city,lat,lng,title,source,url,date'
+# Agrupación del globo al abrir la página (clusterPrecision(1.5) en script.js)
+CLUSTER_PRECISION = 3
+
+
+class ExportError(Exception):
+    pass
+
+
+def write_atomic(filename, data):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(filename), prefix='.tmp-')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, filename)
+
+
+def remove_quietly(filename):
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
+
+
+class Exporter:
+    def __init__(self, api, out_dir):
+        self.api = api
+        self.client = api.app.test_client()
+        self.out_dir = out_dir
+        self.previous = read_manifest(out_dir)
+        self.manifest = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def query_errors(self):
+        return sum(stats['errors'] for stats in self.api.query_stats.snapshot().values())
+
+    def fetch(self, path, **params):
+        """Renderiza un endpoint, guarda el fichero si ha cambiado y devuelve el JSON."""
+        params = {k: v for k, v in params.items() if v is not None}
+        rel = snapshot_file(path, params.items())
+        if rel is None:
+            return None
+        if rel in self.manifest:
+            return json.loads(self._read(rel))
+
+        errors = self.query_errors()
+        url = '/'.join(quote(segment, safe='') for segment in path.split('/'))
+        response = self.client.get(url, query_string=params)
+        if response.status_code != 200:
+            raise ExportError(f'{path} {params}: HTTP {response.status_code}')
+        if self.query_errors() != errors:
+            raise ExportError(f'{path} {params}: fallo en una consulta a Neo4j')
+
+        body = response.get_data()
+        self._store(rel, body)
+        return json.loads(body)
+
+    def _read(self, rel):
+        with open(os.path.join(self.out_dir, *rel.split('/')), 'rb') as f:
+            return f.read()
+
+    def _store(self, rel, body):
+        etag = hashlib.sha1(body).hexdigest()
+        filename = os.path.join(self.out_dir, *rel.split('/'))
+        old = self.previous.get(rel)
+        encodings = ENCODINGS if len(body) >= MIN_COMPRESS_SIZE else []
+        self.manifest[rel] = {'etag': etag, 'size': len(body), 'encodings': encodings}
+
+        if old and old['etag'] == etag and old.get('encodings') == encodings and os.path.exists(filename):
+            self.unchanged += 1
+            return
+        entry = CachedBody(body)
+        write_atomic(filename, body)
+        for encoding in encodings:
+            write_atomic(filename + SUFFIXES[encoding], entry.encoded(encoding))
+        for encoding in set(SUFFIXES) - set(encodings):
+            remove_quietly(filename + SUFFIXES[encoding])
+        self.written += 1
+
+    def finish(self, complete=True):
+        """Borra los ficheros que ya no existen y publica el nuevo manifest."""
+        removed = 0
+        if not complete:
+            # Recorrido a medias: se conserva todo lo anterior
+            self.manifest = dict(self.previous, **self.manifest)
+        for rel in self.previous.keys() - self.manifest.keys():
+            filename = os.path.join(self.out_dir, *rel.split('/'))
+            remove_quietly(filename)
+            for suffix in SUFFIXES.values():
+                remove_quietly(filename + suffix)
+            removed += 1
+        # El manifest se escribe el último: la app no ve ficheros a medias
+        write_atomic(os.path.join(self.out_dir, MANIFEST),
+                     json.dumps(self.manifest, sort_keys=True).encode('utf-8'))
+        return removed
+
+
+def export(exporter, articles=True):
+    fetch = exporter.fetch
+
+    topics = [t['topic'] for t in fetch('/api/topics')]
+    dates = [d['date'] for d in fetch('/api/dates')]
+    topic_dates = {topic: [d['date'] for d in fetch('/api/dates', topic=topic)] for topic in topics}
+
+    article_ids = set()
+    for fields in (None, NEWS_LIST_FIELDS):
+        fetch('/api/bootstrap', fields=fields)
+        fetch('/api/news', fields=fields)
+        for date in dates:
+            news = fetch('/api/news', date=date, fields=fields)
+            article_ids.update(item['id'] for item in news if item.get('id'))
+        for topic, topic_date_list in topic_dates.items():
+            fetch('/api/bootstrap', topic=topic, fields=fields)
+            for date in topic_date_list:
+                fetch('/api/news', date=date, topic=topic, fields=fields)
+    fetch('/api/news/clusters', precision=CLUSTER_PRECISION)
+    for date in dates:
+        fetch('/api/news/clusters', date=date, precision=CLUSTER_PRECISION)
+    for topic, topic_date_list in topic_dates.items():
+        for date in topic_date_list:
+            fetch('/api/news/clusters', date=date, topic=topic, precision=CLUSTER_PRECISION)
+    if articles:
+        for article_id in sorted(article_ids):
+            fetch(f'/api/news/{article_id}')
+
+    hechos = list(fetch('/api/hechos/recent'))
+    fetch('/api/macros')
+    for macro in fetch('/api/macros/timeline'):
+        hechos.extend(fetch(f'/api/timeline/{macro["nombre"]}'))
+        if macro['hechos']:
+            fetch(f'/api/continuity/{macro["nombre"]}')
+    for date in sorted({h['date'] for h in hechos if h.get('date')}):
+        hechos.extend(fetch(f'/api/hechos/by-date/{date}'))
+    for hecho_id in sorted({h['id'] for h in hechos if h.get('id')}):
+        fetch(f'/api/hecho/{hecho_id}/articles')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--out', default=os.getenv('SNAPSHOT_DIR') or 'snapshot',
+                        help='directorio de salida (por defecto SNAPSHOT_DIR o ./snapshot)')
+    parser.add_argument('--no-articles', action='store_true',
+                        help='no exportar el detalle /api/news/<id> de cada artículo')
+    args = parser.parse_args()
+
+    import app as api
+    # Leer siempre de Neo4j, nunca de la exportación anterior
+    api.snapshot = None
+
+    exporter = Exporter(api, args.out)
+    try:
+        export(exporter, articles=not args.no_articles)
+    except ExportError as e:
+        exporter.finish(complete=False)
+        print(f'Exportación abortada tras {exporter.written} ficheros: {e}')
+        sys.exit(1)
+    finally:
+        api.driver.close()
+    removed = exporter.finish()
+    print(f'{len(exporter.manifest)} ficheros: {exporter.written} escritos, '
+          f'{exporter.unchanged} sin cambios, {removed} borrados')
+
+
+if __name__ == '__main__':
+    main()
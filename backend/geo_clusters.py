@@ -0,0 +1,121 @@
+"""
+Server-side clustering of news by location for the globe.
+
+Articles are bucketed by the geohash of their coordinates. At precision 9
+(cells of a few metres) only articles at the same point are merged; lower
+precisions merge whole regions for zoomed-out views. Each cluster carries its
+article count, centroid, bounding box, sources and a few titles. The
+articles of one cluster are fetched on demand by its key, the geohash, which
+also matches every finer cell inside it.
+"""
+from collections import Counter
+from functools import lru_cache
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+MAX_PRECISION = 9
+DEFAULT_TOP = 3
+MAX_TOP = 20
+
+# Web-map zoom level -> geohash precision whose cells are about one marker wide
+ZOOM_PRECISION = [(2, 1), (4, 2), (7, 3), (9, 4), (12, 5), (14, 6), (17, 7), (19, 8)]
+
+
+# Coordinates repeat (gazetteer points), so most calls are cache hits
+@lru_cache(maxsize=65536)
+def geohash(lat, lng, precision=MAX_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def is_geohash(key):
+    return 1 <= len(key) <= MAX_PRECISION and all(c in GEOHASH_ALPHABET for c in key)
+
+
+def zoom_precision(zoom):
+    for max_zoom, precision in ZOOM_PRECISION:
+        if zoom <= max_zoom:
+            return precision
+    return MAX_PRECISION
+
+
+class Cluster:
+    __slots__ = ("key", "count", "unlocated", "lat_sum", "lng_sum", "bbox", "cities", "sources", "top")
+
+    def __init__(self, key):
+        self.key = key
+        self.count = 0
+        self.unlocated = 0
+        self.lat_sum = 0.0
+        self.lng_sum = 0.0
+        self.bbox = None
+        self.cities = Counter()
+        self.sources = Counter()
+        self.top = []
+
+    def add(self, item, located, top):
+        lat, lng = item["lat"], item["lng"]
+        self.count += 1
+        self.unlocated += not located
+        self.lat_sum += lat
+        self.lng_sum += lng
+        if self.bbox is None:
+            self.bbox = [lat, lng, lat, lng]
+        else:
+            self.bbox = [min(self.bbox[0], lat), min(self.bbox[1], lng),
+                         max(self.bbox[2], lat), max(self.bbox[3], lng)]
+        self.cities[item["city"]] += 1
+        self.sources[item["source"]] += 1
+        if len(self.top) < top:
+            self.top.append({"id": item["id"], "title": item["title"], "source": item["source"]})
+
+    def to_dict(self):
+        return {
+            "key": self.key,
+            "count": self.count,
+            "unlocated": self.unlocated,
+            "lat": round(self.lat_sum / self.count, 5),
+            "lng": round(self.lng_sum / self.count, 5),
+            "bbox": self.bbox,
+            "city": self.cities.most_common(1)[0][0],
+            "sources": dict(self.sources.most_common()),
+            "top": self.top,
+        }
+
+
+def cluster_items(items, located, precision=MAX_PRECISION, top=DEFAULT_TOP):
+    """
+    Group news items (with id, city, lat, lng, title and source) by geohash
+    cell. `located[i]` is False for items placed at the default coordinates.
+    Largest clusters first.
+    """
+    clusters = {}
+    for item, is_located in zip(items, located):
+        key = geohash(item["lat"], item["lng"], precision)
+        cluster = clusters.get(key)
+        if cluster is None:
+            cluster = clusters[key] = Cluster(key)
+        cluster.add(item, is_located, top)
+    return [cluster.to_dict() for cluster in sorted(clusters.values(), key=lambda c: (-c.count, c.key))]
+
+
+def in_cluster(item, key):
+    return geohash(item["lat"], item["lng"], len(key)) == key
@@ -0,0 +1,89 @@
+"""
+Precalcula la ubicación de cada Articulo y la guarda en el propio nodo
+(geo_city, geo_lat, geo_lng), para que /api/news no tenga que extraerla en
+cada petición.
+
+Es incremental: sólo procesa los artículos sin geo_v o con una versión
+anterior del geocodificador (no un high-water mark sobre id(a), que Neo4j
+reutiliza tras borrar nodos). Con --full se recalcula todo (p. ej. tras
+cambiar el gazetteer).
+
+Uso:
+    python geocode_articles.py [--batch-size 500] [--full]
+"""
+import argparse
+import os
+
+from db import DATABASE, create_driver
+from location_extractor import extract_locations, load_gazetteer, set_default_gazetteer
+
+GAZETTEER_FILE = os.getenv('GAZETTEER_FILE')
+if GAZETTEER_FILE:
+    set_default_gazetteer(load_gazetteer(GAZETTEER_FILE))
+
+# Se guarda en cada artículo (geo_v) para distinguir "sin ubicación" de "sin procesar"
+GEO_VERSION = 1
+
+PENDING_QUERY = """
+MATCH (a:Articulo)
+WHERE $full OR a.geo_v IS NULL OR a.geo_v <> $version
+RETURN elementId(a) AS id, a.titulo AS title, a.contenido AS content
+"""
+
+WRITE_BATCH_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Articulo) WHERE elementId(a) = row.id
+SET a.geo_city = row.city,
+    a.geo_lat = row.lat,
+    a.geo_lng = row.lng,
+    a.geo_v = $version
+RETURN count(a) AS updated
+"""
+
+
+def write_batch(tx, rows):
+    return tx.run(WRITE_BATCH_QUERY, rows=rows, version=GEO_VERSION).single()['updated']
+
+
+def flush(write_session, batch):
+    locations = extract_locations((row['title'] or '', row['content'] or '') for row in batch)
+    rows = []
+    for row, location in zip(batch, locations):
+        location = location or {'city': None, 'lat': None, 'lng': None}
+        rows.append({'id': row['id'], 'city': location['city'],
+                     'lat': location['lat'], 'lng': location['lng']})
+    return write_session.execute_write(write_batch, rows)
+
+
+def backfill(driver, batch_size=500, full=False):
+    with driver.session(database=DATABASE) as read_session, \
+            driver.session(database=DATABASE) as write_session:
+        pending = 'todos los artículos' if full else 'los artículos sin geolocalizar'
+        print(f'Geolocalizando {pending} (lotes de {batch_size})')
+
+        total = 0
+        batch = []
+        for record in read_session.run(PENDING_QUERY, full=full, version=GEO_VERSION):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                total += flush(write_session, batch)
+                print(f'  {total} artículos actualizados')
+                batch = []
+        if batch:
+            total += flush(write_session, batch)
+
+        print(f'Terminado: {total} artículos actualizados')
+        return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precalcula city/lat/lng de cada Articulo.')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--full', action='store_true', help='recalcula todos los artículos')
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        backfill(driver, batch_size=args.batch_size, full=args.full)
+    finally:
+        driver.close()
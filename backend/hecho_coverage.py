@@ -0,0 +1,198 @@
+"""
+Mantiene el índice de cobertura de cada Hecho, desnormalizado en el propio
+nodo para que /api/hechos/recent, /api/hechos/by-date y count_shared.py no
+tengan que recorrer Hecho<-REF_HECHO-Articulo-PUBLICADO_EN->Periodico:
+
+- h.cob_periodicos: periódicos que lo cubren (ordenados).
+- h.cob_articulos: número de artículos.
+- h.cob_ultima_fecha: fecha del artículo más reciente.
+- h.cob_fecha: fecha con la que se ordena (h.fecha o, si falta, la anterior).
+- h.cob_compartido: true si lo cubren El País y El Mundo, como contaba
+  count_shared.py.
+- h.cob_seq: número de la ejecución que lo actualizó por última vez, para que
+  la API envíe sólo los hechos cambiados (/api/hechos/recent?since=).
+- (:HechoResumen {nombre: 'global'}): totales para count_shared.py.
+- m.cob_inicio, m.cob_fin, m.cob_hechos: primera y última cob_fecha y número
+  de hechos de cada EventoMacro, para /api/macros y /api/macros/timeline.
+
+Es incremental: marca cada relación REF_HECHO procesada con r.cob_seq y sólo
+recalcula los hechos con relaciones sin marcar (aunque el artículo sea
+antiguo) o que aún no se han indexado. No usa un high-water mark sobre id(r):
+Neo4j reutiliza los ids tras los borrados y una relación nueva con un id
+antiguo no se procesaría nunca. Con --full se recalculan todos (p. ej. tras borrar artículos o
+relaciones, que el modo incremental no detecta). Cada ejecución que actualiza
+algún hecho incrementa s.version en (:ProcesoEstado {nombre:
+'cobertura_hechos'}), la versión de los hechos que ve la API.
+
+Uso:
+    python hecho_coverage.py [--batch-size 500] [--full]
+"""
+import argparse
+
+from db import DATABASE, create_driver
+from schema import ensure_schema
+
+STATE_NAME = 'cobertura_hechos'
+# Se guarda en cada hecho (cob_v) para detectar los que aún no se han indexado
+# o se indexaron con otra definición (2: cob_compartido según PERIODICOS_COMPARTIDO)
+COVERAGE_VERSION = 2
+# Un hecho es compartido si lo cubren todos estos periódicos
+PERIODICOS_COMPARTIDO = ['El País', 'El Mundo']
+
+READ_STATE_QUERY = """
+MATCH (s:ProcesoEstado {nombre: $nombre})
+RETURN s.version AS version
+"""
+
+PENDING_QUERY = """
+MATCH (:Articulo)-[r:REF_HECHO]->(h:Hecho)
+WHERE r.cob_seq IS NULL
+RETURN DISTINCT h.nombre AS hecho
+"""
+
+UNINDEXED_QUERY = """
+MATCH (h:Hecho)
+WHERE $full OR h.cob_v IS NULL OR h.cob_v <> $version
+RETURN h.nombre AS hecho
+"""
+
+# Mismas fechas que usaban las consultas de la API: sólo cuentan los
+# artículos con periódico, y la fecha es la de su nodo Fecha o la propia.
+# El ORDER BY previo deja cob_periodicos ordenado. Las relaciones que se han
+# contado quedan marcadas como procesadas.
+REFRESH_BATCH_QUERY = """
+UNWIND $ids AS hecho_id
+MATCH (h:Hecho {nombre: hecho_id})
+OPTIONAL MATCH (h)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
+OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
+WITH h, a, p.nombre AS periodico, COALESCE(f.fecha, a.fecha) AS fecha
+ORDER BY periodico
+WITH h, collect(DISTINCT periodico) AS periodicos, count(DISTINCT a) AS articulos, max(fecha) AS ultima
+SET h.cob_periodicos = periodicos,
+    h.cob_articulos = articulos,
+    h.cob_ultima_fecha = ultima,
+    h.cob_fecha = COALESCE(h.fecha, ultima),
+    h.cob_compartido = all(p IN $compartido WHERE p IN periodicos),
+    h.cob_v = $version,
+    h.cob_seq = $seq
+WITH h
+OPTIONAL MATCH (h)<-[r:REF_HECHO]-(:Articulo)
+SET r.cob_seq = $seq
+RETURN count(DISTINCT h) AS updated
+"""
+
+# Macroeventos de los hechos recalculados y los que aún no tienen resumen
+TOUCHED_MACROS_QUERY = """
+UNWIND $ids AS hecho_id
+MATCH (:Hecho {nombre: hecho_id})-[:PARTE_DE]->(m:EventoMacro)
+RETURN DISTINCT m.nombre AS macro
+UNION
+MATCH (m:EventoMacro)
+WHERE m.cob_hechos IS NULL
+RETURN m.nombre AS macro
+"""
+
+REFRESH_MACROS_QUERY = """
+UNWIND $macros AS macro
+MATCH (m:EventoMacro {nombre: macro})
+OPTIONAL MATCH (m)<-[:PARTE_DE]-(h:Hecho)
+WITH m, min(h.cob_fecha) AS inicio, max(h.cob_fecha) AS fin, count(h) AS hechos
+SET m.cob_inicio = inicio, m.cob_fin = fin, m.cob_hechos = hechos
+RETURN count(m) AS updated
+"""
+
+WRITE_STATE_QUERY = """
+MERGE (s:ProcesoEstado {nombre: $nombre})
+SET s.version = $seq, s.actualizado = datetime()
+"""
+
+TOTALS_QUERY = """
+MATCH (h:Hecho)
+RETURN count(h) AS total, count(CASE WHEN h.cob_compartido THEN 1 END) AS compartidos
+"""
+
+PER_NEWSPAPER_QUERY = """
+MATCH (h:Hecho)
+UNWIND h.cob_periodicos AS periodico
+RETURN periodico, count(*) AS hechos
+ORDER BY periodico
+"""
+
+WRITE_STATS_QUERY = """
+MERGE (r:HechoResumen {nombre: 'global'})
+SET r.total = $total,
+    r.compartidos = $compartidos,
+    r.periodicos = $periodicos,
+    r.hechos_por_periodico = $hechos_por_periodico,
+    r.actualizado = datetime()
+"""
+
+
+def read_version(session):
+    """Número de la última ejecución"""
+    record = session.run(READ_STATE_QUERY, nombre=STATE_NAME).single()
+    if record is None:
+        return 0
+    return record['version'] or 0
+
+
+def refresh_batch(tx, ids, seq):
+    return tx.run(REFRESH_BATCH_QUERY, ids=ids, version=COVERAGE_VERSION, seq=seq,
+                  compartido=PERIODICOS_COMPARTIDO).single()['updated']
+
+
+def refresh_macros(tx, macros):
+    return tx.run(REFRESH_MACROS_QUERY, macros=macros).single()['updated']
+
+
+def refresh_stats(tx):
+    # Sólo lee propiedades de los Hecho, sin recorrer artículos
+    totals = tx.run(TOTALS_QUERY).single()
+    per_newspaper = list(tx.run(PER_NEWSPAPER_QUERY))
+    tx.run(WRITE_STATS_QUERY, total=totals['total'], compartidos=totals['compartidos'],
+           periodicos=[r['periodico'] for r in per_newspaper],
+           hechos_por_periodico=[r['hechos'] for r in per_newspaper]).consume()
+    return totals
+
+
+def refresh(driver, batch_size=500, full=False):
+    with driver.session(database=DATABASE) as read_session, \
+            driver.session(database=DATABASE) as write_session:
+        ensure_schema(write_session)
+        seq = read_version(read_session)
+        print('Buscando relaciones REF_HECHO sin procesar')
+
+        touched = {record['hecho'] for record in read_session.run(PENDING_QUERY)}
+        touched.update(record['hecho'] for record in
+                       read_session.run(UNINDEXED_QUERY, full=full, version=COVERAGE_VERSION))
+        touched.discard(None)
+
+        hechos = sorted(touched)
+        if hechos:
+            seq += 1
+        updated = 0
+        for start in range(0, len(hechos), batch_size):
+            updated += write_session.execute_write(refresh_batch, hechos[start:start + batch_size], seq)
+        macros = [record['macro'] for record in read_session.run(TOUCHED_MACROS_QUERY, ids=hechos)]
+        if macros:
+            write_session.execute_write(refresh_macros, macros)
+        # La versión se guarda cuando todos los hechos tocados están al día
+        write_session.run(WRITE_STATE_QUERY, nombre=STATE_NAME, seq=seq).consume()
+
+        totals = write_session.execute_write(refresh_stats)
+        print(f'Terminado: {updated} hechos y {len(macros)} macroeventos recalculados; '
+              f'{totals["compartidos"]} de {totals["total"]} compartidos')
+        return hechos
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualiza el índice de cobertura de los hechos.')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--full', action='store_true', help='recalcula todos los hechos')
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        refresh(driver, batch_size=args.batch_size, full=args.full)
+    finally:
+        driver.close()
@@ -0,0 +1,348 @@
+"""
+Per-request instrumentation: a Server-Timing breakdown, Prometheus metrics and
+an optional sampling profiler for slow requests.
+
+Each request collects the time spent in Neo4j (and the records it consumed),
+in location extraction, in JSON serialization and in compression. The totals
+go out in a `Server-Timing` header, so they show up in the browser's network
+panel, and feed latency histograms per route and per registered query that
+/metrics exposes in the Prometheus text format. Metrics are per process: with
+several workers (serve.py) each one is scraped through the same port, so sum
+them with `sum by (...)` on the Prometheus side.
+
+Streamed responses get their headers before the body is produced, so their
+Server-Timing and route latency cover the first chunk only; the query
+histograms still see the whole stream.
+"""
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+# Seconds; from a cache hit to a cold query on a large date
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Server-Timing metric names, in header order, with their descriptions
+STAGES = {
+    "db": "Neo4j",
+    "index": "Article index",
+    "geo": "Location extraction",
+    "serialize": "JSON serialization",
+    "compress": "Compression",
+}
+
+
+class RequestTimings:
+    """Time per stage for one request. Thread-safe: /api/bootstrap fills it from several threads."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = defaultdict(float)
+        self.queries = 0
+        self.rows = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds, rows=None):
+        with self._lock:
+            self.durations[stage] += seconds
+            if rows is not None:
+                self.queries += 1
+                self.rows += rows
+
+    def server_timing(self, total):
+        entries = []
+        for stage, description in STAGES.items():
+            if stage not in self.durations:
+                continue
+            if stage == "db":
+                description = f"{description} ({self.queries} queries, {self.rows} records)"
+            entries.append(f'{stage};dur={self.durations[stage] * 1000:.2f};desc="{description}"')
+        entries.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings():
+    return _current.get()
+
+
+def add_timing(stage, seconds, rows=None):
+    """Add `seconds` to `stage` of the current request; a no-op outside requests (CLI scripts)."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(stage, seconds, rows)
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(stage, time.perf_counter() - start)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                for bound, bucket in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(self.labels, labels, [('le', bound)])} {bucket}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+
+class MetricCounter:
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Metrics:
+    """
+    Minimal Prometheus registry. Values owned by other modules (cache
+    counters, snapshot hits) are read at scrape time by collectors returning
+    (name, type, help, value) tuples.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def histogram(self, name, help, labels=()):
+        metric = Histogram(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        metric = MetricCounter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, collect):
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                logger.exception("Metrics collector failed")
+                continue
+            for name, kind, help, value in samples:
+                lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+REQUEST_LATENCY = metrics.histogram("prisma_http_request_duration_seconds",
+                                    "Time to produce the response headers, per route.",
+                                    ("route", "method", "status"))
+STAGE_LATENCY = metrics.histogram("prisma_http_request_stage_seconds",
+                                  "Time spent per request in each stage (db, index, geo, serialize, compress).",
+                                  ("route", "stage"))
+QUERY_LATENCY = metrics.histogram("prisma_neo4j_query_duration_seconds",
+                                  "Registered Neo4j query duration, including consuming the records.",
+                                  ("query",))
+QUERY_ROWS = metrics.counter("prisma_neo4j_query_records_total", "Records returned per query.", ("query",))
+QUERY_ERRORS = metrics.counter("prisma_neo4j_query_errors_total", "Failed query runs.", ("query",))
+
+
+def observe_query(name, seconds, rows, failed):
+    """QueryStats listener: query histograms plus the `db` stage of the current request."""
+    QUERY_LATENCY.observe((name,), seconds)
+    QUERY_ROWS.inc((name,), rows)
+    if failed:
+        QUERY_ERRORS.inc((name,))
+    add_timing("db", seconds, rows)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify() with its serialization time recorded as the `serialize` stage."""
+
+    def dumps(self, obj, **kwargs):
+        with timed("serialize"):
+            return super().dumps(obj, **kwargs)
+
+
+class SamplingProfiler:
+    """
+    While enabled, a background thread samples the stack of every thread
+    serving a request each `interval` seconds. Requests slower than `slow_ms`
+    have their samples written to `output_dir` as folded stacks (one
+    "frame;frame;... count" line per distinct stack), the input format of
+    flamegraph.pl, inferno and speedscope. Faster requests are discarded.
+    """
+
+    def __init__(self, output_dir, slow_ms=500, interval=0.005):
+        self.output_dir = output_dir
+        self.slow_ms = slow_ms
+        self.interval = interval
+        self.enabled = False
+        self.written = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def configure(self, enabled=None, slow_ms=None):
+        if slow_ms is not None:
+            self.slow_ms = slow_ms
+        if enabled is not None:
+            self.enabled = enabled
+        if self.enabled and (self._thread is None or not self._thread.is_alive()):
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+            self._thread.start()
+
+    def begin(self):
+        if self.enabled:
+            with self._lock:
+                self._active[threading.get_ident()] = Counter()
+
+    def end(self, label, duration_ms):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or duration_ms < self.slow_ms:
+            return None
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "root"
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(duration_ms)}ms-{slug}.folded")
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError:
+            logger.exception("Could not write profile %s", path)
+            return None
+        self.written += 1
+        logger.info("Slow request %s (%.0f ms) profiled to %s", label, duration_ms, path)
+        return path
+
+    def stats(self):
+        return {"enabled": self.enabled, "slow_ms": self.slow_ms, "interval_ms": self.interval * 1000,
+                "output_dir": self.output_dir, "profiles_written": self.written}
+
+    def _run(self):
+        while self.enabled:
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, samples in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+def _fold(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def route_label():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def init_app(app, query_stats, profiler=None, slow_request_ms=1000):
+    """
+    Install the hooks. Call it before registering other after_request hooks
+    (Flask runs them in reverse order), so compression done by
+    finalize_api_response is included in the timings. Requests slower than
+    `slow_request_ms` are logged with their breakdown.
+    """
+    app.json = TimedJSONProvider(app)
+    query_stats.add_listener(observe_query)
+
+    @app.before_request
+    def start_timings():
+        _current.set(RequestTimings())
+        if profiler is not None:
+            profiler.begin()
+
+    @app.after_request
+    def emit_timings(response):
+        timings = _current.get()
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.start
+        route = route_label()
+        response.headers["Server-Timing"] = timings.server_timing(total)
+        REQUEST_LATENCY.observe((route, request.method, str(response.status_code)), total)
+        for stage, seconds in timings.durations.items():
+            STAGE_LATENCY.observe((route, stage), seconds)
+        if total * 1000 >= slow_request_ms:
+            logger.warning("Slow request %s %s: %.0f ms (%s)", request.method, request.full_path.rstrip("?"),
+                           total * 1000, response.headers["Server-Timing"])
+        return response
+
+    @app.teardown_request
+    def stop_timings(exc):
+        timings = _current.get()
+        if profiler is not None and timings is not None:
+            profiler.end(f"{request.method} {request.path}", (time.perf_counter() - timings.start) * 1000)
+        _current.set(None)
@@ -1,3 +1,8 @@
+import csv
+import json
+import unicodedata
+from collections import deque
+
 # Lista de ciudades españolas comunes con sus coordenadas
 SPANISH_CITIES = {
     "madrid": {"lat": 40.4168, "lng": -3.7038},
@@ -112,27 +117,157 @@ SPANISH_CITIES = {
     "melbourne": {"lat": -37.8136, "lng": 144.9631},
     "sudán": {"lat": 15.8575, "lng": 30.2176},
     "áfrica": {"lat": 1.6508, "lng": 24.2155},
-}   
+}
+
+# Bytes que forman parte de una palabra tras normalizar; el resto pasa a ser un espacio
+_WORD_BYTES = set(b"abcdefghijklmnopqrstuvwxyz0123456789")
+_SEPARATORS = bytes(b if b in _WORD_BYTES else 0x20 for b in range(256))
+
+
+def fold_text(text):
+    """
+    Normaliza el texto para comparar: minúsculas, sin tildes y con la
+    puntuación convertida en espacios ("¡Málaga!" -> " malaga ").
+    Los caracteres fuera del alfabeto latino se descartan.
+    """
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return decomposed.encode("ascii", "ignore").translate(_SEPARATORS).decode("ascii")
+
+
+def tokenize(text):
+    """
+    Divide el texto normalizado en palabras; así las coincidencias respetan
+    los límites de palabra ("roma" no encaja en "romance").
+    """
+    return fold_text(text).split()
+
+
+class Gazetteer:
+    """
+    Autómata Aho-Corasick sobre palabras construido una sola vez.
+
+    Recorre el texto en una única pasada, con coste independiente del número
+    de lugares cargados. Si hay varias coincidencias gana la más larga
+    ("nueva york" antes que "york"); a igual longitud, la primera del texto.
+    """
+
+    def __init__(self, places):
+        self._goto = [{}]
+        self._fail = [0]
+        # Mejor coincidencia (longitud, ubicación) que termina en cada estado
+        self._out = [None]
+        # Todas las palabras que aparecen en algún nombre
+        self._vocabulary = set()
+        self.size = 0
+
+        for name, coords in places.items():
+            tokens = tokenize(name)
+            if not tokens:
+                continue
+            self._vocabulary.update(tokens)
+            state = 0
+            for token in tokens:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                    self._goto[state][token] = nxt
+                state = nxt
+            # Dos nombres que se normalizan igual: se queda el primero
+            if self._out[state] is None:
+                location = {"city": name.title(), "lat": coords["lat"], "lng": coords["lng"]}
+                self._out[state] = (len(" ".join(tokens)), location)
+                self.size += 1
+
+        self._build_failure_links()
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                if state:
+                    self._fail[nxt] = self._goto[fallback].get(token, 0)
+                # El propio nombre siempre es más largo que cualquiera de sus sufijos
+                if self._out[nxt] is None:
+                    self._out[nxt] = self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """
+        Devuelve la ubicación de la coincidencia más larga en el texto o None.
+        """
+        tokens = tokenize(text)
+        # Descarte rápido (en C) de los textos sin ninguna palabra del gazetteer
+        if self._vocabulary.isdisjoint(tokens):
+            return None
+        goto, fail, out = self._goto, self._fail, self._out
+        best = None
+        state = 0
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            hit = out[state]
+            if hit is not None and (best is None or hit[0] > best[0]):
+                best = hit
+        return dict(best[1]) if best else None
+
+
+def load_gazetteer(path, base=SPANISH_CITIES):
+    """
+    Carga un gazetteer desde un fichero y lo combina con `base`.
+
+    Acepta CSV/TSV con columnas name, lat, lng o un JSON con la misma forma que
+    SPANISH_CITIES. Las entradas de `base` tienen prioridad sobre las del fichero.
+    """
+    places = {}
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as fh:
+            for name, coords in json.load(fh).items():
+                places[name.strip().lower()] = {"lat": float(coords["lat"]), "lng": float(coords["lng"])}
+    else:
+        delimiter = "\t" if path.endswith(".tsv") else ","
+        with open(path, newline="", encoding="utf-8") as fh:
+            for row in csv.DictReader(fh, delimiter=delimiter):
+                places[row["name"].strip().lower()] = {"lat": float(row["lat"]), "lng": float(row["lng"])}
+    places.update(base or {})
+    return Gazetteer(places)
+
+
+_gazetteer = Gazetteer(SPANISH_CITIES)
+
+
+def set_default_gazetteer(gazetteer):
+    """
+    Sustituye el gazetteer usado por extract_location_from_text.
+    """
+    global _gazetteer
+    _gazetteer = gazetteer
+
+
+def _article_text(title, content):
+    # Combinar título y los primeros 500 caracteres del contenido
+    return (title or "") + " " + (content[:500] if content else "")
+
 
 def extract_location_from_text(title, content):
     """
     Extrae la ubicación más probable del título y contenido del artículo.
     Devuelve un dict con city, lat, lng o None si no encuentra nada.
     """
-    # Combinar título y los primeros 500 caracteres del contenido
-    text = (title + " " + (content[:500] if content else "")).lower()
-    
-    # Buscar ciudades en orden de prioridad (las más específicas primero)
-    # Ordenamos por longitud de nombre para buscar "nueva york" antes que "york", etc.
-    sorted_cities = sorted(SPANISH_CITIES.items(), key=lambda x: len(x[0]), reverse=True)
-    
-    for city_name, coords in sorted_cities:
-        if city_name in text:
-            return {
-                "city": city_name.title(),
-                "lat": coords["lat"],
-                "lng": coords["lng"]
-            }
-    
-    # Si no encuentra nada, devolver None
-    return None
+    return _gazetteer.find(_article_text(title, content))
+
+
+def extract_locations(records, gazetteer=None):
+    """
+    Versión por lotes: recibe pares (title, content) y devuelve una lista con
+    el resultado de cada uno (dict o None), en el mismo orden.
+    """
+    find = (gazetteer or _gazetteer).find
+    return [find(_article_text(title, content)) for title, content in records]
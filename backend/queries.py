@@ -0,0 +1,482 @@
+"""
+Registry of every Cypher query the API runs.
+
+Each endpoint query is a named, fully parameterized constant, so Neo4j sees a
+fixed set of query texts and reuses their cached plans. Handlers run them
+through run_query(), which records per-query timing and row counts and
+applies the transaction timeout, retries and circuit breaker of
+resilience.py; schema.py plan-checks the same texts.
+"""
+import re
+import threading
+import time
+
+import neo4j
+
+from db import BREAKER_FAILURES, BREAKER_RESET_SECONDS, LONG_QUERY_TIMEOUT, QUERY_RETRIES, QUERY_TIMEOUT
+from resilience import CircuitBreaker, backoff, is_retryable
+
+_PARAM = re.compile(r"\$(\w+)")
+
+
+class Query:
+    def __init__(self, name, text, timeout=None):
+        self.name = name
+        self.text = text
+        self.params = frozenset(_PARAM.findall(text))
+        # Transaction timeout in seconds
+        self.timeout = timeout or QUERY_TIMEOUT
+
+
+QUERIES = {}
+
+
+def register(name, text, timeout=None):
+    if name in QUERIES:
+        raise ValueError(f"query {name!r} is already registered")
+    QUERIES[name] = Query(name, text, timeout)
+    return QUERIES[name]
+
+
+class QueryStats:
+    """Thread-safe per-query counters: calls, errors, rows and time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call `listener(name, seconds, rows, failed)` for every recorded run."""
+        self._listeners.append(listener)
+
+    def record(self, name, seconds, rows, failed=False):
+        for listener in self._listeners:
+            listener(name, seconds, rows, failed)
+        with self._lock:
+            stats = self._stats.setdefault(name, {"calls": 0, "errors": 0, "retries": 0, "rows": 0,
+                                                  "total_ms": 0.0, "max_ms": 0.0})
+            ms = seconds * 1000
+            stats["calls"] += 1
+            stats["errors"] += int(failed)
+            stats["rows"] += rows
+            stats["total_ms"] += ms
+            stats["max_ms"] = max(stats["max_ms"], ms)
+
+    def record_retry(self, name):
+        with self._lock:
+            self._stats[name]["retries"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(stats,
+                           total_ms=round(stats["total_ms"], 2),
+                           max_ms=round(stats["max_ms"], 2),
+                           avg_ms=round(stats["total_ms"] / stats["calls"], 2) if stats["calls"] else 0.0)
+                for name, stats in self._stats.items()
+            }
+
+
+query_stats = QueryStats()
+
+# Shared by every query of the process: when Neo4j is down they all fail fast
+breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+
+
+def _checked(name, params):
+    query = QUERIES[name]
+    missing = query.params - params.keys()
+    if missing:
+        raise KeyError(f"query {name!r} is missing parameters: {', '.join(sorted(missing))}")
+    return query
+
+
+def run_query(session, name, **params):
+    """
+    Run a registered query and return its records as a list, recording time
+    and row count. Transient errors are retried up to QUERY_RETRIES times
+    while the breaker lets queries through; when it is open CircuitOpenError
+    is raised without running the query.
+    """
+    query = _checked(name, params)
+    attempt = 0
+    while True:
+        token = breaker.before_call()
+        start = time.perf_counter()
+        try:
+            records = list(session.run(neo4j.Query(query.text, timeout=query.timeout), params))
+        except Exception as e:
+            query_stats.record(name, time.perf_counter() - start, 0, failed=True)
+            breaker.record(e, token)
+            if attempt >= QUERY_RETRIES or not is_retryable(e) or not breaker.available():
+                raise
+            query_stats.record_retry(name)
+            time.sleep(backoff(attempt))
+            attempt += 1
+            continue
+        breaker.record(token=token)
+        query_stats.record(name, time.perf_counter() - start, len(records))
+        return records
+
+
+def stream_query(session, name, **params):
+    """
+    Like run_query, but yields records as the result cursor is consumed. Stats
+    are recorded when the generator finishes or is closed. Records may already
+    have been sent when an error happens, so it is not retried, and its
+    transaction gets LONG_QUERY_TIMEOUT since large results take a while.
+    """
+    query = _checked(name, params)
+    token = breaker.before_call()
+    start = time.perf_counter()
+    rows = 0
+    error = None
+    try:
+        for record in session.run(neo4j.Query(query.text, timeout=max(query.timeout, LONG_QUERY_TIMEOUT)), params):
+            rows += 1
+            yield record
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        breaker.record(error, token)
+        query_stats.record(name, time.perf_counter() - start, rows, failed=error is not None)
+
+
+# Daily counts and Articulo.fecha_dia are maintained by daily_summary.py (run it after each ingest)
+register("latest_date", """
+MATCH (d:DiaResumen)
+WHERE d.total > 0
+RETURN max(d.fecha)
+""")
+
+register("dates", """
+MATCH (d:DiaResumen)
+WHERE d.total > 0
+RETURN d.fecha AS date, d.total AS count
+ORDER BY date DESC
+""")
+
+register("dates_by_topic", """
+MATCH (d:DiaTopicResumen {topic: $topic})
+RETURN d.fecha AS date, d.total AS count
+ORDER BY date DESC
+""")
+
+# Keyset-paginated news for one date (index seek on fecha_dia). The summary
+# and source are only read from the graph when requested (the summary is also
+# needed to geolocate articles not yet processed by geocode_articles.py).
+NEWS_QUERY = """
+{match}
+WHERE a.fecha_dia = $date
+  AND ($cursor_url IS NULL OR a.url > $cursor_url)
+WITH a
+ORDER BY a.url ASC
+LIMIT $limit
+RETURN a.titulo AS title,
+       CASE WHEN $with_summary OR a.geo_v IS NULL THEN a.contenido END AS summary,
+       a.url AS url,
+       CASE WHEN $with_source THEN [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] END AS source,
+       a.fecha_dia AS date,
+       a.geo_v AS geocoded,
+       a.geo_city AS city,
+       a.geo_lat AS lat,
+       a.geo_lng AS lng
+ORDER BY url ASC
+"""
+register("news", NEWS_QUERY.format(match="MATCH (a:Articulo)"))
+register("news_by_topic", NEWS_QUERY.format(match="MATCH (a:Articulo)-[:TRATA_SOBRE]->(:Topic {nombre: $topic})"))
+
+# Date-range / multi-topic variant: keyset over (fecha_dia DESC, url ASC), so
+# the cursor [date, url] carries on into older dates. $topics is a list of
+# topic names (any of them) or null.
+register("news_range", """
+MATCH (a:Articulo)
+WHERE a.fecha_dia >= $date_from AND a.fecha_dia <= $date_to
+  AND ($topics IS NULL OR EXISTS { (a)-[:TRATA_SOBRE]->(t:Topic) WHERE t.nombre IN $topics })
+  AND ($cursor_date IS NULL OR a.fecha_dia < $cursor_date
+       OR (a.fecha_dia = $cursor_date AND a.url > $cursor_url))
+WITH a
+ORDER BY a.fecha_dia DESC, a.url ASC
+LIMIT $limit
+RETURN a.titulo AS title,
+       CASE WHEN $with_summary OR a.geo_v IS NULL THEN a.contenido END AS summary,
+       a.url AS url,
+       CASE WHEN $with_source THEN [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] END AS source,
+       a.fecha_dia AS date,
+       a.geo_v AS geocoded,
+       a.geo_city AS city,
+       a.geo_lat AS lat,
+       a.geo_lng AS lng
+ORDER BY date DESC, url ASC
+""")
+
+# Summaries of a page of articles answered by the in-memory article index
+register("news_summaries", """
+UNWIND $urls AS url
+MATCH (a:Articulo {url: url})
+RETURN a.url AS url, a.contenido AS summary
+""")
+
+# Articles processed by daily_summary.py after a given version (the batch
+# number it stamps on them as resumen_seq), oldest batch first, for the
+# `since=` deltas
+register("news_since", """
+MATCH (a:Articulo)
+WHERE a.fecha_dia >= $date_from AND a.fecha_dia <= $date_to
+  AND a.resumen_seq > $since AND a.resumen_seq <= $until
+  AND ($topics IS NULL OR EXISTS { (a)-[:TRATA_SOBRE]->(t:Topic) WHERE t.nombre IN $topics })
+WITH a
+ORDER BY a.resumen_seq ASC, a.url ASC
+LIMIT $limit
+RETURN a.resumen_seq AS seq,
+       a.titulo AS title,
+       CASE WHEN $with_summary OR a.geo_v IS NULL THEN a.contenido END AS summary,
+       a.url AS url,
+       CASE WHEN $with_source THEN [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] END AS source,
+       a.fecha_dia AS date,
+       a.geo_v AS geocoded,
+       a.geo_city AS city,
+       a.geo_lat AS lat,
+       a.geo_lng AS lng
+ORDER BY seq ASC, url ASC
+""")
+
+register("news_detail", """
+MATCH (a:Articulo {url: $url})
+OPTIONAL MATCH (a)-[:PUBLICADO_EL]->(f:Fecha)
+RETURN a.titulo AS title,
+       a.contenido AS summary,
+       a.url AS url,
+       [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] AS source,
+       COALESCE(a.fecha_dia, substring(COALESCE(f.fecha, a.fecha), 0, 10)) AS date,
+       a.geo_v AS geocoded,
+       a.geo_city AS city,
+       a.geo_lat AS lat,
+       a.geo_lng AS lng
+LIMIT 1
+""")
+
+register("topics", """
+MATCH (t:Topic)<-[:TRATA_SOBRE]-(a:Articulo)
+RETURN t.nombre AS topic, count(a) AS count
+ORDER BY count DESC
+LIMIT 50
+""")
+
+# Articles of any of several topics per date; DiaTopicResumen cannot be summed
+# because an article with two of the topics would count twice
+register("dates_by_topics", """
+MATCH (t:Topic)<-[:TRATA_SOBRE]-(a:Articulo)
+WHERE t.nombre IN $topics AND a.fecha_dia IS NOT NULL
+WITH DISTINCT a
+RETURN a.fecha_dia AS date, count(*) AS count
+ORDER BY date DESC
+""")
+
+register("topics_by_dates", """
+MATCH (d:DiaTopicResumen)
+WHERE d.fecha >= $date_from AND d.fecha <= $date_to
+RETURN d.topic AS topic, sum(d.total) AS count
+ORDER BY count DESC
+LIMIT 50
+""")
+
+# Bulk load of the optional in-memory article index (article_index.py), in
+# (resumen_seq, elementId) order up to the last batch processed by daily_summary.py;
+# the element id is the keyset tie-breaker because urls may be missing or repeated
+register("index_state", """
+OPTIONAL MATCH (s:ProcesoEstado {nombre: 'resumen_diario'})
+RETURN s.version AS version
+""")
+
+register("index_articles", """
+MATCH (a:Articulo)
+WHERE a.resumen_seq >= $last_seq AND a.resumen_seq <= $max_seq
+WITH a, elementId(a) AS key
+WHERE a.resumen_seq > $last_seq OR key > $last_key
+ORDER BY a.resumen_seq, key
+LIMIT $limit
+RETURN a.resumen_seq AS seq,
+       key,
+       a.url AS url,
+       a.titulo AS title,
+       a.fecha_dia AS date,
+       [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] AS source,
+       [(a)-[:TRATA_SOBRE]->(t:Topic) | t.nombre] AS topics,
+       a.geo_v AS geocoded,
+       a.geo_city AS city,
+       a.geo_lat AS lat,
+       a.geo_lng AS lng,
+       CASE WHEN a.geo_v IS NULL THEN a.contenido END AS content
+""", timeout=LONG_QUERY_TIMEOUT)
+
+# Every macroevento with the first/last date and hecho count stored by hecho_coverage.py
+register("macros", """
+MATCH (m:EventoMacro)
+RETURN m.nombre AS nombre, m.descripcion AS descripcion, m.cob_inicio AS start,
+       m.cob_fin AS end, COALESCE(m.cob_hechos, 0) AS hechos
+ORDER BY start ASC, nombre ASC
+""")
+
+# Both read the coverage index kept on each Hecho by hecho_coverage.py, so
+# they are index-ordered reads instead of a traversal of every Hecho.
+register("recent_hechos", """
+MATCH (h:Hecho)
+WHERE h.cob_ultima_fecha <= $max_date
+WITH h
+ORDER BY h.cob_ultima_fecha DESC
+LIMIT 40
+OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
+RETURN h.nombre as id,
+       COALESCE(h.fecha, h.cob_ultima_fecha) as date,
+       h.descripcion as text,
+       m.nombre as macroevento,
+       h.cob_periodicos as newspapers
+ORDER BY h.cob_ultima_fecha DESC
+""")
+
+register("hechos_by_date", """
+MATCH (h:Hecho)
+WHERE h.cob_fecha <= $date
+WITH h
+ORDER BY h.cob_fecha DESC
+LIMIT 50
+OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
+RETURN h.nombre as id,
+       h.cob_fecha as date,
+       h.descripcion as text,
+       m.nombre as macroevento,
+       h.cob_periodicos as newspapers
+ORDER BY date DESC
+""")
+
+# Hechos updated by a hecho_coverage.py run after $since (h.cob_seq), optionally
+# only those of one macroevento
+register("hechos_since", """
+MATCH (h:Hecho)
+WHERE h.cob_seq > $since AND h.cob_seq <= $until
+  AND ($max_date IS NULL OR h.cob_ultima_fecha <= $max_date)
+  AND ($macro_name IS NULL OR EXISTS { (h)-[:PARTE_DE]->(:EventoMacro {nombre: $macro_name}) })
+WITH h
+ORDER BY h.cob_ultima_fecha DESC
+LIMIT $limit
+OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
+RETURN h.nombre as id,
+       COALESCE(h.fecha, h.cob_ultima_fecha) as date,
+       h.descripcion as text,
+       m.nombre as macroevento,
+       h.cob_periodicos as newspapers
+ORDER BY h.cob_ultima_fecha DESC
+""")
+
+# Versions of the data as left by the maintenance scripts: the last batch of
+# articles processed by daily_summary.py and the last hecho_coverage.py run
+register("data_versions", """
+OPTIONAL MATCH (a:ProcesoEstado {nombre: 'resumen_diario'})
+OPTIONAL MATCH (h:ProcesoEstado {nombre: 'cobertura_hechos'})
+RETURN a.version AS articles, h.version AS hechos
+""")
+
+register("timeline", """
+MATCH (m:EventoMacro {nombre: $macro_name})<-[:PARTE_DE]-(h:Hecho)
+OPTIONAL MATCH (h)<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EL]->(f:Fecha)
+WITH h, COALESCE(h.fecha, min(f.fecha)) as eventDate
+RETURN h.nombre as id, eventDate as date, h.descripcion as text
+ORDER BY eventDate DESC
+""")
+
+# Hechos of a macroevento with the hechos each one follows, in one traversal
+# and unsorted: /api/continuity keeps them sorted by date in memory
+register("continuity", """
+MATCH (m:EventoMacro {nombre: $macro_name})<-[:PARTE_DE]-(h:Hecho)
+RETURN h.nombre AS id, h.cob_fecha AS date, h.descripcion AS text,
+       [(h)-[:SIGUE_A]->(previous:Hecho) | previous.nombre] AS follows
+""")
+
+register("hecho_articles", """
+MATCH (h:Hecho {nombre: $hecho_id})<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
+RETURN p.nombre as medio, a.titulo as titulo, a.url as link, a.contenido as summary
+""")
+
+register("hechos_articles", """
+UNWIND $ids AS hecho_id
+MATCH (h:Hecho {nombre: hecho_id})<-[:REF_HECHO]-(a:Articulo)-[:PUBLICADO_EN]->(p:Periodico)
+RETURN hecho_id, p.nombre as medio, a.titulo as titulo, a.url as link, a.contenido as summary
+""")
+
+# Full-text search on the fulltext indexes created by schema.py, by relevance
+# and then key, after the keyset cursor ($cursor_score, $cursor_key)
+register("search_articles", """
+CALL db.index.fulltext.queryNodes('articulo_texto', $query) YIELD node AS a, score
+WHERE ($date_from IS NULL OR a.fecha_dia >= $date_from)
+  AND ($date_to IS NULL OR a.fecha_dia <= $date_to)
+  AND ($topics IS NULL OR EXISTS { (a)-[:TRATA_SOBRE]->(t:Topic) WHERE t.nombre IN $topics })
+  AND ($sources IS NULL OR EXISTS { (a)-[:PUBLICADO_EN]->(p:Periodico) WHERE p.nombre IN $sources })
+  AND ($cursor_score IS NULL OR score < $cursor_score OR (score = $cursor_score AND a.url > $cursor_key))
+WITH a, score
+ORDER BY score DESC, a.url ASC
+LIMIT $limit
+RETURN a.url AS key,
+       score,
+       a.titulo AS title,
+       a.contenido AS content,
+       a.fecha_dia AS date,
+       [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] AS source
+ORDER BY score DESC, key ASC
+""")
+
+register("search_hechos", """
+CALL db.index.fulltext.queryNodes('hecho_texto', $query) YIELD node AS h, score
+WHERE ($date_from IS NULL OR h.cob_fecha >= $date_from)
+  AND ($date_to IS NULL OR h.cob_fecha <= $date_to)
+  AND ($topics IS NULL OR EXISTS {
+        (h)<-[:REF_HECHO]-(:Articulo)-[:TRATA_SOBRE]->(t:Topic) WHERE t.nombre IN $topics })
+  AND ($sources IS NULL OR any(source IN COALESCE(h.cob_periodicos, []) WHERE source IN $sources))
+  AND ($cursor_score IS NULL OR score < $cursor_score OR (score = $cursor_score AND h.nombre > $cursor_key))
+WITH h, score
+ORDER BY score DESC, h.nombre ASC
+LIMIT $limit
+OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
+RETURN h.nombre AS key,
+       score,
+       h.descripcion AS content,
+       h.cob_fecha AS date,
+       m.nombre AS macroevento,
+       h.cob_periodicos AS newspapers
+ORDER BY score DESC, key ASC
+""")
+
+# Loaders of the in-process search index (search.py) for servers without
+# fulltext indexes: articles by daily_summary.py batch like index_articles,
+# hechos by the hecho_coverage.py run that last touched them
+register("search_index_articles", """
+MATCH (a:Articulo)
+WHERE a.resumen_seq >= $last_seq AND a.resumen_seq <= $max_seq
+WITH a, elementId(a) AS key
+WHERE a.resumen_seq > $last_seq OR key > $last_key
+ORDER BY a.resumen_seq, key
+LIMIT $limit
+RETURN a.resumen_seq AS seq,
+       key,
+       a.url AS url,
+       a.titulo AS title,
+       a.contenido AS content,
+       a.fecha_dia AS date,
+       [(a)-[:PUBLICADO_EN]->(p:Periodico) | p.nombre][0] AS source,
+       [(a)-[:TRATA_SOBRE]->(t:Topic) | t.nombre] AS topics
+""", timeout=LONG_QUERY_TIMEOUT)
+
+register("search_index_hechos", """
+MATCH (h:Hecho)
+WHERE COALESCE(h.cob_seq, 0) > $since
+OPTIONAL MATCH (h)-[:PARTE_DE]->(m:EventoMacro)
+RETURN h.nombre AS id,
+       COALESCE(h.cob_seq, 0) AS seq,
+       h.descripcion AS descripcion,
+       h.cob_fecha AS date,
+       m.nombre AS macroevento,
+       h.cob_periodicos AS newspapers,
+       [(h)<-[:REF_HECHO]-(:Articulo)-[:TRATA_SOBRE]->(t:Topic) | t.nombre] AS topics
+""", timeout=LONG_QUERY_TIMEOUT)
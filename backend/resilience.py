@@ -0,0 +1,148 @@
+"""
+Failure handling for the queries run by the API.
+
+run_query() (queries.py) gives every query a transaction timeout, retries
+transient errors a bounded number of times and runs it through a circuit
+breaker. After a few consecutive failures that point at the database itself
+(unreachable, restarting, timing out), the breaker opens and queries fail at
+once instead of holding a server thread each; once `reset_timeout` has
+passed a single probe query is let through and its outcome closes or reopens
+it. While queries fail, the response cache serves the last good responses
+marked as stale (see cache.py).
+
+The breaker logs one warning when it opens; handlers log their errors with
+log_failure(), which leaves out the traceback of every rejected query.
+"""
+import logging
+import random
+import sys
+import threading
+import time
+
+from neo4j.exceptions import ConnectionAcquisitionTimeoutError, ServiceUnavailable, SessionExpired, TransientError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of running a query while the circuit breaker is open."""
+
+
+def is_timeout(error):
+    """A transaction that ran past its timeout or a request that waited too long for a pooled connection."""
+    return (isinstance(error, ConnectionAcquisitionTimeoutError)
+            or "TransactionTimedOut" in (getattr(error, "code", None) or ""))
+
+
+def is_unavailable(error):
+    """Errors that say the database is failing, not the query: they count against the breaker."""
+    return isinstance(error, (ServiceUnavailable, SessionExpired, TransientError)) or is_timeout(error)
+
+
+def is_retryable(error):
+    """Transient errors worth running the query again for; a timed out query would only time out again."""
+    return isinstance(error, (ServiceUnavailable, SessionExpired, TransientError)) and not is_timeout(error)
+
+
+def log_failure(log, message, *args):
+    """
+    log.exception() for the error being handled, except queries rejected by the
+    open breaker: it already warned when it opened, so they go to debug without
+    a traceback.
+    """
+    error = sys.exc_info()[1]
+    if isinstance(error, CircuitOpenError):
+        log.debug(message + " (%s)", *args, error)
+    else:
+        log.exception(message, *args)
+
+
+def backoff(attempt, base=0.1, cap=2.0):
+    """Seconds to wait before retry number `attempt` (0-based): exponential with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive availability failures and
+    rejects calls for `reset_timeout` seconds; then lets one probe through.
+    Thread-safe.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self.rejected = 0
+        # Token of the call let through while half-open, until it is recorded
+        self._probe = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """False while calls would be rejected (open and not yet due for a probe)."""
+        with self._lock:
+            if self.state == OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not (self.state == HALF_OPEN and self._probe is not None)
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not run; otherwise let it
+        through and return the token to pass to record(): the probe's own
+        token while half-open, None otherwise.
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == OPEN or (self.state == HALF_OPEN and self._probe is not None):
+                self.rejected += 1
+                raise CircuitOpenError("the database circuit breaker is open")
+            if self.state == HALF_OPEN:
+                self._probe = object()
+                return self._probe
+            return None
+
+    def record(self, error=None, token=None):
+        """
+        Outcome of a call let through by before_call(), with the token it
+        returned; errors other than availability ones count as success. While
+        half-open only the probe's outcome counts: calls that started earlier
+        and end meanwhile neither close the breaker nor free the probe slot.
+        """
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if token is None or token is not self._probe:
+                    return
+                self._probe = None
+            if error is None or not is_unavailable(error):
+                if self.state != CLOSED:
+                    logger.info("Database circuit breaker closed")
+                self.state = CLOSED
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                    logger.warning("Database circuit breaker open after %d failures (%s); "
+                                   "queries fail fast for %.0f s", self.failures, error, self.reset_timeout)
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout": self.reset_timeout,
+                "opens": self.opens,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,213 @@
+"""
+Crea (de forma idempotente) las restricciones e índices que necesitan las
+consultas de la API y verifica sus planes de ejecución.
+
+Para cada consulta registrada en queries.py ejecuta PROFILE (o EXPLAIN con --explain),
+suma los db hits y comprueba que no haya AllNodesScan/NodeByLabelScan sobre
+las etiquetas en las que se espera una búsqueda por índice. Muestra una
+comparación antes/después de crear el esquema y termina con código 1 si
+algún plan sigue incumpliendo lo esperado.
+
+Uso:
+    python schema.py             # crea el esquema y compara antes/después
+    python schema.py --check     # sólo verifica, no crea nada
+    python schema.py --explain   # usa EXPLAIN: no ejecuta las consultas (sin db hits)
+"""
+import argparse
+import sys
+
+from neo4j.exceptions import Neo4jError
+
+from db import DATABASE, create_driver
+from queries import QUERIES
+
+# (nombre, etiqueta, propiedad) de las claves únicas
+CONSTRAINTS = [
+    ('articulo_url', 'Articulo', 'url'),
+    ('hecho_nombre', 'Hecho', 'nombre'),
+    ('evento_macro_nombre', 'EventoMacro', 'nombre'),
+    ('topic_nombre', 'Topic', 'nombre'),
+    ('periodico_nombre', 'Periodico', 'nombre'),
+    ('proceso_estado_nombre', 'ProcesoEstado', 'nombre'),
+]
+
+INDEXES = [
+    "CREATE INDEX articulo_fecha_dia IF NOT EXISTS FOR (n:Articulo) ON (n.fecha_dia)",
+    "CREATE INDEX articulo_fecha IF NOT EXISTS FOR (n:Articulo) ON (n.fecha)",
+    "CREATE INDEX articulo_resumen_seq IF NOT EXISTS FOR (n:Articulo) ON (n.resumen_seq)",
+    "CREATE INDEX fecha_fecha IF NOT EXISTS FOR (n:Fecha) ON (n.fecha)",
+    "CREATE INDEX hecho_fecha IF NOT EXISTS FOR (n:Hecho) ON (n.fecha)",
+    "CREATE INDEX hecho_cob_ultima_fecha IF NOT EXISTS FOR (n:Hecho) ON (n.cob_ultima_fecha)",
+    "CREATE INDEX hecho_cob_fecha IF NOT EXISTS FOR (n:Hecho) ON (n.cob_fecha)",
+    "CREATE INDEX hecho_cob_seq IF NOT EXISTS FOR (n:Hecho) ON (n.cob_seq)",
+    "CREATE INDEX dia_resumen_fecha IF NOT EXISTS FOR (n:DiaResumen) ON (n.fecha)",
+    "CREATE INDEX dia_topic_resumen_topic IF NOT EXISTS FOR (n:DiaTopicResumen) ON (n.topic, n.fecha)",
+]
+
+# (nombre, etiqueta, propiedades) de los índices de texto completo de /api/search,
+# con el analizador de Lucene para español (minúsculas, stop words y raíces)
+FULLTEXT_INDEXES = [
+    ('articulo_texto', 'Articulo', ['titulo', 'contenido']),
+    ('hecho_texto', 'Hecho', ['nombre', 'descripcion']),
+]
+
+SAMPLE_QUERIES = {
+    'date': "MATCH (d:DiaResumen) RETURN max(d.fecha)",
+    'topic': "MATCH (t:Topic) RETURN t.nombre LIMIT 1",
+    'macro': "MATCH (m:EventoMacro) RETURN m.nombre LIMIT 1",
+    'hecho': "MATCH (h:Hecho) RETURN h.nombre LIMIT 1",
+    'url': "MATCH (a:Articulo) RETURN a.url LIMIT 1",
+}
+
+
+def news_params(samples, topic=None):
+    params = {'date': samples['date'], 'cursor_url': None, 'limit': 1000,
+              'with_summary': True, 'with_source': True}
+    if topic:
+        params['topic'] = topic
+    return params
+
+
+def search_params(samples):
+    return {'query': 'gobierno', 'date_from': None, 'date_to': None, 'topics': None, 'sources': None,
+            'cursor_score': None, 'cursor_key': None, 'limit': 20}
+
+
+# (consulta registrada, parámetros, etiquetas que no deben recorrerse enteras)
+PLAN_CHECKS = [
+    ('latest_date', lambda s: {}, []),
+    ('dates', lambda s: {}, []),
+    ('dates_by_topic', lambda s: {'topic': s['topic']}, ['DiaTopicResumen']),
+    ('news', news_params, ['Articulo']),
+    ('news_by_topic', lambda s: news_params(s, s['topic']), ['Articulo', 'Topic']),
+    ('news_range', lambda s: dict(news_params(s), date_from=s['date'], date_to=s['date'],
+                                  topics=[s['topic']], cursor_date=None), ['Articulo']),
+    ('news_since', lambda s: dict(news_params(s), date_from=s['date'], date_to=s['date'], topics=None,
+                                  since=0, until=1), ['Articulo']),
+    ('news_summaries', lambda s: {'urls': [s['url']]}, ['Articulo']),
+    ('news_detail', lambda s: {'url': s['url']}, ['Articulo']),
+    ('topics', lambda s: {}, []),
+    ('dates_by_topics', lambda s: {'topics': [s['topic']]}, ['Topic']),
+    ('topics_by_dates', lambda s: {'date_from': s['date'], 'date_to': s['date']}, []),
+    ('macros', lambda s: {}, []),
+    ('recent_hechos', lambda s: {'max_date': s['date']}, ['Hecho']),
+    ('hechos_by_date', lambda s: {'date': s['date']}, ['Hecho']),
+    ('hechos_since', lambda s: {'since': 0, 'until': 1, 'max_date': s['date'], 'macro_name': None,
+                                'limit': 100}, ['Hecho']),
+    ('timeline', lambda s: {'macro_name': s['macro']}, ['EventoMacro']),
+    ('continuity', lambda s: {'macro_name': s['macro']}, ['EventoMacro']),
+    ('search_articles', search_params, ['Articulo']),
+    ('search_hechos', search_params, ['Hecho']),
+    ('hecho_articles', lambda s: {'hecho_id': s['hecho']}, ['Hecho']),
+    ('hechos_articles', lambda s: {'ids': [s['hecho']]}, ['Hecho']),
+]
+
+SCAN_OPERATORS = ('AllNodesScan', 'NodeByLabelScan', 'UnionNodeByLabelsScan', 'IntersectionNodeByLabelsScan')
+
+
+def ensure_schema(session):
+    for name, label, prop in CONSTRAINTS:
+        try:
+            session.run(f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                        f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE").consume()
+        except Neo4jError as e:
+            # Datos duplicados o un índice previo sobre la misma propiedad
+            print(f'  Aviso: no se pudo crear la restricción {name} ({e.code}); se usa un índice')
+            session.run(f"CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON (n.{prop})").consume()
+    for statement in INDEXES:
+        session.run(statement).consume()
+    for name, label, props in FULLTEXT_INDEXES:
+        fields = ', '.join(f'n.{prop}' for prop in props)
+        try:
+            session.run(f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS FOR (n:{label}) ON EACH [{fields}] "
+                        "OPTIONS {indexConfig: {`fulltext.analyzer`: 'spanish'}}").consume()
+        except Neo4jError as e:
+            # Servidores sin índices de texto completo: la API usa su índice en memoria
+            print(f'  Aviso: no se pudo crear el índice de texto {name} ({e.code}); '
+                  'la búsqueda usará el índice en memoria')
+    session.run("CALL db.awaitIndexes(300)").consume()
+
+
+def load_samples(session):
+    samples = {key: session.run(query).single() for key, query in SAMPLE_QUERIES.items()}
+    samples = {key: (record[0] if record else None) for key, record in samples.items()}
+    samples['date'] = samples['date'] or '2025-01-01'
+    return samples
+
+
+def walk_plan(plan):
+    yield plan
+    for child in plan.get('children', []):
+        yield from walk_plan(child)
+
+
+def scan_violations(plan, labels):
+    violations = []
+    for op in walk_plan(plan):
+        operator = op.get('operatorType', '').split('@')[0]
+        if operator not in SCAN_OPERATORS or not labels:
+            continue
+        details = str(op.get('args', {}).get('Details', ''))
+        if operator == 'AllNodesScan' or any(f':{label}' in details for label in labels):
+            violations.append(f'{operator} {details}'.strip())
+    return violations
+
+
+def profile_all(session, samples, explain=False):
+    prefix = 'EXPLAIN ' if explain else 'PROFILE '
+    report = {}
+    for name, params, seek_labels in PLAN_CHECKS:
+        try:
+            summary = session.run(prefix + QUERIES[name].text, params(samples)).consume()
+        except Neo4jError as e:
+            report[name] = {'error': e.code, 'db_hits': None, 'violations': []}
+            continue
+        plan = summary.plan if explain else summary.profile
+        report[name] = {
+            'db_hits': None if explain else sum(op.get('dbHits', 0) for op in walk_plan(plan)),
+            'violations': scan_violations(plan, seek_labels),
+        }
+    return report
+
+
+def format_hits(hits):
+    return '-' if hits is None else str(hits)
+
+
+def print_comparison(before, after):
+    print(f"{'consulta':<18} {'db hits antes':>14} {'db hits después':>16}  plan")
+    for name, _, _ in PLAN_CHECKS:
+        old, new = before[name], after[name]
+        if new.get('error'):
+            status = f"ERROR {new['error']}"
+        elif new['violations']:
+            status = 'ESCANEO: ' + '; '.join(new['violations'])
+        else:
+            status = 'ok'
+        print(f"{name:<18} {format_hits(old['db_hits']):>14} {format_hits(new['db_hits']):>16}  {status}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Crea el esquema Neo4j y verifica los planes de la API.')
+    parser.add_argument('--check', action='store_true', help='sólo verifica, no crea el esquema')
+    parser.add_argument('--explain', action='store_true', help='usa EXPLAIN en vez de PROFILE')
+    args = parser.parse_args()
+
+    driver = create_driver()
+    try:
+        with driver.session(database=DATABASE) as session:
+            samples = load_samples(session)
+            before = profile_all(session, samples, explain=args.explain)
+            after = before
+            if not args.check:
+                print('Creando restricciones e índices...')
+                ensure_schema(session)
+                after = profile_all(session, samples, explain=args.explain)
+            print_comparison(before, after)
+    finally:
+        driver.close()
+
+    failed = [name for name, result in after.items() if result['violations'] or result.get('error')]
+    if failed:
+        print(f"\n{len(failed)} consulta(s) sin el plan esperado: {', '.join(failed)}")
+        sys.exit(1)
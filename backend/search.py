@@ -0,0 +1,310 @@
+"""
+Full-text search helpers for /api/search.
+
+Searches normally run in Neo4j on the `articulo_texto` and `hecho_texto`
+fulltext indexes (Lucene, `spanish` analyzer) created by schema.py. This
+module builds their Lucene queries, highlights the matched terms in the
+results and, for servers without fulltext procedures or indexes, provides an
+in-process inverted index answering the same searches.
+
+The analyzer here mirrors Lucene's SpanishAnalyzer closely enough for both
+jobs: lowercase, a Spanish stop list and SpanishLightStemmer (accents folded,
+plural and gender endings removed), so "elecciones" matches "elección".
+"""
+import html
+import logging
+import math
+import re
+import threading
+import time
+from array import array
+
+from queries import run_query
+from resilience import log_failure
+
+logger = logging.getLogger(__name__)
+
+WORD = re.compile(r"\w+", re.UNICODE)
+# "quoted phrase" or a single word
+QUERY_TERM = re.compile(r'"([^"]+)"|(\S+)')
+LUCENE_SPECIAL = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes como con contra cual cuando de del desde donde durante e el
+ella ellas ellos en entre era eran es esa esas ese eso esos esta estaba estas este esto estos fue
+fueron ha han hasta hay la las le les lo los mas me mi mucho muchos muy ni no nos o os otra otras
+otro otros para pero poco por porque que quien quienes se sea ser si sin sobre su sus tambien
+tanto te ti todo todos tu un una uno unos y ya yo
+""".split())
+
+ACCENTS = str.maketrans("àáâäèéêëìíîïòóôöùúûü", "aaaaeeeeiiiioooouuuu")
+
+SNIPPET_CHARS = 220
+
+# BM25 parameters of the in-process index (Lucene's defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def stem(word):
+    """Lucene's SpanishLightStemmer on a lowercased word."""
+    word = word.translate(ACCENTS)
+    if len(word) < 5:
+        return word
+    if word[-1] in "oae":
+        return word[:-1]
+    if word[-1] == "s":
+        if word.endswith("eses"):
+            return word[:-2]
+        if word.endswith("ces"):
+            return word[:-3] + "z"
+        if word[-2] in "oae":
+            return word[:-2]
+    return word
+
+
+def analyze(text):
+    """Indexed terms of `text`, in order (stop words removed)."""
+    terms = []
+    for match in WORD.finditer(text.lower()):
+        word = match.group()
+        if word.translate(ACCENTS) not in STOPWORDS:
+            terms.append(stem(word))
+    return terms
+
+
+def parse_query(text):
+    """
+    Groups of terms a document must all contain: one group per word and one
+    per quoted phrase (its words, in the in-process index, in any order).
+    Returns (groups, lucene query).
+    """
+    groups = []
+    clauses = []
+    for phrase, word in QUERY_TERM.findall(text):
+        source = phrase or word
+        terms = analyze(source)
+        if not terms:
+            continue
+        groups.append(terms)
+        # Lowercase so words like AND/OR/NOT are searched, not read as operators
+        escaped = LUCENE_SPECIAL.sub(r"\\\1", source.lower())
+        clauses.append(f'"{escaped}"' if phrase else escaped)
+    return groups, " AND ".join(clauses)
+
+
+def highlight(text, terms, window=None):
+    """
+    HTML-escaped `text` with the words matching `terms` in <mark>. With
+    `window`, only a snippet of about that many characters around the first
+    match (the start of the text if none matches).
+    """
+    text = text or ""
+    terms = set(terms)
+    matches = [m for m in WORD.finditer(text) if stem(m.group().lower()) in terms]
+    start, end = 0, len(text)
+    if window is not None and len(text) > window:
+        first = matches[0].start() if matches else 0
+        start = max(0, first - window // 4)
+        end = min(len(text), start + window)
+        # Do not cut words at the edges
+        while start > 0 and text[start - 1].isalnum():
+            start -= 1
+        while end < len(text) and text[end].isalnum():
+            end += 1
+    parts = ["…" if start > 0 else ""]
+    position = start
+    for match in matches:
+        if match.start() < start or match.end() > end:
+            continue
+        parts.append(html.escape(text[position:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        position = match.end()
+    parts.append(html.escape(text[position:end]))
+    parts.append("…" if end < len(text) else "")
+    return "".join(parts)
+
+
+class Documents:
+    """Postings and metadata of one kind of document (articles or hechos)."""
+
+    def __init__(self):
+        self.keys = []
+        self.meta = []
+        self.lengths = array("i")
+        self.postings = {}
+        self.total_length = 0
+        self.positions = {}
+
+    def add(self, key, text, meta):
+        """Index a document; for a key already indexed only its metadata is replaced."""
+        if key in self.positions:
+            self.meta[self.positions[key]] = meta
+            return
+        doc = len(self.keys)
+        self.positions[key] = doc
+        self.keys.append(key)
+        self.meta.append(meta)
+        terms = analyze(text)
+        self.lengths.append(len(terms))
+        self.total_length += len(terms)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            docs = self.postings.get(term)
+            if docs is None:
+                docs = self.postings[term] = (array("i"), array("i"))
+            docs[0].append(doc)
+            docs[1].append(count)
+
+    def search(self, groups, accept):
+        """[(score, key, meta)] of the documents containing every group and passing `accept(meta)`."""
+        if not self.keys:
+            return []
+        terms = {term for group in groups for term in group}
+        if any(term not in self.postings for term in terms):
+            return []
+        # Intersect starting from the rarest term
+        ordered = sorted(terms, key=lambda term: len(self.postings[term][0]))
+        candidates = set(self.postings[ordered[0]][0])
+        for term in ordered[1:]:
+            candidates.intersection_update(self.postings[term][0])
+            if not candidates:
+                return []
+        candidates = {doc for doc in candidates if accept(self.meta[doc])}
+        scores = dict.fromkeys(candidates, 0.0)
+        count = len(self.keys)
+        average = self.total_length / count or 1
+        for term in ordered:
+            docs, frequencies = self.postings[term]
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc, frequency in zip(docs, frequencies):
+                if doc in scores:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc] / average)
+                    scores[doc] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return [(score, self.keys[doc], self.meta[doc]) for doc, score in scores.items()]
+
+
+class SearchIndex:
+    """
+    In-process inverted index over article titles and contents and hecho
+    names and descriptions, for servers without fulltext search. Articles
+    are added incrementally by daily_summary.py batch (a.resumen_seq, like
+    article_index.py) and hechos by hecho_coverage.py run (h.cob_seq). Contents are not kept:
+    snippets of articles are built from their summary read from Neo4j.
+    """
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+        self.articles = Documents()
+        self.hechos = Documents()
+        self.articles_seq = 0
+        self.hechos_seq = -1
+        self.ready = False
+        self.loaded_at = None
+        self.load_seconds = None
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def refresh(self, driver, database):
+        """Index the articles and hechos added since the last refresh. Returns the count added."""
+        with self._lock:
+            start = time.perf_counter()
+            added = 0
+            with driver.session(database=database) as session:
+                max_seq = run_query(session, "index_state")[0]["version"] or 0
+                # Keyset (seq, elementId) of the last article read, as in ArticleIndex.refresh()
+                last_seq, last_key = self.articles_seq, None
+                while last_seq < max_seq or last_key is not None:
+                    batch = run_query(session, "search_index_articles", last_seq=last_seq, last_key=last_key,
+                                      max_seq=max_seq, limit=self.batch_size)
+                    for record in batch:
+                        meta = (record["date"], record["source"], frozenset(record["topics"] or ()),
+                                record["title"] or "")
+                        self.articles.add(record["url"], f"{record['title'] or ''}\n{record['content'] or ''}", meta)
+                    added += len(batch)
+                    if len(batch) < self.batch_size:
+                        break
+                    last_seq, last_key = batch[-1]["seq"], batch[-1]["key"]
+                self.articles_seq = max(self.articles_seq, max_seq)
+                for record in run_query(session, "search_index_hechos", since=self.hechos_seq):
+                    meta = (record["date"], frozenset(record["newspapers"] or ()), frozenset(record["topics"] or ()),
+                            record["descripcion"] or "", record["macroevento"], record["newspapers"] or [])
+                    self.hechos.add(record["id"], f"{record['id']}\n{record['descripcion'] or ''}", meta)
+                    self.hechos_seq = max(self.hechos_seq, record["seq"] or 0)
+                    added += 1
+            self.ready = True
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - start
+            if added:
+                logger.info("Search index: %d documents added in %.1f s (%d articles, %d hechos)",
+                            added, self.load_seconds, len(self.articles.keys), len(self.hechos.keys))
+            return added
+
+    def _articles(self, groups, date_from, date_to, topics, sources):
+        def accept(meta):
+            date, source, article_topics, _ = meta
+            return ((date_from is None or (date or "") >= date_from)
+                    and (date_to is None or (date is not None and date <= date_to))
+                    and (not topics or not topics.isdisjoint(article_topics))
+                    and (not sources or source in sources))
+        return self.articles.search(groups, accept)
+
+    def _hechos(self, groups, date_from, date_to, topics, sources):
+        def accept(meta):
+            date, newspapers, hecho_topics = meta[:3]
+            return ((date_from is None or (date or "") >= date_from)
+                    and (date_to is None or (date is not None and date <= date_to))
+                    and (not topics or not topics.isdisjoint(hecho_topics))
+                    and (not sources or not sources.isdisjoint(newspapers)))
+        return self.hechos.search(groups, accept)
+
+    def search(self, kind, groups, date_from=None, date_to=None, topics=(), sources=(), cursor=None, limit=20):
+        """
+        Same rows as the search_articles/search_hechos queries (articles
+        without `content`), by score and then key, after keyset `cursor`
+        [score, key].
+        """
+        find = self._articles if kind == "articles" else self._hechos
+        hits = find(groups, date_from, date_to, set(topics), set(sources))
+        hits.sort(key=lambda hit: (-hit[0], hit[1]))
+        if cursor is not None:
+            after = (-cursor[0], cursor[1])
+            hits = [hit for hit in hits if (-hit[0], hit[1]) > after]
+        rows = []
+        for score, key, meta in hits[:limit]:
+            if kind == "articles":
+                rows.append({"key": key, "score": score, "title": meta[3], "date": meta[0], "source": meta[1]})
+            else:
+                rows.append({"key": key, "score": score, "content": meta[3], "date": meta[0],
+                             "macroevento": meta[4], "newspapers": meta[5]})
+        return rows
+
+    def start(self, get_driver, database, interval=300):
+        """Load in a background thread, then refresh every `interval` seconds (0: load only)."""
+        def run():
+            while True:
+                try:
+                    self.refresh(get_driver(), database)
+                except Exception:
+                    self.errors += 1
+                    log_failure(logger, "Error refreshing the search index")
+                if interval <= 0 and self.ready:
+                    return
+                time.sleep(interval if interval > 0 else 30)
+
+        threading.Thread(target=run, name="search-index", daemon=True).start()
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "articles": len(self.articles.keys),
+            "hechos": len(self.hechos.keys),
+            "terms": len(self.articles.postings) + len(self.hechos.postings),
+            "articles_seq": self.articles_seq,
+            "hechos_seq": self.hechos_seq,
+            "loaded_at": self.loaded_at,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "errors": self.errors,
+        }
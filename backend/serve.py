@@ -0,0 +1,78 @@
+"""
+Production launcher for the API.
+
+Runs app.py under gunicorn with several worker processes, each with a pool
+of threads sharing one Neo4j driver. A slow query only holds its own thread;
+the other threads and workers keep serving. On Windows, where gunicorn is not
+available, it falls back to waitress (a single multi-threaded process).
+
+Usage:
+    python serve.py [--bind 0.0.0.0:5000] [--workers 4] [--threads 8]
+
+Defaults come from WEB_BIND, WEB_WORKERS, WEB_THREADS and WEB_TIMEOUT in
+.env. Keep NEO4J_MAX_POOL_SIZE >= threads per worker.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def default_workers():
+    return min(4, multiprocessing.cpu_count())
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class PrismaApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", args.bind)
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", args.threads)
+            self.cfg.set("timeout", args.timeout)
+            # Each worker imports the app itself, so it gets its own driver pool
+            self.cfg.set("preload_app", False)
+            self.cfg.set("accesslog", "-")
+
+        def load(self):
+            from app import app
+            return app
+
+    PrismaApplication().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+
+    from app import app
+
+    host, _, port = args.bind.rpartition(":")
+    serve(app, host=host or "0.0.0.0", port=int(port), threads=args.threads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Prisma API with production workers.")
+    parser.add_argument("--bind", default=os.getenv("WEB_BIND", "0.0.0.0:5000"))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_WORKERS", default_workers())))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WEB_THREADS", "8")))
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WEB_TIMEOUT", "60")))
+    args = parser.parse_args()
+    # The app sizes its share of threads for live-update streams from it
+    os.environ["WEB_THREADS"] = str(args.threads)
+
+    if sys.platform != "win32":
+        try:
+            run_gunicorn(args)
+            sys.exit(0)
+        except ImportError:
+            print("gunicorn is not installed, falling back to waitress")
+    try:
+        run_waitress(args)
+    except ImportError:
+        sys.exit("Install gunicorn (Linux/macOS) or waitress (Windows): pip install -r requirements.txt")
@@ -0,0 +1,125 @@
+"""
+Static snapshot of the read API.
+
+export_snapshot.py renders GET /api responses to files whose paths mirror the
+routes (`/api/news?date=2025-01-01` -> `api/news/date=2025-01-01.json`), next
+to pre-compressed `.gz`/`.br` siblings and a manifest with their ETags. When
+SNAPSHOT_DIR is set, app.py answers from those files and only falls through
+to Neo4j for requests the snapshot does not cover.
+"""
+import json
+import os
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+from flask import Response, request
+
+from cache import IGNORED_PARAMS, negotiate_encoding
+
+MANIFEST = "manifest.json"
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Longest file name most filesystems accept, minus room for the suffixes
+MAX_NAME_LENGTH = 240
+
+
+def snapshot_file(path, params=()):
+    """
+    Relative file for a request path and its (key, value) query pairs, or None
+    if the request cannot be mapped safely. Parameter order does not matter.
+    """
+    segments = path.strip("/").split("/")
+    if any(segment in ("", ".", "..") for segment in segments):
+        return None
+    params = sorted((k, v) for k, v in params if k not in IGNORED_PARAMS)
+    name = (urlencode(params) or "index") + ".json"
+    if len(name) > MAX_NAME_LENGTH:
+        return None
+    return "/".join([quote(segment, safe="") for segment in segments] + [name])
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Snapshot:
+    """
+    Serves an exported snapshot directory. The manifest is re-read when the
+    exporter replaces it, so a new export is picked up without a restart.
+    """
+
+    # Seconds between checks of the manifest
+    MANIFEST_CHECK_INTERVAL = 1.0
+
+    def __init__(self, root, max_age=300):
+        self.root = root
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._manifest_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def _entries(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._manifest_checked >= self.MANIFEST_CHECK_INTERVAL:
+                self._manifest_checked = now
+                try:
+                    mtime = os.stat(os.path.join(self.root, MANIFEST)).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime != self._manifest_mtime:
+                    self._manifest_mtime = mtime
+                    self._manifest = read_manifest(self.root) if mtime else {}
+            return self._manifest
+
+    def lookup(self, path, params):
+        rel = snapshot_file(path, params)
+        entry = self._entries().get(rel) if rel else None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return (rel, entry) if entry else (None, None)
+
+    def response(self):
+        """The snapshot response for the current request, or None to fall through."""
+        rel, entry = self.lookup(request.path, request.args.items(multi=True))
+        if entry is None:
+            return None
+
+        response = Response(mimetype="application/json")
+        response.headers["X-Cache"] = "SNAPSHOT"
+        response.set_etag(entry["etag"], weak=True)
+        response.vary.add("Accept-Encoding")
+        response.vary.add("Accept")
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        if request.if_none_match.contains_weak(entry["etag"]):
+            response.status_code = 304
+            return response
+
+        encoding = negotiate_encoding(entry["size"])
+        filename = os.path.join(self.root, *rel.split("/"))
+        if encoding in entry.get("encodings", ()):
+            filename += SUFFIXES[encoding]
+            response.headers["Content-Encoding"] = encoding
+        try:
+            with open(filename, "rb") as f:
+                response.set_data(f.read())
+        except OSError:
+            # Removed by a concurrent export: let the live handler answer
+            return None
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {"root": self.root, "files": len(self._manifest),
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,87 @@
+"""
+Opt-in NDJSON streaming for large list endpoints.
+
+Clients ask for it with `Accept: application/x-ndjson` or `?stream=1`. The
+Neo4j result cursor is consumed lazily and each item goes out as one JSON
+line, flushed in chunks. The first items arrive before the query has
+finished, and memory stays flat whatever the result size. Streamed responses
+are never cached.
+"""
+import json
+import logging
+
+from flask import Response, request
+
+from queries import stream_query
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+# Records built and flushed together (locations are extracted per chunk)
+CHUNK_SIZE = 200
+
+
+def wants_ndjson(req=None):
+    req = req or request
+    if req.args.get("stream") == "1":
+        return True
+    return req.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_chunk(items):
+    return "".join(json.dumps(item, separators=(",", ":")) + "\n" for item in items)
+
+
+def ndjson_response(chunks):
+    response = Response(chunks, mimetype=NDJSON_MIMETYPE)
+    response.headers["Cache-Control"] = "no-store"
+    # Keep proxies such as nginx from buffering the whole stream
+    response.headers["X-Accel-Buffering"] = "no"
+    response.vary.add("Accept")
+    return response
+
+
+def stream_records(driver, database, name, params, build, trailer=None, chunk_size=CHUNK_SIZE):
+    """
+    Stream registered query `name` as NDJSON. `build(records)` turns a chunk of
+    records into items; `trailer(last_record, count)` may return one last
+    object (e.g. a pagination cursor). The query starts before this returns,
+    so a failing query raises here instead of truncating a 200 response.
+    """
+    session = driver.session(database=database)
+    try:
+        records = stream_query(session, name, **params)
+        first = next(records, None)
+    except Exception:
+        session.close()
+        raise
+
+    def generate():
+        count = 0
+        last = None
+        chunk = [] if first is None else [first]
+        try:
+            for record in records:
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    count += len(chunk)
+                    last = chunk[-1]
+                    yield ndjson_chunk(build(chunk))
+                    chunk = []
+            if chunk:
+                count += len(chunk)
+                last = chunk[-1]
+                yield ndjson_chunk(build(chunk))
+            if trailer is not None:
+                extra = trailer(last, count)
+                if extra is not None:
+                    yield ndjson_chunk([extra])
+        except Exception:
+            # Headers are already sent: the stream just ends early
+            logger.exception("Error streaming %s", name)
+        finally:
+            records.close()
+            session.close()
+
+    return ndjson_response(generate())
@@ -0,0 +1,282 @@
+"""
+Latencia (p50/p95/p99) y peticiones por segundo de cada endpoint de la API
+con N clientes concurrentes.
+
+Por defecto monta la app Flask en el propio proceso sobre un grafo sintético
+en memoria (bench/memory_graph.py), con la caché de respuestas desactivada
+para medir el camino completo. También puede medir la app contra el Neo4j de
+backend/.env (cargado antes con bench/synthetic_graph.py) o un servidor ya
+arrancado (p. ej. con serve.py) por HTTP.
+
+Uso (desde la raíz del repositorio):
+    python bench/bench_api.py [--articles 10000] [--clients 1,8,32] [--duration 5] [--out api.json]
+    python bench/bench_api.py --backend neo4j [--cache]
+    python bench/bench_api.py --url http://localhost:5000 --endpoints news_date,bootstrap
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+from urllib.parse import quote, urlencode, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "backend"))
+
+from results import metadata, percentile, write_results  # noqa: E402
+
+NEWS_LIST_FIELDS = "id,city,lat,lng,title,source,url,date"
+# Búsquedas con palabras del vocabulario de synthetic_graph.py
+SEARCH_QUERIES = ["reforma laboral", "presupuesto", '"consejo de ministros"', "oposición congreso acuerdo"]
+
+
+def path(*segments, **params):
+    url = "/".join(quote(str(s), safe="") for s in segments)
+    params = {k: v for k, v in params.items() if v is not None}
+    return f"/{url}?{urlencode(params)}" if params else f"/{url}"
+
+
+# (nombre, función que recibe las muestras y devuelve las URLs que se van rotando)
+ENDPOINTS = [
+    ("bootstrap", lambda s: [path("api", "bootstrap", fields=NEWS_LIST_FIELDS)]),
+    ("news_latest", lambda s: [path("api", "news")]),
+    ("news_date", lambda s: [path("api", "news", date=d) for d in s["dates"]]),
+    ("news_date_fields", lambda s: [path("api", "news", date=d, fields=NEWS_LIST_FIELDS) for d in s["dates"]]),
+    ("news_date_topic", lambda s: [path("api", "news", date=d, topic=t) for d in s["dates"] for t in s["topics"]]),
+    ("news_page", lambda s: [path("api", "news", date=d, limit=100) for d in s["dates"]]),
+    ("news_range_topics", lambda s: ["/api/news?" + urlencode([("from", s["dates"][-1]), ("to", s["dates"][0]),
+                                                                ("topic", s["topics"][0]), ("topic", s["topics"][1]),
+                                                                ("fields", NEWS_LIST_FIELDS), ("limit", 100)])]),
+    ("news_stream", lambda s: [path("api", "news", date=d, stream=1) for d in s["dates"]]),
+    ("news_clusters", lambda s: [path("api", "news", "clusters", date=d, precision=3) for d in s["dates"]]),
+    ("news_since", lambda s: [path("api", "news", date=d, since=max(s["version"] - 500, -1), fields=NEWS_LIST_FIELDS)
+                              for d in s["dates"]]),
+    ("news_detail", lambda s: [path("api", "news", i) for i in s["articles"]]),
+    ("dates", lambda s: [path("api", "dates")]),
+    ("dates_topic", lambda s: [path("api", "dates", topic=t) for t in s["topics"]]),
+    ("topics", lambda s: [path("api", "topics")]),
+    ("topics_date", lambda s: [path("api", "topics", date=d) for d in s["dates"]]),
+    ("macros_timeline", lambda s: [path("api", "macros", "timeline")]),
+    ("macros", lambda s: [path("api", "macros")]),
+    ("timeline", lambda s: [path("api", "timeline", m) for m in s["macros"]]),
+    ("continuity", lambda s: [path("api", "continuity", m) for m in s["macros"]]),
+    ("continuity_window", lambda s: [path("api", "continuity", m, **{"from": s["dates"][-1], "to": s["dates"][0]}, limit=50)
+                                     for m in s["macros"]]),
+    ("search", lambda s: [path("api", "search", q=q) for q in SEARCH_QUERIES]),
+    ("search_filtered", lambda s: ["/api/search?" + urlencode([("q", q), ("from", s["dates"][-1]), ("to", s["dates"][0]),
+                                                                ("topic", s["topics"][0]), ("limit", 50)])
+                                   for q in SEARCH_QUERIES]),
+    ("search_hechos", lambda s: [path("api", "search", q=q, type="hechos") for q in SEARCH_QUERIES]),
+    ("hechos_recent", lambda s: [path("api", "hechos", "recent")]),
+    ("hechos_since", lambda s: [path("api", "hechos", "recent", since=0)]),
+    ("hechos_by_date", lambda s: [path("api", "hechos", "by-date", d) for d in s["hecho_dates"]]),
+    ("hecho_articles", lambda s: [path("api", "hecho", h, "articles") for h in s["hechos"]]),
+    ("hechos_articles", lambda s: ["/api/hechos/articles?" + urlencode([("ids", h) for h in s["hechos"][:20]])]),
+]
+
+
+class InProcessClient:
+    """Cliente de pruebas de Flask: mide la app sin red."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, url):
+        response = self.client.get(url)
+        body = response.get_data()
+        return response.status_code, body
+
+
+class HTTPClient:
+    """Una conexión keep-alive por hilo contra un servidor ya arrancado."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def get(self, url):
+        self.connection.request("GET", url)
+        response = self.connection.getresponse()
+        return response.status, response.read()
+
+
+def discover(client):
+    """Fechas, topics, hechos, macroeventos y artículos reales sobre los que rotar."""
+    def get_json(url):
+        status, body = client.get(url)
+        if status != 200:
+            raise RuntimeError(f"{url}: HTTP {status}")
+        return json.loads(body)
+
+    dates = [d["date"] for d in get_json("/api/dates")][:30]
+    if not dates:
+        raise RuntimeError("la API no devuelve fechas: ¿está el grafo cargado y preparado?")
+    hechos = get_json("/api/hechos/recent")
+    macros = [m["nombre"] for m in get_json("/api/macros/timeline")]
+    news = get_json(path("api", "news", date=dates[0], fields="id"))
+    return {
+        "dates": dates,
+        "topics": [t["topic"] for t in get_json("/api/topics")][:5],
+        "hechos": [h["id"] for h in hechos][:40],
+        "hecho_dates": sorted({h["date"] for h in hechos if h["date"]})[:20],
+        "macros": macros,
+        "articles": [n["id"] for n in news if n.get("id")][:50],
+        # Versión de artículos actual: news_since pide los 500 últimos procesados
+        "version": get_json("/api/changes/version")["articles"],
+    }
+
+
+def run_load(make_client, urls, clients, duration):
+    """Lanza `clients` hilos que piden `urls` en rueda durante `duration` segundos."""
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    sizes = [0] * clients
+    start_barrier = threading.Barrier(clients + 1)
+
+    def worker(index):
+        client = make_client()
+        position = index
+        start_barrier.wait()
+        deadline = time.perf_counter() + duration
+        while True:
+            url = urls[position % len(urls)]
+            position += 1
+            started = time.perf_counter()
+            if started >= deadline:
+                break
+            try:
+                status, body = client.get(url)
+                failed = status >= 400
+                sizes[index] += len(body)
+            except Exception:
+                failed = True
+            latencies[index].append((time.perf_counter() - started) * 1000)
+            errors[index] += int(failed)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    start_barrier.wait()
+    wall = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall
+
+    values = sorted(v for thread_values in latencies for v in thread_values)
+    requests = len(values)
+    return {
+        "requests": requests,
+        "errors": sum(errors),
+        "rps": round(requests / wall, 1) if wall else 0.0,
+        "mean_ms": round(sum(values) / requests, 3) if requests else None,
+        "p50_ms": round(percentile(values, 50), 3) if requests else None,
+        "p95_ms": round(percentile(values, 95), 3) if requests else None,
+        "p99_ms": round(percentile(values, 99), 3) if requests else None,
+        "max_ms": round(values[-1], 3) if requests else None,
+        "avg_bytes": round(sum(sizes) / requests) if requests else None,
+    }
+
+
+def setup_in_process(args):
+    """Importa la app con la configuración del benchmark y, si toca, el grafo en memoria."""
+    # Nunca servir desde una exportación estática ni compartir la caché con otro proceso
+    os.environ["SNAPSHOT_DIR"] = ""
+    os.environ["CACHE_GENERATION_FILE"] = ""
+    # El índice de artículos se carga aquí abajo, ya con el driver definitivo
+    os.environ["ARTICLE_INDEX"] = ""
+    if not args.cache:
+        os.environ["CACHE_MAX_ENTRIES"] = "0"
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        import app as api
+
+    meta = {"target": args.backend, "cache": args.cache, "article_index": args.index}
+    if args.backend == "memory":
+        from memory_graph import MemoryDriver
+        from synthetic_graph import SyntheticGraph
+
+        start = time.perf_counter()
+        graph = SyntheticGraph(args.articles, args.seed)
+        api.driver = MemoryDriver(graph)
+        print(f"Grafo en memoria: {graph.summary()} ({time.perf_counter() - start:.1f} s)")
+        meta["graph"] = graph.summary()
+        # Sin procedimientos de texto completo: /api/search usa el índice en memoria, cargado aquí
+        from search import SearchIndex
+
+        start = time.perf_counter()
+        api.search_backend = "memory"
+        api.search_index = SearchIndex()
+        api.search_index.refresh(api.driver, api.DATABASE)
+        stats = api.search_index.stats()
+        print(f"Índice de búsqueda: {stats['articles']} artículos, {stats['hechos']} hechos "
+              f"({time.perf_counter() - start:.1f} s)")
+    if args.index:
+        from article_index import ArticleIndex
+
+        start = time.perf_counter()
+        api.article_index = ArticleIndex()
+        api.article_index.refresh(api.driver, api.DATABASE)
+        print(f"Índice de artículos: {api.article_index.stats()['articles']} artículos "
+              f"({time.perf_counter() - start:.1f} s)")
+    return api, meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "neo4j"], default="memory",
+                        help="grafo en memoria o el Neo4j de backend/.env (app en este proceso)")
+    parser.add_argument("--url", help="medir un servidor ya arrancado por HTTP en vez de la app en proceso")
+    parser.add_argument("--articles", type=int, default=10000, help="tamaño del grafo en memoria")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clients", default="1,8,32", help="niveles de concurrencia, separados por comas")
+    parser.add_argument("--duration", type=float, default=5.0, help="segundos por endpoint y nivel")
+    parser.add_argument("--endpoints", help="subconjunto de endpoints, separados por comas")
+    parser.add_argument("--cache", action="store_true", help="mantener activa la caché de respuestas")
+    parser.add_argument("--index", action="store_true", help="responder con el índice de artículos en memoria (NumPy)")
+    parser.add_argument("--out", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = lambda: HTTPClient(args.url)  # noqa: E731
+        meta = {"target": args.url}
+        quiet = contextlib.nullcontext()
+    else:
+        api, meta = setup_in_process(args)
+        make_client = lambda: InProcessClient(api.app)  # noqa: E731
+        # La app escribe una línea por petición; no medir la consola
+        quiet = contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    clients = [int(c) for c in args.clients.split(",")]
+    selected = set(args.endpoints.split(",")) if args.endpoints else None
+    with quiet:
+        samples = discover(make_client())
+
+    print(f"{'endpoint':<18} {'clientes':>8} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    results = {}
+    for name, make_urls in ENDPOINTS:
+        if selected and name not in selected:
+            continue
+        urls = make_urls(samples)
+        if not urls:
+            continue
+        results[name] = {}
+        for n in clients:
+            with quiet:
+                # Calentamiento: una pasada por cada URL
+                warm = make_client()
+                for url in urls[:20]:
+                    warm.get(url)
+                stats = run_load(make_client, urls, n, args.duration)
+            results[name][str(n)] = stats
+            print(f"{name:<18} {n:>8} {stats['rps']:>9.1f} {stats['p50_ms'] or 0:>9.2f} "
+                  f"{stats['p95_ms'] or 0:>9.2f} {stats['p99_ms'] or 0:>9.2f} {stats['errors']:>8}")
+
+    if args.out:
+        write_results(args.out, "api", metadata(duration=args.duration, **meta), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Micro-benchmark: gazetteer compilado vs. extract_location_from_text original.
+
+Mide también extract_location_from_text artículo a artículo, como la llama
+el código que no procesa por lotes. Con --out guarda los tiempos en JSON para
+compararlos entre commits con bench/compare.py.
+
+Uso (desde la raíz del repositorio):
+    python bench/bench_location_extractor.py [--articles 1000] [--places 50000] [--out loc.json]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from location_extractor import (SPANISH_CITIES, Gazetteer, extract_location_from_text,  # noqa: E402
+                                extract_locations)
+from results import metadata, write_results  # noqa: E402
+
+
+def legacy_extract_location_from_text(title, content):
+    """Implementación anterior: ordena el diccionario y hace un `in` por ciudad."""
+    text = (title + " " + (content[:500] if content else "")).lower()
+    sorted_cities = sorted(SPANISH_CITIES.items(), key=lambda x: len(x[0]), reverse=True)
+    for city_name, coords in sorted_cities:
+        if city_name in text:
+            return {"city": city_name.title(), "lat": coords["lat"], "lng": coords["lng"]}
+    return None
+
+
+WORDS = ("el gobierno anuncia nuevas medidas tras la reunión del consejo de ministros "
+         "con los agentes sociales para debatir la reforma laboral y el presupuesto").split()
+
+
+def make_articles(n, seed=42):
+    rng = random.Random(seed)
+    cities = list(SPANISH_CITIES)
+    articles = []
+    for _ in range(n):
+        body = [rng.choice(WORDS) for _ in range(90)]
+        if rng.random() < 0.7:
+            body.insert(rng.randrange(len(body)), rng.choice(cities))
+        title = " ".join(rng.choice(WORDS) for _ in range(10))
+        articles.append((title, " ".join(body)))
+    return articles
+
+
+def synthetic_places(n, seed=7):
+    rng = random.Random(seed)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    places = {}
+    while len(places) < n:
+        name = "".join(rng.choice(letters) for _ in range(rng.randint(5, 12)))
+        places[name] = {"lat": rng.uniform(-90, 90), "lng": rng.uniform(-180, 180)}
+    places.update(SPANISH_CITIES)
+    return places
+
+
+def timed(label, fn, articles, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(articles)
+        best = min(best, time.perf_counter() - start)
+    per_article = best / len(articles) * 1e6
+    print(f"{label:<38} {best * 1000:9.2f} ms   {per_article:8.2f} µs/artículo")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1000)
+    parser.add_argument("--places", type=int, default=50000, help="tamaño del gazetteer sintético grande")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="fichero JSON de resultados")
+    args = parser.parse_args()
+
+    articles = make_articles(args.articles)
+
+    legacy = timed("legacy (sort + substring scan)",
+                   lambda rows: [legacy_extract_location_from_text(t, c) for t, c in rows],
+                   articles, args.repeat)
+    compiled = timed(f"compiled ({len(SPANISH_CITIES)} lugares)", extract_locations, articles, args.repeat)
+    single = timed("extract_location_from_text (1 a 1)",
+                   lambda rows: [extract_location_from_text(t, c) for t, c in rows],
+                   articles, args.repeat)
+
+    start = time.perf_counter()
+    big = Gazetteer(synthetic_places(args.places))
+    build = time.perf_counter() - start
+    print(f"{'build ' + str(big.size) + ' lugares':<38} {build * 1000:9.2f} ms")
+    large = timed(f"compiled ({big.size} lugares)", lambda rows: extract_locations(rows, big),
+                  articles, args.repeat)
+
+    print(f"\nspeedup vs legacy: {legacy / compiled:.1f}x")
+
+    if args.out:
+        def per_article(seconds):
+            return round(seconds / len(articles) * 1e6, 3)
+        write_results(args.out, "location_extractor",
+                      metadata(articles=args.articles, places=big.size, repeat=args.repeat), {
+                          "legacy_us": per_article(legacy),
+                          "batch_us": per_article(compiled),
+                          "single_us": per_article(single),
+                          "large_gazetteer_us": per_article(large),
+                          "large_gazetteer_build_ms": round(build * 1000, 3),
+                          "speedup": round(legacy / compiled, 2),
+                      })
+
+
+if __name__ == "__main__":
+    main()
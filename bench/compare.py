@@ -0,0 +1,79 @@
+"""
+Compara dos ficheros de resultados de los benchmarks (p. ej. de dos commits)
+y muestra la variación de cada métrica. Con --fail-above termina con código 1
+si alguna latencia empeora (o el rendimiento cae) más de ese porcentaje.
+
+Uso:
+    python bench/compare.py antes.json despues.json [--fail-above 10]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from results import read_results  # noqa: E402
+
+# Métricas en las que más es mejor; en el resto (latencias, tiempos) menos es mejor
+HIGHER_IS_BETTER = {"rps", "speedup"}
+
+
+def flatten(results, prefix=""):
+    """{'news': {'8': {'p50_ms': 1.2}}} -> {'news/8/p50_ms': 1.2}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def change(metric, before, after):
+    """Variación en %, positiva cuando empeora."""
+    if not before:
+        return None
+    delta = (after - before) / before * 100
+    return -delta if metric in HIGHER_IS_BETTER else delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--fail-above", type=float, help="porcentaje de empeoramiento que hace fallar")
+    args = parser.parse_args()
+
+    before, after = read_results(args.before), read_results(args.after)
+    if before.get("kind") != after.get("kind"):
+        print(f"Aviso: se comparan resultados de tipos distintos ({before.get('kind')} / {after.get('kind')})")
+    print(f"antes:   {before['meta'].get('commit')} {before['meta'].get('date')}")
+    print(f"después: {after['meta'].get('commit')} {after['meta'].get('date')}\n")
+
+    old, new = flatten(before["results"]), flatten(after["results"])
+    regressions = []
+    print(f"{'métrica':<42} {'antes':>12} {'después':>12} {'cambio':>9}")
+    for name in sorted(old.keys() | new.keys()):
+        if name.endswith(("/requests", "/avg_bytes", "/errors")) and old.get(name) == new.get(name):
+            continue
+        if name not in old or name not in new:
+            print(f"{name:<42} {old.get(name, '-'):>12} {new.get(name, '-'):>12} {'':>9}")
+            continue
+        metric = name.rsplit("/", 1)[-1]
+        pct = change(metric, old[name], new[name])
+        worse = pct is not None and args.fail_above is not None and pct > args.fail_above
+        if worse and metric not in ("requests", "avg_bytes", "errors"):
+            regressions.append(name)
+        mark = " !" if name in regressions else ""
+        pct_text = "" if pct is None else f"{pct:+8.1f}%"
+        print(f"{name:<42} {old[name]:>12} {new[name]:>12} {pct_text:>9}{mark}")
+
+    if regressions:
+        print(f"\n{len(regressions)} métricas empeoran más de un {args.fail_above}% "
+              "(positivo = peor, también para rps)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Sustituto en memoria de Neo4j para los benchmarks: un driver con la misma
+interfaz que usa la API (driver.session(...).run(consulta, params)) que responde
+a las consultas del registro de backend/queries.py con estructuras en
+memoria construidas a partir de un SyntheticGraph.
+
+Las capas derivadas (fecha_dia, recuentos diarios, geolocalización y
+cobertura de hechos) se calculan al construirlo, como harían los scripts de
+mantenimiento. Sirve para medir el coste de la capa Python (Flask, caché,
+serialización, geolocalización) sin un Neo4j; una consulta del registro que
+aún no tenga equivalente aquí falla con NotImplementedError.
+"""
+import bisect
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from location_extractor import extract_locations  # noqa: E402
+from queries import QUERIES  # noqa: E402
+
+# Tamaño de lote por defecto de daily_summary.py: cada lote es un resumen_seq
+SUMMARY_BATCH = 1000
+# Mayor que cualquier url o elementId: (seq, LAST_KEY) ordena detrás de todos los artículos del lote seq
+LAST_KEY = "\U0010ffff"
+
+
+class Record(dict):
+    """Registro con acceso por nombre y por posición, como neo4j.Record."""
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return dict.__getitem__(self, key)
+
+
+class MemoryGraph:
+    def __init__(self, graph):
+        self.summary = graph.summary()
+        self.articles = {}
+        self.articles_by_element = {}
+        self.by_day = defaultdict(list)
+        self.by_day_topic = defaultdict(list)
+        self.topic_counts = defaultdict(int)
+        self.articles_by_hecho = defaultdict(list)
+
+        articles = list(graph.iter_articles())
+        locations = extract_locations((a["titulo"], a["contenido"]) for a in articles)
+        for article, location in zip(articles, locations):
+            article["fecha_dia"] = article["fecha"][:10]
+            article["resumen_seq"] = article["id"] // SUMMARY_BATCH + 1
+            article["geo"] = location
+            article["element_id"] = f"4:bench:{article['id']}"
+            self.articles[article["url"]] = article
+            self.articles_by_element[article["element_id"]] = article
+            self.by_day[article["fecha_dia"]].append(article)
+            for topic in article["topics"]:
+                self.by_day_topic[(article["fecha_dia"], topic)].append(article)
+                self.topic_counts[topic] += 1
+            if article["hecho"]:
+                self.articles_by_hecho[article["hecho"]].append(article)
+        # Equivalente al índice sobre fecha_dia + ORDER BY url
+        for day_articles in list(self.by_day.values()) + list(self.by_day_topic.values()):
+            day_articles.sort(key=lambda a: a["url"])
+
+        self.days = sorted(self.by_day)
+        # Orden de news_since: (resumen_seq, url); de index_articles y search_index_articles: (resumen_seq, elementId)
+        self.article_keys = sorted((a["resumen_seq"], a["url"]) for a in articles)
+        self.index_keys = sorted((a["resumen_seq"], a["element_id"]) for a in articles)
+        self.macros_by_name = {m["nombre"]: m for m in graph.macros}
+        self.sigue_a = defaultdict(list)
+        for link in graph.sigue_a:
+            self.sigue_a[link["desde"]].append(link["hasta"])
+        self.hechos = {}
+        for hecho in graph.hechos:
+            linked = self.articles_by_hecho[hecho["nombre"]]
+            dates = [a["fecha"] for a in linked]
+            latest = max(dates) if dates else None
+            self.hechos[hecho["nombre"]] = dict(
+                hecho,
+                cob_periodicos=sorted({a["periodico"] for a in linked}),
+                cob_ultima_fecha=latest,
+                cob_fecha=hecho["fecha"] or latest,
+                min_fecha=min((a["fecha"] for a in linked if a["con_fecha"]), default=None),
+                # Todos calculados en una única ejecución de hecho_coverage.py
+                cob_seq=1,
+            )
+        self.by_ultima_fecha = sorted((h for h in self.hechos.values() if h["cob_ultima_fecha"]),
+                                      key=lambda h: h["cob_ultima_fecha"])
+        self.by_cob_fecha = sorted((h for h in self.hechos.values() if h["cob_fecha"]),
+                                   key=lambda h: h["cob_fecha"])
+        self.ultima_fecha_keys = [h["cob_ultima_fecha"] for h in self.by_ultima_fecha]
+        self.cob_fecha_keys = [h["cob_fecha"] for h in self.by_cob_fecha]
+
+    # Una función por consulta del registro, con los mismos nombres de columna
+
+    def latest_date(self, p):
+        return [Record(latest=self.days[-1] if self.days else None)]
+
+    def dates(self, p):
+        return [Record(date=day, count=len(self.by_day[day])) for day in reversed(self.days)]
+
+    def dates_by_topic(self, p):
+        return [Record(date=day, count=len(self.by_day_topic[(day, p["topic"])]))
+                for day in reversed(self.days) if (day, p["topic"]) in self.by_day_topic]
+
+    def news(self, p):
+        return self._news(self.by_day.get(p["date"], []), p)
+
+    def news_by_topic(self, p):
+        return self._news(self.by_day_topic.get((p["date"], p["topic"]), []), p)
+
+    def _news(self, articles, p):
+        start = 0
+        if p["cursor_url"] is not None:
+            start = bisect.bisect_right([a["url"] for a in articles], p["cursor_url"])
+        return [self._news_record(a, p["with_summary"], p["with_source"])
+                for a in articles[start:start + p["limit"]]]
+
+    def _news_record(self, a, with_summary=True, with_source=True):
+        geo = a["geo"] or {}
+        return Record(title=a["titulo"], summary=a["contenido"] if with_summary else None,
+                      url=a["url"], source=a["periodico"] if with_source else None,
+                      date=a["fecha_dia"], geocoded=1, city=geo.get("city"),
+                      lat=geo.get("lat"), lng=geo.get("lng"))
+
+    def news_range(self, p):
+        topics = set(p["topics"]) if p["topics"] is not None else None
+        cursor = (p["cursor_date"], p["cursor_url"]) if p["cursor_date"] is not None else None
+        records = []
+        for day in reversed(self.days):
+            if not p["date_from"] <= day <= p["date_to"] or (cursor and day > cursor[0]):
+                continue
+            for a in self.by_day[day]:
+                if cursor and day == cursor[0] and a["url"] <= cursor[1]:
+                    continue
+                if topics is None or topics.intersection(a["topics"]):
+                    records.append(self._news_record(a, p["with_summary"], p["with_source"]))
+                    if len(records) >= p["limit"]:
+                        return records
+        return records
+
+    def news_summaries(self, p):
+        return [Record(url=url, summary=self.articles[url]["contenido"]) for url in p["urls"] if url in self.articles]
+
+    def news_detail(self, p):
+        article = self.articles.get(p["url"])
+        return [self._news_record(article)] if article else []
+
+    def topics(self, p):
+        ranked = sorted(self.topic_counts.items(), key=lambda item: -item[1])[:50]
+        return [Record(topic=topic, count=count) for topic, count in ranked]
+
+    def dates_by_topics(self, p):
+        counts = defaultdict(int)
+        topics = set(p["topics"])
+        for day in self.days:
+            counts[day] = sum(1 for a in self.by_day[day] if topics.intersection(a["topics"]))
+        return [Record(date=day, count=counts[day]) for day in reversed(self.days) if counts[day]]
+
+    def topics_by_dates(self, p):
+        counts = defaultdict(int)
+        for (day, topic), articles in self.by_day_topic.items():
+            if p["date_from"] <= day <= p["date_to"]:
+                counts[topic] += len(articles)
+        ranked = sorted(counts.items(), key=lambda item: -item[1])[:50]
+        return [Record(topic=topic, count=count) for topic, count in ranked]
+
+    @staticmethod
+    def _keys_after(keys, seq, key, max_seq, limit=None):
+        """Claves posteriores a (seq, key) hasta el lote max_seq; sin key, a partir del lote siguiente."""
+        start = bisect.bisect_right(keys, (seq, LAST_KEY if key is None else key))
+        end = bisect.bisect_right(keys, (max_seq, LAST_KEY))
+        return keys[start:end if limit is None else min(end, start + limit)]
+
+    def index_state(self, p):
+        return [Record(version=self.article_keys[-1][0] if self.article_keys else None)]
+
+    def index_articles(self, p):
+        records = []
+        for seq, key in self._keys_after(self.index_keys, p["last_seq"], p["last_key"], p["max_seq"], p["limit"]):
+            a = self.articles_by_element[key]
+            geo = a["geo"] or {}
+            records.append(Record(seq=seq, key=key, url=a["url"], title=a["titulo"], date=a["fecha_dia"],
+                                  source=a["periodico"], topics=a["topics"], geocoded=1,
+                                  city=geo.get("city"), lat=geo.get("lat"), lng=geo.get("lng"), content=None))
+        return records
+
+    def search_index_articles(self, p):
+        return [Record(seq=seq, key=key, url=a["url"], title=a["titulo"], content=a["contenido"],
+                       date=a["fecha_dia"], source=a["periodico"], topics=a["topics"])
+                for seq, key in self._keys_after(self.index_keys, p["last_seq"], p["last_key"], p["max_seq"],
+                                                 p["limit"])
+                for a in [self.articles_by_element[key]]]
+
+    def search_index_hechos(self, p):
+        return [Record(id=h["nombre"], seq=h["cob_seq"], descripcion=h["descripcion"], date=h["cob_fecha"],
+                       macroevento=h["macro"], newspapers=h["cob_periodicos"],
+                       topics=[t for a in self.articles_by_hecho[h["nombre"]] for t in a["topics"]])
+                for h in self.hechos.values() if h["cob_seq"] > p["since"]]
+
+    def data_versions(self, p):
+        return [Record(articles=self.article_keys[-1][0] if self.article_keys else None,
+                       hechos=1 if self.hechos else None)]
+
+    def news_since(self, p):
+        topics = set(p["topics"]) if p["topics"] is not None else None
+        records = []
+        for seq, url in self._keys_after(self.article_keys, p["since"], None, p["until"]):
+            a = self.articles[url]
+            if not p["date_from"] <= a["fecha_dia"] <= p["date_to"]:
+                continue
+            if topics is None or topics.intersection(a["topics"]):
+                records.append(Record(self._news_record(a, p["with_summary"], p["with_source"]), seq=seq))
+                if len(records) >= p["limit"]:
+                    break
+        return records
+
+    def hechos_since(self, p):
+        hechos = [h for h in reversed(self.by_ultima_fecha)
+                  if p["since"] < h["cob_seq"] <= p["until"]
+                  and (p["max_date"] is None or h["cob_ultima_fecha"] <= p["max_date"])
+                  and (p["macro_name"] is None or h["macro"] == p["macro_name"])]
+        return [self._hecho_record(h, h["fecha"] or h["cob_ultima_fecha"]) for h in hechos[:p["limit"]]]
+
+    def macros(self, p):
+        rows = []
+        for macro in self.macros_by_name.values():
+            fechas = [h["cob_fecha"] for h in self.hechos.values() if h["macro"] == macro["nombre"] and h["cob_fecha"]]
+            hechos = sum(1 for h in self.hechos.values() if h["macro"] == macro["nombre"])
+            rows.append(Record(nombre=macro["nombre"], descripcion=macro["descripcion"],
+                               start=min(fechas, default=None), end=max(fechas, default=None), hechos=hechos))
+        return sorted(rows, key=lambda r: (r["start"] is None, r["start"] or "", r["nombre"]))
+
+    def continuity(self, p):
+        return [Record(id=h["nombre"], date=h["cob_fecha"], text=h["descripcion"],
+                       follows=self.sigue_a.get(h["nombre"], []))
+                for h in self.hechos.values() if h["macro"] == p["macro_name"]]
+
+    def _hecho_record(self, h, date):
+        return Record(id=h["nombre"], date=date, text=h["descripcion"],
+                      macroevento=h["macro"], newspapers=h["cob_periodicos"])
+
+    def recent_hechos(self, p):
+        end = bisect.bisect_right(self.ultima_fecha_keys, p["max_date"])
+        return [self._hecho_record(h, h["fecha"] or h["cob_ultima_fecha"])
+                for h in reversed(self.by_ultima_fecha[max(0, end - 40):end])]
+
+    def hechos_by_date(self, p):
+        end = bisect.bisect_right(self.cob_fecha_keys, p["date"])
+        return [self._hecho_record(h, h["cob_fecha"]) for h in reversed(self.by_cob_fecha[max(0, end - 50):end])]
+
+    def timeline(self, p):
+        rows = [(h["fecha"] or h["min_fecha"], h) for h in self.hechos.values() if h["macro"] == p["macro_name"]]
+        rows.sort(key=lambda row: row[0] or "", reverse=True)
+        return [Record(id=h["nombre"], date=date, text=h["descripcion"]) for date, h in rows]
+
+    def _article_record(self, a, **extra):
+        return Record(extra, medio=a["periodico"], titulo=a["titulo"], link=a["url"], summary=a["contenido"])
+
+    def hecho_articles(self, p):
+        return [self._article_record(a) for a in self.articles_by_hecho.get(p["hecho_id"], [])]
+
+    def hechos_articles(self, p):
+        return [self._article_record(a, hecho_id=hecho_id)
+                for hecho_id in p["ids"] for a in self.articles_by_hecho.get(hecho_id, [])]
+
+
+class MemorySession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def run(self, query, params=None, **kwargs):
+        # run_query() pasa un neo4j.Query con el timeout de la transacción
+        text = getattr(query, "text", query)
+        name = QUERY_NAMES.get(text)
+        handler = getattr(self.graph, name, None) if name else None
+        if handler is None:
+            raise NotImplementedError(f"consulta sin equivalente en memoria: {name or text[:60]!r}")
+        return iter(handler(dict(params or {}, **kwargs)))
+
+
+class MemoryDriver:
+    def __init__(self, graph):
+        self.graph = graph if isinstance(graph, MemoryGraph) else MemoryGraph(graph)
+
+    def session(self, **kwargs):
+        return MemorySession(self.graph)
+
+    def close(self):
+        pass
+
+
+QUERY_NAMES = {query.text: name for name, query in QUERIES.items()}
@@ -0,0 +1,51 @@
+"""
+Formato común de los resultados de los benchmarks: un JSON con metadatos
+(commit, Python, máquina) y las métricas, pensado para compararse entre
+commits con bench/compare.py.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return dict({
+        "commit": git_commit(),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "cpus": os.cpu_count(),
+    }, **extra)
+
+
+def percentile(sorted_values, pct):
+    """Percentil por rango más cercano de una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def write_results(path, kind, meta, results):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "meta": meta, "results": results}, f, indent=2, sort_keys=True,
+                  ensure_ascii=False)
+        f.write("\n")
+    print(f"\nResultados guardados en {path}")
+
+
+def read_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,231 @@
+"""
+Generador de un grafo sintético Articulo/Fecha/Topic/Hecho/EventoMacro/Periodico
+con la misma forma que el real, a la escala que se pida (10k-1M artículos).
+
+Es determinista (misma semilla, mismo grafo). Se puede cargar en un Neo4j
+local, que después se prepara con los mismos scripts de mantenimiento que
+producción (fecha_dia, recuentos diarios, geolocalización y cobertura de
+hechos), o usarse en memoria con memory_graph.MemoryDriver.
+
+Uso (desde la raíz del repositorio; usa NEO4J_* de backend/.env):
+    python bench/synthetic_graph.py --articles 100000 [--seed 42] [--batch-size 5000]
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from location_extractor import SPANISH_CITIES  # noqa: E402
+
+PERIODICOS = {"El País": "elpais.com", "El Mundo": "elmundo.es"}
+TOPICS = ["Política", "Economía", "Internacional", "Sociedad", "Cultura", "Deportes",
+          "Tecnología", "Ciencia", "Salud", "Educación", "Medio Ambiente", "Justicia",
+          "Tribunales", "Conflicto Israel-Palestina", "Guerra de Ucrania", "Vivienda",
+          "Trabajo", "Inmigración", "Energía", "Opinión"]
+# El primero es el MAIN_MACRO por defecto de app.py
+MACROS = ["Guerra Israel-Hamas 2023", "Guerra de Ucrania", "Crisis de la vivienda",
+          "Legislatura 2023-2027", "Transición energética", "Ley de amnistía"]
+WORDS = ("el gobierno anuncia nuevas medidas tras la reunión del consejo de ministros "
+         "con los agentes sociales para debatir la reforma laboral y el presupuesto "
+         "mientras la oposición critica el acuerdo y pide explicaciones en el congreso").split()
+
+END_DATE = datetime.date(2025, 8, 30)
+# Artículos por día: fija cuántos días abarca el grafo
+ARTICLES_PER_DAY = 300
+ARTICLES_PER_HECHO = 20
+# Proporción de artículos sin nodo Fecha (como los datos de diciembre de 2025)
+NO_FECHA_RATIO = 0.1
+HECHO_RATIO = 0.3
+CITY_RATIO = 0.7
+
+
+class SyntheticGraph:
+    """
+    Describe el grafo: los nodos pequeños se guardan en listas y los artículos
+    se generan bajo demanda con iter_articles(), así que 1M de artículos no
+    tienen por qué estar en memoria a la vez.
+    """
+
+    def __init__(self, articles=10000, seed=42):
+        self.articles = articles
+        self.seed = seed
+        rng = random.Random(seed)
+        days = max(30, articles // ARTICLES_PER_DAY)
+        self.dates = [(END_DATE - datetime.timedelta(days=i)).isoformat() for i in range(days)][::-1]
+        self.periodicos = list(PERIODICOS)
+        self.topics = TOPICS[:]
+        self.macros = [{"nombre": name, "descripcion": f"Proceso de larga duración: {name}"}
+                       for name in MACROS[:max(1, min(len(MACROS), articles // 20000 + 1))]]
+        self.hechos = []
+        for i in range(max(10, articles // ARTICLES_PER_HECHO)):
+            fecha = rng.choice(self.dates)
+            macro = rng.choice(self.macros)["nombre"] if rng.random() < 0.8 else None
+            self.hechos.append({
+                "nombre": f"{fecha}-HECHO-{i:06d}",
+                # Algunos hechos no tienen fecha propia y la toman de sus artículos
+                "fecha": fecha if rng.random() < 0.7 else None,
+                "descripcion": " ".join(rng.choice(WORDS) for _ in range(15)),
+                "macro": macro,
+            })
+        # Cada hecho SIGUE_A al anterior de su macroevento
+        self.sigue_a = []
+        last = {}
+        for hecho in sorted(self.hechos, key=lambda h: h["nombre"]):
+            if hecho["macro"] is None:
+                continue
+            if hecho["macro"] in last:
+                self.sigue_a.append({"desde": hecho["nombre"], "hasta": last[hecho["macro"]]})
+            last[hecho["macro"]] = hecho["nombre"]
+
+    def iter_articles(self):
+        rng = random.Random(self.seed + 1)
+        cities = list(SPANISH_CITIES)
+        for i in range(self.articles):
+            periodico = rng.choice(self.periodicos)
+            fecha = rng.choice(self.dates)
+            body = [rng.choice(WORDS) for _ in range(80)]
+            if rng.random() < CITY_RATIO:
+                body.insert(rng.randrange(len(body)), rng.choice(cities))
+            yield {
+                "id": i,
+                "url": f"https://{PERIODICOS[periodico]}/{fecha}/articulo-{i:07d}.html",
+                "titulo": " ".join(rng.choice(WORDS) for _ in range(10)).capitalize(),
+                "contenido": " ".join(body),
+                "fecha": fecha,
+                "con_fecha": rng.random() >= NO_FECHA_RATIO,
+                "periodico": periodico,
+                "topics": rng.sample(self.topics, rng.randint(1, 2)),
+                "hecho": rng.choice(self.hechos)["nombre"] if rng.random() < HECHO_RATIO else None,
+            }
+
+    def summary(self):
+        return {"articles": self.articles, "seed": self.seed, "dates": len(self.dates),
+                "topics": len(self.topics), "hechos": len(self.hechos), "macros": len(self.macros)}
+
+
+LOAD_NAMES_QUERY = """
+UNWIND $rows AS nombre
+MERGE (:{label} {{nombre: nombre}})
+"""
+
+LOAD_MACROS_QUERY = """
+UNWIND $rows AS row
+MERGE (m:EventoMacro {nombre: row.nombre})
+SET m.descripcion = row.descripcion
+"""
+
+LOAD_FECHAS_QUERY = """
+UNWIND $rows AS fecha
+MERGE (f:Fecha {fecha: fecha})
+SET f.anio = substring(fecha, 0, 4)
+"""
+
+LOAD_HECHOS_QUERY = """
+UNWIND $rows AS row
+MERGE (h:Hecho {nombre: row.nombre})
+SET h.fecha = row.fecha, h.descripcion = row.descripcion
+WITH h, row
+MATCH (m:EventoMacro {nombre: row.macro})
+MERGE (h)-[:PARTE_DE]->(m)
+"""
+
+LOAD_SIGUE_A_QUERY = """
+UNWIND $rows AS row
+MATCH (a:Hecho {nombre: row.desde}), (b:Hecho {nombre: row.hasta})
+MERGE (a)-[:SIGUE_A]->(b)
+"""
+
+LOAD_ARTICLES_QUERY = """
+UNWIND $rows AS row
+MERGE (a:Articulo {url: row.url})
+SET a.titulo = row.titulo, a.contenido = row.contenido, a.fecha = row.fecha
+WITH a, row
+MATCH (p:Periodico {nombre: row.periodico})
+MERGE (a)-[:PUBLICADO_EN]->(p)
+WITH a, row
+CALL {
+    WITH a, row
+    MATCH (f:Fecha {fecha: row.fecha}) WHERE row.con_fecha
+    MERGE (a)-[:PUBLICADO_EL]->(f)
+}
+CALL {
+    WITH a, row
+    UNWIND row.topics AS topic
+    MATCH (t:Topic {nombre: topic})
+    MERGE (a)-[:TRATA_SOBRE]->(t)
+}
+CALL {
+    WITH a, row
+    MATCH (h:Hecho {nombre: row.hecho})
+    MERGE (a)-[:REF_HECHO]->(h)
+}
+"""
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_neo4j(driver, graph, batch_size=5000):
+    """Carga el grafo en Neo4j por lotes UNWIND y lo prepara como en producción."""
+    from daily_summary import refresh as refresh_daily
+    from db import DATABASE
+    from geocode_articles import backfill
+    from hecho_coverage import refresh as refresh_coverage
+    from schema import ensure_schema
+
+    with driver.session(database=DATABASE) as session:
+        ensure_schema(session)
+        session.run(LOAD_NAMES_QUERY.format(label="Periodico"), rows=graph.periodicos).consume()
+        session.run(LOAD_NAMES_QUERY.format(label="Topic"), rows=graph.topics).consume()
+        session.run(LOAD_MACROS_QUERY, rows=graph.macros).consume()
+        session.run(LOAD_FECHAS_QUERY, rows=graph.dates).consume()
+        for batch in batches(graph.hechos, batch_size):
+            session.run(LOAD_HECHOS_QUERY, rows=batch).consume()
+        for batch in batches(graph.sigue_a, batch_size):
+            session.run(LOAD_SIGUE_A_QUERY, rows=batch).consume()
+
+        start = time.perf_counter()
+        loaded = 0
+        for batch in batches(graph.iter_articles(), batch_size):
+            session.execute_write(lambda tx, rows=batch: tx.run(LOAD_ARTICLES_QUERY, rows=rows).consume())
+            loaded += len(batch)
+            print(f"  {loaded}/{graph.articles} artículos ({loaded / (time.perf_counter() - start):.0f}/s)")
+
+    # Las capas derivadas, con los mismos scripts que tras una ingesta real
+    refresh_daily(driver)
+    backfill(driver)
+    refresh_coverage(driver)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    from db import URI, DATABASE, create_driver
+
+    graph = SyntheticGraph(args.articles, args.seed)
+    print(f"Cargando en {URI} (base de datos {DATABASE}): {graph.summary()}")
+    driver = create_driver()
+    try:
+        load_neo4j(driver, graph, args.batch_size)
+    finally:
+        driver.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
-from neo4j import GraphDatabase
 import os
+import sys
 
-URI = "neo4j://127.0.0.1:7687"
-AUTH = ("neo4j", "HGLQwM2Z")
-DATABASE = "aletheiapoc"
+# Misma configuración que la API (NEO4J_* en backend/.env)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from db import DATABASE, create_driver  # noqa: E402
 
 def get_latest_date():
-    driver = GraphDatabase.driver(URI, auth=AUTH)
+    driver = create_driver()
     with driver.session(database=DATABASE) as session:
         # Check Articulo nodes directly, some might not have Fecha nodes
         query = """
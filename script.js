@@ -23,8 +23,52 @@ const readerSource = document.getElementById('readerSource');
 const readerTitle = document.getElementById('readerTitle');
 const readerContent = document.getElementById('readerContent');
 
-function openReader(articles) {
+// Fields requested for the globe and the list; summaries are loaded when an article is opened
+const NEWS_LIST_FIELDS = 'id,city,lat,lng,title,source,url,date';
+
+// Articles per hecho id, filled in bulk by prefetchHechoArticles
+const hechoArticlesCache = new Map();
+
+async function prefetchHechoArticles(ids) {
+    const missing = ids.filter(id => !hechoArticlesCache.has(id));
+    if (missing.length === 0) return;
+    const params = new URLSearchParams();
+    missing.forEach(id => params.append('ids', id));
+    try {
+        const res = await fetch(`/api/hechos/articles?${params}`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        const byId = await res.json();
+        Object.entries(byId).forEach(([id, articles]) => hechoArticlesCache.set(id, articles));
+    } catch (e) {
+        console.error('Error prefetching hecho articles:', e);
+    }
+}
+
+async function getHechoArticles(id) {
+    if (!hechoArticlesCache.has(id)) {
+        const res = await fetch(`/api/hecho/${encodeURIComponent(id)}/articles`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        hechoArticlesCache.set(id, await res.json());
+    }
+    return hechoArticlesCache.get(id);
+}
+
+// News items are fetched without their summary (see fetchNews); load it on demand
+async function ensureSummaries(articles) {
+    const missing = articles.filter(a => a.summary === undefined && a.id);
+    await Promise.all(missing.map(async a => {
+        try {
+            const res = await fetch(`/api/news/${encodeURIComponent(a.id)}`);
+            if (res.ok) Object.assign(a, await res.json());
+        } catch (e) {
+            console.error('Error fetching article detail:', e);
+        }
+    }));
+}
+
+async function openReader(articles) {
     if (!articles || articles.length === 0) return;
+    await ensureSummaries(articles);
 
     // Use the first article for location info (assuming all in group are same location)
     const first = articles[0];
@@ -68,19 +112,79 @@ function closeArticle() {
 }
 
 function updateNewsList() {
+    // Search results stay on screen until the search box is cleared
+    if (searchQuery) return;
     console.log('updateNewsList called with', newsData.length, 'articles');
     const newsList = document.getElementById('topNews');
     newsList.innerHTML = '';
     newsData.forEach(item => {
         const li = document.createElement('li');
         li.textContent = item.title;
-        li.title = item.summary;
+        li.title = item.summary || item.title;
         li.onclick = () => openReader([item]);
         newsList.appendChild(li);
     });
     console.log('News list updated, now has', newsList.children.length, 'items');
 }
 
+// Full-text search (/api/search) over every date, of the selected topic if any
+let searchQuery = '';
+let searchTimer = null;
+
+async function runSearch(query) {
+    searchQuery = query;
+    const newsTitle = document.querySelector('.news-list h3');
+    if (!query) {
+        if (newsTitle) newsTitle.innerHTML = `Noticias <span class="results-badge">${newsData.length} resultados</span>`;
+        updateNewsList();
+        hideLoading(newsData.length === 0);
+        return;
+    }
+    showLoading();
+    const params = new URLSearchParams({ q: query, limit: 50 });
+    if (selectedTopic) params.append('topic', selectedTopic);
+    try {
+        const res = await fetch(`/api/search?${params}`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        const data = await res.json();
+        // A newer search started while this one was loading
+        if (query !== searchQuery) return;
+        if (newsTitle) newsTitle.innerHTML = `Búsqueda <span class="results-badge">${data.items.length} resultados</span>`;
+        renderSearchResults(data.items);
+    } catch (e) {
+        console.error('Error searching:', e);
+        if (query === searchQuery) hideLoading(true);
+    }
+}
+
+function renderSearchResults(items) {
+    const list = document.getElementById('topNews');
+    list.innerHTML = '';
+    items.forEach(item => {
+        const li = document.createElement('li');
+        // The highlights come HTML-escaped from the server, with the matched words in <mark>
+        li.innerHTML = `${item.highlight.title}<span class="search-snippet">${item.date || ''} · ${item.highlight.text}</span>`;
+        li.onclick = () => openReader([{ id: item.id, title: item.title, source: item.source, url: item.url, date: item.date }]);
+        list.appendChild(li);
+    });
+    hideLoading(items.length === 0);
+}
+
+const searchInput = document.getElementById('searchInput');
+if (searchInput) {
+    searchInput.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        const query = searchInput.value.trim();
+        searchTimer = setTimeout(() => runSearch(query.length >= 2 ? query : ''), 300);
+    });
+    searchInput.addEventListener('keypress', e => {
+        if (e.key !== 'Enter') return;
+        clearTimeout(searchTimer);
+        const query = searchInput.value.trim();
+        runSearch(query.length >= 2 ? query : '');
+    });
+}
+
 // Calendar UI
 let calendarDate = new Date(); // The month currently being viewed
 let selectedDate = null; // The specific date selected (YYYY-MM-DD)
@@ -152,88 +256,125 @@ function changeMonth(offset) {
 
 async function fetchDates(topic = null) {
     try {
-        let url = `/api/dates?t=${Date.now()}`;
-        if (topic) url += `&topic=${encodeURIComponent(topic)}`;
+        let url = '/api/dates';
+        if (topic) url += `?topic=${encodeURIComponent(topic)}`;
 
         const res = await fetch(url);
         if (!res.ok) throw new Error('Failed to fetch dates');
-        availableDates = await res.json();
-
-        // Select the most recent date by default if nothing selected
-        if (availableDates.length > 0 && !selectedDate) {
-            availableDates.sort((a, b) => new Date(b.date) - new Date(a.date));
-            selectedDate = availableDates[0].date;
-            calendarDate = new Date(selectedDate);
-        }
-        renderCalendar();
+        applyDates(await res.json());
     } catch (e) {
         console.error('Error fetching dates:', e);
     }
 }
 
+function applyDates(dates) {
+    availableDates = dates;
+
+    // Select the most recent date by default if nothing selected
+    if (availableDates.length > 0 && !selectedDate) {
+        availableDates.sort((a, b) => new Date(b.date) - new Date(a.date));
+        selectedDate = availableDates[0].date;
+        calendarDate = new Date(selectedDate);
+    }
+    renderCalendar();
+}
+
 async function fetchTopics() {
     try {
-        const res = await fetch(`/api/topics?t=${Date.now()}`);
+        const res = await fetch(`/api/topics`);
         if (!res.ok) throw new Error('Failed to fetch topics');
-        const topics = await res.json();
+        renderTopics(await res.json());
+    } catch (e) {
+        console.error('Error fetching topics:', e);
+    }
+}
 
-        const select = document.getElementById('topicSelect');
-        if (!select) {
-            console.error('topicSelect element not found');
-            return;
-        }
+function renderTopics(topics) {
+    const select = document.getElementById('topicSelect');
+    if (!select) {
+        console.error('topicSelect element not found');
+        return;
+    }
 
-        // Preserve default option
-        const defaultOption = select.querySelector('option[value=""]');
-        select.innerHTML = '';
-        if (defaultOption) select.appendChild(defaultOption);
-
-        if (Array.isArray(topics)) {
-            topics.forEach(t => {
-                const opt = document.createElement('option');
-                opt.value = t.topic;
-                opt.textContent = `${t.topic} (${t.count})`;
-                select.appendChild(opt);
-            });
-        } else {
-            console.error('Topics data is not an array:', topics);
-        }
+    // Preserve default option
+    const defaultOption = select.querySelector('option[value=""]');
+    select.innerHTML = '';
+    if (defaultOption) select.appendChild(defaultOption);
 
-        select.addEventListener('change', () => {
-            selectedTopic = select.value;
-            fetchNews(selectedDate, selectedTopic);
-            fetchDates(selectedTopic); // Update calendar dots to match topic
-            // Sync with timeline
-            if (timelineSection.style.display === 'flex') {
-                updateTimelineView();
-            }
+    if (Array.isArray(topics)) {
+        topics.forEach(t => {
+            const opt = document.createElement('option');
+            opt.value = t.topic;
+            opt.textContent = `${t.topic} (${t.count})`;
+            select.appendChild(opt);
         });
-    } catch (e) {
-        console.error('Error fetching topics:', e);
+    } else {
+        console.error('Topics data is not an array:', topics);
     }
-}
 
-/* 
-   Helper to group news by City (or Lat/Lng) 
-   Returns an array of objects: { city, lat, lng, articles: [...] }
-*/
-function groupNewsByLocation(data) {
-    const groups = {};
-    data.forEach(item => {
-        // Create a unique key based on coordinates to handle same-named cities in diff locations if ever needed
-        // But city name is good for display.
-        const key = `${item.city}_${item.lat}_${item.lng}`;
-        if (!groups[key]) {
-            groups[key] = {
-                city: item.city,
-                lat: item.lat,
-                lng: item.lng,
-                articles: []
-            };
+    select.addEventListener('change', () => {
+        selectedTopic = select.value;
+        fetchNews(selectedDate, selectedTopic);
+        fetchDates(selectedTopic); // Update calendar dots to match topic
+        // Sync with timeline
+        if (timelineSection.style.display === 'flex') {
+            updateTimelineView();
         }
-        groups[key].articles.push(item);
     });
-    return Object.values(groups);
+}
+
+/*
+   Globe markers are clusters computed by the server (/api/news/clusters):
+   { key, count, city, lat, lng, bbox, sources, top: [{ id, title, source }] }.
+   The cell size follows the camera altitude; a cluster's articles are
+   fetched when it is clicked.
+*/
+let globeClusters = [];
+let globeClusterPrecision = null;
+let clusterRequestId = 0;
+
+// [minimum altitude (globe radii), geohash precision]; closer than the last one: exact points
+const CLUSTER_PRECISION_BY_ALTITUDE = [[2.5, 2], [1.2, 3], [0.5, 4], [0.2, 5]];
+
+function clusterPrecision(altitude) {
+    const match = CLUSTER_PRECISION_BY_ALTITUDE.find(([minAltitude]) => altitude >= minAltitude);
+    return match ? match[1] : 9;
+}
+
+function newsFilterParams(dateFilter, topicFilter) {
+    const params = new URLSearchParams();
+    if (dateFilter) params.set('date', dateFilter);
+    if (topicFilter) params.set('topic', topicFilter);
+    return params;
+}
+
+async function fetchClusters(dateFilter = selectedDate, topicFilter = selectedTopic) {
+    const requestId = ++clusterRequestId;
+    const params = newsFilterParams(dateFilter, topicFilter);
+    params.set('precision', globeClusterPrecision);
+    try {
+        const res = await fetch(`/api/news/clusters?${params}`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        const data = await res.json();
+        // A newer request (zoom or filter change) supersedes this one
+        if (requestId !== clusterRequestId) return;
+        globeClusters = data.clusters;
+        if (world) world.htmlElementsData(globeClusters);
+    } catch (e) {
+        console.error('Error fetching clusters:', e);
+    }
+}
+
+async function openCluster(cluster) {
+    const params = newsFilterParams(selectedDate, selectedTopic);
+    params.set('fields', NEWS_LIST_FIELDS);
+    try {
+        const res = await fetch(`/api/news/clusters/${encodeURIComponent(cluster.key)}?${params}`);
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        openReader((await res.json()).items);
+    } catch (e) {
+        console.error('Error fetching cluster articles:', e);
+    }
 }
 
 // Loading & Empty State Helpers
@@ -259,42 +400,172 @@ async function fetchNews(dateFilter = null, topicFilter = null) {
     console.log('✅ fetchNews called with date:', dateFilter, 'topic:', topicFilter);
     showLoading();
     try {
-        let url = `/api/news?t=${Date.now()}`;
-        if (dateFilter) url += `&date=${dateFilter}`;
-        if (topicFilter) url += `&topic=${encodeURIComponent(topicFilter)}`;
+        const params = newsFilterParams(dateFilter, topicFilter);
+        params.set('fields', NEWS_LIST_FIELDS);
+        const url = `/api/news?${params}`;
         console.log('📡 Fetching:', url);
         const res = await fetch(url);
         if (!res.ok) throw new Error(`HTTP error ${res.status}`);
-        const data = await res.json();
-        console.log('📥 Received', data.length, 'articles');
-        newsData = data;
-
-        // UI Feedback: Update results count
-        const newsTitle = document.querySelector('.news-list h3');
-        if (newsTitle) {
-            newsTitle.innerHTML = `Noticias <span class="results-badge">${newsData.length} resultados</span>`;
-        }
-
-        if (world) {
-            console.log('🌍 Updating globe with', newsData.length, 'markers');
-            updateGlobeData();
-        } else {
-            console.log('🌍 Initializing globe');
-            initializeGlobe();
-        }
-        updateNewsList();
-        hideLoading(newsData.length === 0);
+        applyNews(await res.json());
+        subscribeChanges();
     } catch (e) {
         console.error('❌ Error fetching news:', e);
         hideLoading(false);
     }
 }
 
-// Update Globe Data needs to use grouping
-function updateGlobeData() {
-    if (world) {
-        const grouped = groupNewsByLocation(newsData);
-        world.htmlElementsData(grouped);
+function applyNews(data) {
+    console.log('📥 Received', data.length, 'articles');
+    newsData = data;
+
+    // UI Feedback: Update results count
+    const newsTitle = document.querySelector('.news-list h3');
+    if (newsTitle && !searchQuery) {
+        newsTitle.innerHTML = `Noticias <span class="results-badge">${newsData.length} resultados</span>`;
+    }
+
+    if (!world) {
+        console.log('🌍 Initializing globe');
+        initializeGlobe();
+    }
+    fetchClusters();
+    updateNewsList();
+    hideLoading(newsData.length === 0);
+}
+
+// First screen in a single request: dates, topics, news, timeline and Prisma facts
+async function fetchBootstrap() {
+    showLoading();
+    const params = new URLSearchParams({ fields: NEWS_LIST_FIELDS });
+    if (selectedTopic) params.set('topic', selectedTopic);
+    const res = await fetch(`/api/bootstrap?${params}`);
+    if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+    const data = await res.json();
+
+    applyDates(data.dates);
+    if (data.date) {
+        selectedDate = data.date;
+        calendarDate = new Date(selectedDate);
+        renderCalendar();
+    }
+    renderTopics(data.topics);
+    applyNews(data.news);
+    if (data.hechos.length > 0) {
+        prismaHechos = data.hechos;
+        window.prismaHechos = prismaHechos;
+        prefetchHechoArticles(prismaHechos.slice(0, 20).map(h => h.id));
+    }
+    liveVersion = data.version;
+    subscribeChanges();
+}
+
+// Live updates: the server pushes only what changed since the data version we
+// have ("articles.hechos"). New articles of the selected date/topic and new or
+// updated hechos are merged in place. If the stream is refused (too many
+// clients) or EventSource is missing, poll the same deltas with since=.
+let liveVersion = null;
+let liveSource = null;
+let livePollTimer = null;
+const LIVE_POLL_MS = 30000;
+
+function subscribeChanges() {
+    if (liveSource) liveSource.close();
+    liveSource = null;
+    clearTimeout(livePollTimer);
+    if (!window.EventSource) {
+        scheduleChangePoll();
+        return;
+    }
+    const params = newsFilterParams(selectedDate, selectedTopic);
+    params.set('fields', NEWS_LIST_FIELDS);
+    if (liveVersion) params.set('since', liveVersion);
+    const source = new EventSource(`/api/changes/stream?${params}`);
+    source.addEventListener('news', e => mergeNews(JSON.parse(e.data).items));
+    source.addEventListener('hechos', e => mergeHechos(JSON.parse(e.data).items));
+    source.addEventListener('version', e => applyVersion(JSON.parse(e.data)));
+    source.onerror = () => {
+        // EventSource reconnects by itself (resuming from the last event id) unless the server refused it
+        if (source.readyState === EventSource.CLOSED && liveSource === source) {
+            liveSource = null;
+            scheduleChangePoll();
+        }
+    };
+    liveSource = source;
+}
+
+function applyVersion(data) {
+    const previous = liveVersion;
+    liveVersion = data.version;
+    if (data.reset) {
+        // The data was reloaded on the server: start over
+        fetchNews(selectedDate, selectedTopic);
+        fetchDates(selectedTopic);
+        return;
+    }
+    if (previous && previous.split('.')[0] !== data.version.split('.')[0]) {
+        // New articles change the per-date counts of the calendar
+        fetchDates(selectedTopic);
+    }
+}
+
+function mergeNews(items) {
+    const known = new Set(newsData.map(n => n.id));
+    const fresh = items.filter(n => !known.has(n.id));
+    if (fresh.length > 0) applyNews(fresh.concat(newsData));
+}
+
+function mergeHechos(items) {
+    const byId = new Map(items.map(h => [h.id, h]));
+    const updated = prismaHechos.map(h => byId.get(h.id) || h);
+    const known = new Set(prismaHechos.map(h => h.id));
+    const fresh = items.filter(h => !known.has(h.id));
+    prismaHechos = fresh.concat(updated);
+    window.prismaHechos = prismaHechos;
+    const container = document.getElementById('eventsContainer');
+    if (container && container.children.length > 0) {
+        // Keep the highlighted card on the same hecho
+        currentHechoIndex += fresh.length;
+        renderPrismaEvents(prismaHechos);
+    }
+}
+
+function scheduleChangePoll() {
+    clearTimeout(livePollTimer);
+    livePollTimer = setTimeout(pollChanges, LIVE_POLL_MS);
+}
+
+async function pollChanges() {
+    try {
+        const res = await fetch('/api/changes/version');
+        if (!res.ok) throw new Error(`HTTP error ${res.status}`);
+        const data = await res.json();
+        if (!liveVersion) {
+            liveVersion = data.version;
+            return;
+        }
+        let [articles, hechos] = liveVersion.split('.').map(Number);
+        if (data.articles < articles || data.hechos < hechos) {
+            applyVersion({ version: data.version, reset: true });
+            return;
+        }
+        while (data.articles > articles) {
+            const params = newsFilterParams(selectedDate, selectedTopic);
+            params.set('fields', NEWS_LIST_FIELDS);
+            params.set('since', articles);
+            const delta = await (await fetch(`/api/news?${params}`)).json();
+            mergeNews(delta.items);
+            articles = delta.version;
+            if (!delta.more) break;
+        }
+        if (data.hechos > hechos) {
+            const delta = await (await fetch(`/api/hechos/recent?since=${hechos}`)).json();
+            mergeHechos(delta.items);
+        }
+        applyVersion(data);
+    } catch (e) {
+        console.error('Error polling changes:', e);
+    } finally {
+        scheduleChangePoll();
     }
 }
 
@@ -340,14 +611,15 @@ function initializeGlobe() {
         `
     });
 
-    // Prepare initial data
-    const groupedData = groupNewsByLocation(newsData);
+    const initialAltitude = 1.5;
+    globeClusterPrecision = clusterPrecision(initialAltitude);
+    let zoomTimer = null;
 
     world = Globe()(document.getElementById('globeViz'))
         .globeMaterial(earthMat)
         .backgroundImageUrl('./img/night-sky.png')
-        .pointOfView({ lat: 40.4168, lng: -3.7038, altitude: 1.5 })
-        .htmlElementsData(groupedData)
+        .pointOfView({ lat: 40.4168, lng: -3.7038, altitude: initialAltitude })
+        .htmlElementsData(globeClusters)
         .htmlLat('lat')
         .htmlLng('lng')
         .htmlElement(d => {
@@ -355,29 +627,35 @@ function initializeGlobe() {
             el.className = 'news-marker';
 
             // Marker Visuals
-            // If multiple articles, maybe show count or different style?
-            const count = d.articles.length;
+            const count = d.count;
             const isMulti = count > 1;
 
-            // Generate sources summary for card: "El País (2), El Mundo (1)"
-            const sources = {};
-            d.articles.forEach(a => {
-                sources[a.source] = (sources[a.source] || 0) + 1;
-            });
-            const sourceText = Object.entries(sources).map(([k, v]) => `${k} (${v})`).join(', ');
+            // Sources summary for card: "El País (2), El Mundo (1)"
+            const sourceText = Object.entries(d.sources).map(([k, v]) => `${k} (${v})`).join(', ');
 
             el.innerHTML = `
                 <div class="marker-dot" style="${isMulti ? 'background: #ffaa00; box-shadow: 0 0 10px #ffaa00;' : ''}"></div>
                 <div class="marker-card">
                     <div class="marker-source">${d.city}</div>
                     <div class="marker-title">
-                        ${isMulti ? `<strong>${count} Noticias</strong><br><span style='font-size:0.8em'>${sourceText}</span>` : d.articles[0].title}
+                        ${isMulti ? `<strong>${count} Noticias</strong><br><span style='font-size:0.8em'>${sourceText}</span>` : d.top[0].title}
                     </div>
                 </div>
             `;
-            el.onclick = e => { e.stopPropagation(); openReader(d.articles); };
+            el.onclick = e => { e.stopPropagation(); openCluster(d); };
             return el;
         })
+        .onZoom(({ altitude }) => {
+            // Re-cluster once the camera settles at a new cell size
+            clearTimeout(zoomTimer);
+            zoomTimer = setTimeout(() => {
+                const precision = clusterPrecision(altitude);
+                if (precision !== globeClusterPrecision) {
+                    globeClusterPrecision = precision;
+                    fetchClusters();
+                }
+            }, 300);
+        })
         .showAtmosphere(true)
         .atmosphereColor('lightskyblue')
         .atmosphereAltitude(0.15)
@@ -577,8 +855,9 @@ async function renderMacroTimeline() {
             item.innerHTML = `
                 <div class="timeline-content">
                     <span class="timeline-tag">MACRO-PROCESO</span>
-                    <div class="timeline-date">${m.date || 'Sin fecha registrada'}</div>
+                    <div class="timeline-date">${m.date ? (m.end && m.end !== m.date ? `${m.date} → ${m.end}` : m.date) : 'Sin fecha registrada'}</div>
                     <div class="timeline-title">${m.nombre}</div>
+                    <div class="timeline-meta">${m.hechos} hechos</div>
                     <button class="macro-enter-btn">Entrar al detalle <i data-lucide="zoom-in"></i></button>
                 </div>
             `;
@@ -611,7 +890,7 @@ async function renderHechoTimeline(macroName) {
     list.innerHTML = '<div class="loading-state"><div class="spinner"></div><p>Cargando hitos del evento...</p></div>';
 
     try {
-        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}?t=${Date.now()}`);
+        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}`);
         const hechos = await res.json();
 
         list.innerHTML = '';
@@ -645,7 +924,7 @@ async function fetchMacros() {
     if (macroSelect.options.length > 1) return; // Already fetched
 
     try {
-        const res = await fetch(`/api/macros?t=${Date.now()}`);
+        const res = await fetch(`/api/macros`);
         const macros = await res.json();
         macros.forEach(m => {
             const opt = document.createElement('option');
@@ -690,8 +969,7 @@ async function openComparison(hecho) {
     comparisonPanel.classList.add('open');
 
     try {
-        const res = await fetch(`/api/hecho/${encodeURIComponent(hecho.id)}/articles?t=${Date.now()}`);
-        const articles = await res.json();
+        const articles = await getHechoArticles(hecho.id);
 
         colElPais.innerHTML = '';
         colElMundo.innerHTML = '';
@@ -831,10 +1109,14 @@ function rotatePrismaRight() {
 async function fetchPrismaHechos() {
     console.log('🔸 fetchPrismaHechos called');
     try {
-        const res = await fetch(`/api/hechos/recent?t=${Date.now()}`);
-        console.log('🔸 API response status:', res.status);
-        if (!res.ok) throw new Error('Failed to fetch hechos');
-        prismaHechos = await res.json();
+        // Usually already loaded by fetchBootstrap
+        if (prismaHechos.length === 0) {
+            const res = await fetch(`/api/hechos/recent`);
+            console.log('🔸 API response status:', res.status);
+            if (!res.ok) throw new Error('Failed to fetch hechos');
+            prismaHechos = await res.json();
+            prefetchHechoArticles(prismaHechos.slice(0, 20).map(h => h.id));
+        }
         console.log('🔸 prismaHechos loaded:', prismaHechos.length, 'items');
 
         if (prismaHechos.length > 0) {
@@ -1011,8 +1293,7 @@ async function loadPrismaComparison(hecho) {
     if (colMundoArticles) colMundoArticles.innerHTML = '<div class="spinner"></div>';
 
     try {
-        const res = await fetch(`/api/hecho/${encodeURIComponent(hecho.id)}/articles?t=${Date.now()}`);
-        const articles = await res.json();
+        const articles = await getHechoArticles(hecho.id);
 
         const paisArts = articles.filter(a => a.medio.toLowerCase().includes('país'));
         const mundoArts = articles.filter(a => a.medio.toLowerCase().includes('mundo'));
@@ -1095,7 +1376,7 @@ async function loadPrismaMacroTimeline() {
             return;
         }
 
-        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}?t=${Date.now()}`);
+        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}`);
         const hechos = await res.json();
 
         // Find current hecho index in this list
@@ -1138,7 +1419,7 @@ function renderVerticalTimeline(hechos, activeIndex) {
             // FETCH CONTEXT: Get other events from the same date to allow scrolling context
             if (h.date) {
                 try {
-                    const res = await fetch(`/api/hechos/by-date/${h.date}?t=${Date.now()}`);
+                    const res = await fetch(`/api/hechos/by-date/${h.date}`);
                     const contextHechos = await res.json();
 
                     // Merge context hechos avoiding duplicates
@@ -1426,14 +1707,14 @@ function initPrisma() {
 
 // Initialization on page load
 window.addEventListener('load', async () => {
-    await fetchDates();
-    await fetchTopics();
-
-    // Initial news fetch is handled inside fetchDates after setting selectedDate
-    if (selectedDate) {
+    try {
+        await fetchBootstrap();
+    } catch (e) {
+        // Fall back to the individual endpoints
+        console.error('Error fetching bootstrap:', e);
+        await fetchDates();
+        await fetchTopics();
         await fetchNews(selectedDate, selectedTopic);
-    } else {
-        await fetchNews(null, selectedTopic);
     }
 
     // Wire calendar navigation buttons
@@ -1801,8 +2082,7 @@ async function syncDesktopComparison(hecho) {
     if (colMundoArticles) colMundoArticles.innerHTML = '<div class="spinner"></div>';
 
     try {
-        const res = await fetch(`/api/hecho/${encodeURIComponent(hecho.id)}/articles?t=${Date.now()}`);
-        const articles = await res.json();
+        const articles = await getHechoArticles(hecho.id);
 
         const paisArts = articles.filter(a => a.medio.toLowerCase().includes('país'));
         const mundoArts = articles.filter(a => a.medio.toLowerCase().includes('mundo'));
@@ -1906,7 +2186,7 @@ async function syncDesktopTimeline(hecho) {
     }
 
     try {
-        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}?t=${Date.now()}`);
+        const res = await fetch(`/api/timeline/${encodeURIComponent(macroName)}`);
         const hechos = await res.json();
         const activeIdx = hechos.findIndex(h => h.id === hecho.id);
         renderDesktopVerticalTimeline(hechos, activeIdx >= 0 ? activeIdx : 0);
@@ -0,0 +1,45 @@
+"""
+Regression checks that run without a Neo4j server: the API is served from
+bench/memory_graph.py's in-memory driver over a small SyntheticGraph.
+
+    python -m pytest tests
+"""
+import contextlib
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "backend"), os.path.join(ROOT, "bench")]
+
+# Nothing shared with other processes and no background loaders: tests drive them
+os.environ.update(SNAPSHOT_DIR="", CACHE_GENERATION_FILE="", ARTICLE_INDEX="")
+
+from memory_graph import MemoryDriver  # noqa: E402
+from synthetic_graph import SyntheticGraph  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def graph():
+    return SyntheticGraph(2500, 7)
+
+
+@pytest.fixture(scope="session")
+def driver(graph):
+    return MemoryDriver(graph)
+
+
+@pytest.fixture
+def api(driver, monkeypatch):
+    """The app module answering from the in-memory graph, with an empty response cache."""
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        import app
+    monkeypatch.setattr(app, "driver", driver)
+    app.response_cache.invalidate()
+    return app
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
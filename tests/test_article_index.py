@@ -0,0 +1,41 @@
+import numpy as np
+
+from article_index import ArticleIndex
+from memory_graph import Record
+
+
+def snapshot(columns):
+    """The columns by name, independent of the order in which topics, sources and cities were first seen."""
+    return {
+        "urls": columns.urls,
+        "seqs": columns.seqs.tolist(),
+        "day": columns.day.tolist(),
+        "source": [columns.source_names[i] for i in columns.source],
+        "city": [columns.city_names[i] if i >= 0 else None for i in columns.city],
+        "topics": {name: columns.topic_positions[i].tolist() for i, name in enumerate(columns.topic_names)},
+        "days": columns.days.tolist(),
+        "day_counts": columns.day_counts.tolist(),
+    }
+
+
+def test_incremental_refresh_matches_full_load(driver, monkeypatch):
+    full = ArticleIndex(batch_size=700)
+    full.refresh(driver, None)
+
+    # Load the first batch, then the rest on top of it as a later refresh would
+    incremental = ArticleIndex(batch_size=700)
+    monkeypatch.setattr(driver.graph, "index_state", lambda p: [Record(version=1)])
+    incremental.refresh(driver, None)
+    first = len(incremental.columns)
+    monkeypatch.undo()
+    added = incremental.refresh(driver, None)
+
+    assert 0 < first < len(full.columns)
+    assert first + added == len(full.columns)
+    assert snapshot(incremental.columns) == snapshot(full.columns)
+
+    columns = full.columns
+    assert [(-day, url) for day, url in zip(columns.day.tolist(), columns.urls)] == \
+        sorted((-day, url) for day, url in zip(columns.day.tolist(), columns.urls))
+    days, counts = np.unique(columns.day, return_counts=True)
+    assert columns.days.tolist() == days.tolist() and columns.day_counts.tolist() == counts.tolist()
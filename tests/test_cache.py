@@ -0,0 +1,31 @@
+import threading
+
+from cache import ResponseCache
+
+
+def test_invalidation_listeners_run_outside_the_request(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResponseCache, "GENERATION_CHECK_INTERVAL", 0)
+    generation_file = str(tmp_path / "generation")
+    other = ResponseCache(generation_file=generation_file)
+    cache = ResponseCache(generation_file=generation_file)
+    release, calls = threading.Event(), []
+
+    def listener():
+        calls.append(1)
+        release.wait(5)
+
+    cache.add_listener(listener)
+    cache.set("key", "value", ttl=60)
+    other.invalidate()
+
+    # The lookups that see the new generation neither block nor start a second refresh
+    assert cache.get("key") == "value"
+    assert cache.get("key") == "value"
+    assert calls == [1]
+    epoch = cache.epoch
+
+    release.set()
+    cache._refresher.join(5)
+    assert cache.epoch == epoch + 1
+    assert cache.get("key") is None
+    assert calls == [1]
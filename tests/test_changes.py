@@ -0,0 +1,7 @@
+def test_streams_capped_at_zero_fall_back_to_polling(api, client, monkeypatch):
+    # SSE_MAX_CLIENTS with fewer than 4 WEB_THREADS
+    monkeypatch.setattr(api.change_feed, "max_clients", 0)
+    response = client.get("/api/changes/stream")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(api.SSE_MAX_SECONDS)
+    assert api.change_feed.clients == 0
@@ -0,0 +1,29 @@
+from continuity import ContinuityGraph
+
+
+def hecho(id, date, follows=()):
+    return {"id": id, "date": date, "text": id, "follows": list(follows)}
+
+
+def test_window_keeps_ids_that_sort_after_the_undated_key():
+    # "¿", "Á" and "~x" all sort after "~", the key of undated hechos
+    graph = ContinuityGraph([
+        hecho("¿Tregua?", "2024-03-02"),
+        hecho("Ángel", "2024-03-02", ["Acuerdo"]),
+        hecho("~x", "2024-03-01"),
+        hecho("Acuerdo", "2024-03-01"),
+        hecho("Sin fecha", None),
+    ])
+
+    page, cursor = graph.window("2024-03-01", "2024-03-02")
+    assert [node["id"] for node in page] == ["Acuerdo", "~x", "¿Tregua?", "Ángel"]
+    assert cursor is None
+
+    page, cursor = graph.window(date_to="2024-03-01", limit=1)
+    assert [node["id"] for node in page] == ["Acuerdo"]
+    page, cursor = graph.window(date_to="2024-03-01", cursor=cursor, limit=1)
+    assert [node["id"] for node in page] == ["~x"] and cursor is None
+
+    page, _ = graph.window("2024-03-02")
+    assert [node["id"] for node in page] == ["¿Tregua?", "Ángel", "Sin fecha"]
+    assert graph.nodes[0]["followed_by"] == ["Ángel"]
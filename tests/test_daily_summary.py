@@ -0,0 +1,129 @@
+"""
+daily_summary.refresh() against a fake session that answers its own queries,
+so the selection of pending articles and the day recounts are checked without
+Neo4j.
+"""
+import pytest
+
+import daily_summary
+
+
+class FakeSummaryGraph:
+    """Articulo nodes as dicts keyed by elementId, plus the DiaResumen counts and the process state."""
+
+    def __init__(self, articles):
+        self.articles = {}
+        self.days = {}
+        self.version = None
+        self.pending_reads = []
+        for article in articles:
+            self.add(**article)
+
+    def add(self, url, fecha, topics=()):
+        element_id = f"4:test:{len(self.articles)}"
+        self.articles[element_id] = {"url": url, "fecha": fecha, "topics": list(topics)}
+        return element_id
+
+    def session(self, **kwargs):
+        return FakeSession(self)
+
+
+class FakeSession:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, work, *args):
+        return work(self, *args)
+
+    def run(self, query, **params):
+        g = self.graph
+        if query == daily_summary.READ_STATE_QUERY:
+            return FakeResult([{"version": g.version}] if g.version is not None else [])
+        if query == daily_summary.PENDING_QUERY:
+            rows = [{"id": element_id, "dia": a["fecha"][:10] if a["fecha"] else None}
+                    for element_id, a in g.articles.items()
+                    if params["full"] or a.get("resumen_seq") is None]
+            g.pending_reads.append(len(rows))
+            return FakeResult(rows)
+        if query == daily_summary.WRITE_BATCH_QUERY:
+            for row in params["rows"]:
+                article = g.articles[row["id"]]
+                article["fecha_dia"] = row["dia"]
+                article.setdefault("resumen_seq", params["seq"])
+            g.version = params["seq"]
+            return FakeResult([{"updated": len(params["rows"])}])
+        if query == daily_summary.ALL_DAYS_QUERY:
+            days = {a.get("fecha_dia") for a in g.articles.values()} | set(g.days)
+            return FakeResult([{"dia": day} for day in days if day])
+        if query == daily_summary.REFRESH_DAYS_QUERY:
+            for day in params["days"]:
+                total = sum(1 for a in g.articles.values() if a.get("fecha_dia") == day)
+                if total:
+                    g.days[day] = total
+                else:
+                    g.days.pop(day, None)
+            return FakeResult([])
+        if query in (daily_summary.CLEAR_DAY_TOPICS_QUERY, daily_summary.REFRESH_DAY_TOPICS_QUERY):
+            return FakeResult([])
+        raise AssertionError(f"unexpected query: {query}")
+
+
+class FakeResult(list):
+    def single(self):
+        return self[0] if self else None
+
+    def consume(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_schema(monkeypatch):
+    monkeypatch.setattr(daily_summary, "ensure_schema", lambda session: None)
+
+
+def test_articles_without_url_are_normalised_once():
+    graph = FakeSummaryGraph([
+        {"url": "https://a/1", "fecha": "2024-03-01T10:00"},
+        {"url": None, "fecha": "2024-03-01T11:00"},
+        {"url": None, "fecha": "2024-03-02"},
+        {"url": "https://a/1", "fecha": "2024-03-02"},  # duplicated url
+    ])
+    daily_summary.refresh(graph, batch_size=3)
+
+    assert all(a["resumen_seq"] for a in graph.articles.values())
+    assert [a["fecha_dia"] for a in graph.articles.values()] == ["2024-03-01", "2024-03-01", "2024-03-02", "2024-03-02"]
+    assert graph.days == {"2024-03-01": 2, "2024-03-02": 2}
+    assert graph.version == 2
+
+    # A second run finds nothing to do
+    daily_summary.refresh(graph, batch_size=3)
+    assert graph.pending_reads[-1] == 0
+    assert graph.version == 2
+
+
+def test_new_articles_get_a_new_batch_number():
+    graph = FakeSummaryGraph([{"url": "https://a/1", "fecha": "2024-03-01"}])
+    daily_summary.refresh(graph)
+    new = graph.add("https://a/2", "2024-03-05")
+    daily_summary.refresh(graph)
+
+    assert graph.pending_reads == [1, 1]
+    assert graph.articles[new]["resumen_seq"] == 2
+    assert graph.days == {"2024-03-01": 1, "2024-03-05": 1}
+
+
+def test_full_refresh_drops_days_left_without_articles():
+    graph = FakeSummaryGraph([{"url": "https://a/1", "fecha": "2024-03-01"},
+                              {"url": "https://a/2", "fecha": "2024-03-02"}])
+    daily_summary.refresh(graph)
+    graph.articles["4:test:1"]["fecha"] = "2024-03-01"  # re-dated
+
+    daily_summary.refresh(graph, full=True)
+    assert graph.days == {"2024-03-01": 2}
+    assert [a["resumen_seq"] for a in graph.articles.values()] == [1, 1]
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.mark.parametrize("query", ["date=2024-13-45", "date=2024-02-30", "date=24-01-01",
+                                   "date=2024-01-01%26topic%3DX", "from=2024-01-01&to=2024-99-01"])
+def test_invalid_dates_are_rejected_before_the_cache(client, api, query):
+    response = client.get(f"/api/news?{query}")
+    assert response.status_code == 400
+    assert api.response_cache.stats()["entries"] == 0
+
+
+def test_invalid_date_in_the_path_is_rejected(client):
+    assert client.get("/api/hechos/by-date/2024-02-30").status_code == 400
+
+
+def test_valid_date_is_served(client, graph):
+    response = client.get(f"/api/news?date={graph.dates[0]}")
+    assert response.status_code == 200
+    assert response.get_json()
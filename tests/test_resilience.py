@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+
+import queries
+from resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class DownDriver:
+    """Every query fails as if the server were unreachable."""
+
+    def session(self, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def run(self, *args, **kwargs):
+        raise ServiceUnavailable("down")
+
+
+def test_only_the_probe_closes_a_half_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    straggler = breaker.before_call()
+    breaker.record(ServiceUnavailable("down"), straggler)
+    assert breaker.state == OPEN
+
+    probe = breaker.before_call()
+    assert probe is not None and breaker.state == HALF_OPEN
+    # A call that started before the breaker opened ends while the probe runs
+    breaker.record(token=straggler)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(token=probe)
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is None
+
+
+def test_open_breaker_is_logged_once(api, client, monkeypatch, caplog):
+    monkeypatch.setattr(queries, "breaker", CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    monkeypatch.setattr(queries, "QUERY_RETRIES", 0)
+    monkeypatch.setattr(api, "driver", DownDriver())
+
+    with caplog.at_level(logging.DEBUG):
+        for _ in range(6):
+            client.get("/api/topics")
+
+    opened = [r for r in caplog.records if r.name == "resilience" and r.levelno == logging.WARNING]
+    assert len(opened) == 1
+    # One traceback per query that reached the database; the rejected ones go to debug
+    assert len([r for r in caplog.records if r.exc_info]) == 2
+    assert queries.breaker.rejected == 4